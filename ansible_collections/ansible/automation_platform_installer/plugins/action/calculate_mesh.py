@@ -4,7 +4,16 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import gzip
+import hashlib
+import io
+import json
+import os
+
+from array import array
 from collections import defaultdict, deque
+from itertools import chain
+from xml.sax.saxutils import quoteattr
 
 from ansible.errors import AnsibleError
 from ansible.module_utils.parsing.convert_bool import boolean
@@ -41,6 +50,334 @@ _REQUIRED_ATTRIBUTES = {
     'node_state': 'active',
 }
 _GENERATE_DOT_FILE_PARAM = "generate_dot_file"
+_FINGERPRINT_FILE_PARAM = "fingerprint_file"
+_TOPOLOGY_FORMAT_PARAM = "topology_format"
+_TOPOLOGY_COMPRESS_PARAM = "topology_compress"
+_ANALYZE_MESH_PARAM = "analyze_mesh"
+
+# buffer size of the topology writer, so large meshes are flushed in big chunks
+_TOPOLOGY_BUFFER_SIZE = 1 << 16
+
+# host variables that any of the mesh assertions depend on
+_FINGERPRINT_HOSTVARS = ('node_type', 'node_state', 'receptor_listener', 'peers')
+
+
+class MeshIndex(object):
+    """
+    Compact adjacency index of the receptor mesh.
+
+    Every node name is mapped to an integer id; the nodes declared in the
+    peers dict come first, followed by the dangling peers (names that are only
+    referenced as a peer). Edges are stored once as forward and reverse
+    CSR-style arrays, so each assertion is a single linear scan.
+    """
+
+    def __init__(self, peers):
+        declared = sorted(peers)
+        dangling = sorted({p for targets in peers.values() for p in targets} - set(peers))
+
+        self.nodes = declared + dangling
+        self.declared = len(declared)
+        self.ids = {node: i for i, node in enumerate(self.nodes)}
+
+        size = len(self.nodes)
+        ids = self.ids
+
+        # forward edges: successors of node i are fwd_targets[fwd_offsets[i]:fwd_offsets[i + 1]]
+        self.fwd_offsets = array('l', [0]) * (size + 1)
+        self.fwd_targets = array('l')
+        in_degree = array('l', [0]) * size
+        for i, node in enumerate(declared):
+            targets = sorted(ids[p] for p in peers[node])
+            self.fwd_targets.extend(targets)
+            self.fwd_offsets[i + 1] = len(self.fwd_targets)
+            for t in targets:
+                in_degree[t] += 1
+        for i in range(self.declared, size):
+            self.fwd_offsets[i + 1] = len(self.fwd_targets)
+
+        # reverse edges are filled in with a counting sort over the in-degrees
+        self.rev_offsets = array('l', [0]) * (size + 1)
+        for i in range(size):
+            self.rev_offsets[i + 1] = self.rev_offsets[i] + in_degree[i]
+        self.rev_targets = array('l', [0]) * len(self.fwd_targets)
+        cursor = array('l', self.rev_offsets[:size])
+        for source in range(self.declared):
+            for target in self.successors(source):
+                self.rev_targets[cursor[target]] = source
+                cursor[target] += 1
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def edge_count(self):
+        return len(self.fwd_targets)
+
+    def successors(self, i):
+        return self.fwd_targets[self.fwd_offsets[i]:self.fwd_offsets[i + 1]]
+
+    def predecessors(self, i):
+        return self.rev_targets[self.rev_offsets[i]:self.rev_offsets[i + 1]]
+
+    def out_degree(self, i):
+        return self.fwd_offsets[i + 1] - self.fwd_offsets[i]
+
+    def in_degree(self, i):
+        return self.rev_offsets[i + 1] - self.rev_offsets[i]
+
+    def edges(self):
+        """
+        Yield every (source, target) edge as a pair of ids.
+        """
+        for source in range(self.declared):
+            for target in self.successors(source):
+                yield source, target
+
+    def dangling(self):
+        return self.nodes[self.declared:]
+
+    def self_loops(self):
+        return [self.nodes[s] for s, t in self.edges() if s == t]
+
+    def two_cycles(self):
+        size = len(self.nodes)
+        seen = set()
+        cycles = set()
+        for source, target in self.edges():
+            if target * size + source in seen:
+                cycles.add(frozenset((self.nodes[source], self.nodes[target])))
+            seen.add(source * size + target)
+        return cycles
+
+    def reachable(self, root):
+        """
+        Return a bytearray flagging every node that can be reached from the
+        node ``root`` (an id) when the edges are treated as undirected.
+        """
+        seen = bytearray(len(self.nodes))
+        seen[root] = 1
+        queue = deque((root,))
+        while queue:
+            v = queue.popleft()
+            for neighbors in (self.successors(v), self.predecessors(v)):
+                for w in neighbors:
+                    if not seen[w]:
+                        seen[w] = 1
+                        queue.append(w)
+        return seen
+
+    def hops_from(self, sources):
+        """
+        Return the undirected hop distance from the closest of the ``sources``
+        ids to every node, -1 for the nodes that cannot be reached.
+        """
+        hops = array('l', [-1]) * len(self.nodes)
+        queue = deque()
+        for source in sources:
+            if hops[source] < 0:
+                hops[source] = 0
+                queue.append(source)
+        while queue:
+            v = queue.popleft()
+            for neighbors in (self.successors(v), self.predecessors(v)):
+                for w in neighbors:
+                    if hops[w] < 0:
+                        hops[w] = hops[v] + 1
+                        queue.append(w)
+        return hops
+
+    def lowpoints(self, roots):
+        """
+        Depth-first search over the undirected mesh, started from a virtual
+        node (id ``len(self)``) that is linked to every id in ``roots``.
+
+        Returns the discovery time, the low-link and the DFS parent of every
+        node plus the nodes in discovery order. Unreached nodes keep a
+        discovery time of -1.
+        """
+        size = len(self.nodes)
+        virtual = size
+        roots = list(roots)
+        is_root = bytearray(size + 1)
+        for root in roots:
+            is_root[root] = 1
+
+        def neighbors(v):
+            if v == virtual:
+                return iter(roots)
+            if is_root[v]:
+                return chain(self.successors(v), self.predecessors(v), (virtual,))
+            return chain(self.successors(v), self.predecessors(v))
+
+        disc = array('l', [-1]) * (size + 1)
+        low = array('l', [0]) * (size + 1)
+        parent = array('l', [-1]) * (size + 1)
+
+        disc[virtual] = low[virtual] = 0
+        order = [virtual]
+        stack = [(virtual, neighbors(virtual))]
+        while stack:
+            v, pending = stack[-1]
+            for w in pending:
+                if disc[w] < 0:
+                    parent[w] = v
+                    disc[w] = low[w] = len(order)
+                    order.append(w)
+                    stack.append((w, neighbors(w)))
+                    break
+                if w != parent[v] and disc[w] < low[v]:
+                    low[v] = disc[w]
+            else:
+                stack.pop()
+                if stack:
+                    p = stack[-1][0]
+                    if low[v] < low[p]:
+                        low[p] = low[v]
+
+        return disc, low, parent, order
+
+
+class TopologyExporter(object):
+    """
+    Base class of the mesh topology exporters.
+
+    Subclasses implement ``chunks`` as a generator of text fragments; the
+    per-node degree and hop-distance-from-control attributes are computed
+    once here and shared by every format.
+    """
+
+    def __init__(self, index, control_nodes):
+        self.index = index
+        self.control = bytearray(len(index))
+        for node in control_nodes:
+            if node in index.ids:
+                self.control[index.ids[node]] = 1
+        self.hops = index.hops_from(i for i, flag in enumerate(self.control) if flag)
+
+    def attributes(self, i):
+        return (
+            ('in_degree', self.index.in_degree(i)),
+            ('out_degree', self.index.out_degree(i)),
+            ('hops', self.hops[i]),
+        )
+
+    def chunks(self):
+        raise NotImplementedError
+
+    def write(self, stream):
+        stream.writelines(self.chunks())
+
+
+class DotExporter(TopologyExporter):
+
+    def node(self, i, indent):
+        attrs = ', '.join(f'{k}={v}' for k, v in self.attributes(i))
+        return f'{indent}"{self.index.nodes[i]}" [{attrs}];\n'
+
+    def chunks(self):
+        index, control = self.index, self.control
+        nodes = index.nodes
+
+        # Write the header and subgraph header
+        yield (
+            'strict digraph "" {\n'
+            '    rankdir = TB\n'
+            '    node [shape=box];\n'
+            '    subgraph cluster_0 {\n'
+            '        graph [label="Control Nodes", type=solid];\n'
+            '        {\n'
+            '            rank = same;\n'
+        )
+
+        # Write out each control node and the links between them
+        for i in range(len(index)):
+            if control[i]:
+                yield self.node(i, '            ')
+        for source, target in index.edges():
+            if control[source] and control[target]:
+                yield f'            "{nodes[source]}" -> "{nodes[target]}";\n'
+
+        yield (
+            "        }\n"
+            "    }\n\n"
+        )
+
+        # Write out each execution node and the remaining links
+        for i in range(len(index)):
+            if not control[i]:
+                yield self.node(i, '    ')
+        for source, target in index.edges():
+            if not (control[source] and control[target]):
+                yield f'    "{nodes[source]}" -> "{nodes[target]}";\n'
+
+        yield "}\n"
+
+
+class GraphMLExporter(TopologyExporter):
+
+    _KEYS = (
+        ('control', 'boolean'),
+        ('in_degree', 'int'),
+        ('out_degree', 'int'),
+        ('hops', 'int'),
+    )
+
+    def chunks(self):
+        nodes = self.index.nodes
+
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        )
+        for name, attr_type in self._KEYS:
+            yield f'  <key id="{name}" for="node" attr.name="{name}" attr.type="{attr_type}"/>\n'
+        yield '  <graph id="mesh" edgedefault="directed">\n'
+
+        for i, node in enumerate(nodes):
+            data = [('control', 'true' if self.control[i] else 'false')]
+            data.extend(self.attributes(i))
+            yield (
+                f'    <node id={quoteattr(node)}>'
+                + ''.join(f'<data key="{k}">{v}</data>' for k, v in data)
+                + '</node>\n'
+            )
+
+        for source, target in self.index.edges():
+            yield f'    <edge source={quoteattr(nodes[source])} target={quoteattr(nodes[target])}/>\n'
+
+        yield (
+            '  </graph>\n'
+            '</graphml>\n'
+        )
+
+
+class JsonExporter(TopologyExporter):
+    """
+    Compact adjacency form: nodes are referenced by their position in the
+    ``nodes`` list, and ``peers`` holds the outgoing links of every node.
+    """
+
+    def chunks(self):
+        index = self.index
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+        yield '{"nodes":' + dumps(index.nodes)
+        yield ',"control":' + dumps([i for i, flag in enumerate(self.control) if flag])
+        yield ',"in_degree":' + dumps([index.in_degree(i) for i in range(len(index))])
+        yield ',"out_degree":' + dumps([index.out_degree(i) for i in range(len(index))])
+        yield ',"hops":' + dumps(self.hops.tolist())
+        yield ',"peers":['
+        for i in range(len(index)):
+            yield (',' if i else '') + dumps(index.successors(i).tolist())
+        yield ']}\n'
+
+
+_TOPOLOGY_EXPORTERS = {
+    'dot': DotExporter,
+    'graphml': GraphMLExporter,
+    'json': JsonExporter,
+}
 
 
 class ActionModule(ActionBase):
@@ -89,77 +426,57 @@ class ActionModule(ActionBase):
 
         return dict(data)
 
-    def assert_no_dangling_peers(self, data):
-        for node, peers in data.items():
-            for peer in peers:
-                if peer not in data:
-                    raise AnsibleError(f"Cannot have a peer to a node that doesn't exist: {peer}")
-
-    def assert_no_self_peering(self, data):
-        conflicts = set()
-        for node, peers in data.items():
-            if any(host == node for host in peers):
-                conflicts.add(node)
+    def assert_no_dangling_peers(self, index):
+        dangling = index.dangling()
+        if dangling:
+            raise AnsibleError(f"Cannot have a peer to a node that doesn't exist: {dangling[0]}")
+
+    def assert_no_self_peering(self, index):
+        conflicts = index.self_loops()
         if conflicts:
             conflict_str = ', '.join(conflicts)
             raise AnsibleError(f"Cannot have nodes peering to themselves: {conflict_str}")
 
-    def assert_no_2cycles(self, data):
-        conflicts = set()
-        for node, peers in data.items():  # node = host, peers = set(hosts)
-            for host in peers:
-                if node in data.get(host, set()):
-                    conflicts.add(frozenset((node, host)))
+    def assert_no_2cycles(self, index):
+        conflicts = index.two_cycles()
         if conflicts:
             conflict_str = ", ".join(f"[{n1}] <-> [{n2}]" for n1, n2 in conflicts)
             raise AnsibleError(f"Two-way link(s) detected: {conflict_str} - Cannot have an inbound and outbound connection between the same two nodes")
 
-    def assert_no_disconnected(self, data, root):
+    def assert_no_disconnected(self, index, root):
         if root is None:
             raise AnsibleError("There were no automationcontroller nodes found")
 
-        undirected = defaultdict(set)
-        # turn our directed graph data structure into an undirected graph
-        for node, peers in data.items():
-            undirected[node] |= peers
-            for p in peers:
-                undirected[p].add(node)
-
         # breadth-first search starting with our control-plane node
-        seen = {root,}
-        queue = deque(seen)
-        while queue:
-            v = queue.popleft()
-            new_peers = undirected[v] - seen
-            queue.extend(new_peers)
-            seen |= new_peers
+        seen = index.reachable(index.ids[root])
 
-        if set(undirected) - seen:
-            disconn = ', '.join(set(undirected) - seen)
+        disconnected = [node for node, flag in zip(index.nodes, seen) if not flag]
+        if disconnected:
+            disconn = ', '.join(disconnected)
             raise AnsibleError(
                 f"There are receptor nodes that do not have a path back to the control plane: {disconn}"
             )
 
-    def assert_autodisable_listener_without_incoming(self, task_vars, data):
-        nodes = set(data)
+    def assert_autodisable_listener_without_incoming(self, task_vars, index):
+        hostvars = task_vars['hostvars']
+
+        conflicts, disabled = set(), set()
+        for i, node in enumerate(index.nodes):
+            if index.in_degree(i):
+                # A conflict only happens when `receptor_listener` is explicitly set False, but the node has incoming.
+                if not boolean(hostvars[node].get('receptor_listener', True), strict=False):
+                    conflicts.add(node)
+            # A node is disabled if it has no incoming and it does not have `receptor_listener` explicitly set True.
+            elif not boolean(hostvars[node].get('receptor_listener', False), strict=False):
+                disabled.add(node)
 
-        incoming = {p for peers in data.values() for p in peers}
-        # A conflict only happens when `receptor_listener` is explicitly set False, but the node has incoming.
-        conflicts = {
-            node for node in incoming
-            if not boolean(task_vars['hostvars'][node].get('receptor_listener', True), strict=False)
-        }
         if conflicts:
             confl = ', '.join(conflicts)
             raise AnsibleError(
                 f"There are receptor nodes that have the listener turned off that have incoming peers: {confl}"
             )
 
-        # A node is disabled if it has no incoming and it does not have `receptor_listener` explicitly set True.
-        return {
-            node for node in nodes - incoming
-            if not boolean(task_vars['hostvars'][node].get('receptor_listener', False), strict=False)
-        }
+        return disabled
 
     def assert_node_type(self, host, vars, group_name, valid_types):
         """
@@ -227,64 +544,167 @@ class ActionModule(ActionBase):
         Assert instance_group_* members are not present in the automationcontroller group
         and has a valid type.
         """
-        for group, members in ((g, m) for g, m in task_vars["groups"].items() if g.startswith(_INSTANCE_GROUP)):
-            for host in members:
-                if task_vars['hostvars'][host].get('node_state') == _DEPROVISION:
+        # every host is only checked once, against the first instance group it was found in
+        membership = {}
+        for group, members in task_vars["groups"].items():
+            if group.startswith(_INSTANCE_GROUP):
+                for host in members:
+                    membership.setdefault(host, group)
+
+        valid_types = _NODE_VALID_TYPES['instance_group']["types"]
+        for host, group in membership.items():
+            if task_vars['hostvars'][host].get('node_state') == _DEPROVISION:
+                continue
+
+            if host not in data:
+                raise AnsibleError(
+                    "The host '{0}' is not present in either [automationcontroller] or [execution_nodes]".format(host)
+                )
+
+            if data[host]["node_type"] not in valid_types:
+                raise AnsibleError(
+                    "The host '{0}' is a member of the group '{1}', "
+                    "its node_type must be one of these types: {2}".format(
+                        host,
+                        group,
+                        ", ".join(str(i) for i in valid_types)),
+                )
+
+    def analyze_mesh(self, index, control_nodes):
+        """
+        Reachability and redundancy report of the mesh, treating every link
+        as bidirectional.
+
+        Articulation points and bridges come from a DFS of the mesh itself.
+        A second DFS, rooted at a virtual node attached to the whole control
+        plane, gives for every other node the nodes whose loss cuts it off
+        from the control plane; with none of those there are at least two
+        node-disjoint paths back to it, so ``disjoint_paths`` is capped at 2.
+        """
+        control_ids = {index.ids[node] for node in control_nodes if node in index.ids}
+        hops = index.hops_from(control_ids)
+        virtual = len(index)
+        nodes = index.nodes
+
+        # mesh-wide articulation points and bridges, from any single control node
+        articulation, bridges = set(), []
+        if control_ids:
+            root = min(control_ids)
+            disc, low, parent, order = index.lowpoints((root,))
+            root_children = 0
+            for w in order[1:]:
+                p = parent[w]
+                if p == virtual:
                     continue
+                if p == root:
+                    root_children += 1
+                elif low[w] >= disc[p]:
+                    articulation.add(p)
+                if low[w] > disc[p]:
+                    bridges.append(sorted((nodes[p], nodes[w])))
+            # like any DFS root, the first node is only an articulation point with two subtrees
+            if root_children > 1:
+                articulation.add(root)
+
+        # nodes separating every other node from the control plane
+        disc, low, parent, order = index.lowpoints(control_ids)
+        separators = {virtual: ()}
+        for w in order[1:]:
+            p = parent[w]
+            if p != virtual and low[w] >= disc[p]:
+                separators[w] = separators[p] + (p,)
+            else:
+                separators[w] = separators[p]
+
+        report = {}
+        for i, node in enumerate(nodes):
+            if i in control_ids:
+                continue
+            if disc[i] < 0:
+                report[node] = dict(hops=-1, disjoint_paths=0, single_points_of_failure=[])
+                continue
+            spof = [nodes[n] for n in separators[i]]
+            report[node] = dict(
+                hops=hops[i],
+                disjoint_paths=1 if spof else 2,
+                single_points_of_failure=spof,
+            )
 
-                if host not in data:
-                    raise AnsibleError(
-                        "The host '{0}' is not present in either [automationcontroller] or [execution_nodes]".format(host)
-                    )
+        return dict(
+            articulation_points=sorted(nodes[i] for i in articulation),
+            bridges=sorted(bridges),
+            nodes=report,
+            max_hops=max((n['hops'] for n in report.values()), default=0),
+            min_disjoint_paths=min((n['disjoint_paths'] for n in report.values()), default=0),
+        )
 
-                if data[host]["node_type"] not in _NODE_VALID_TYPES['instance_group']["types"]:
-                    raise AnsibleError(
-                        "The host '{0}' is a member of the group '{1}', "
-                        "its node_type must be one of these types: {2}".format(
-                            host,
-                            group,
-                            ", ".join(str(i) for i in _NODE_VALID_TYPES['instance_group']["types"])),
-                    )
+    def mesh_fingerprint(self, task_vars, peers):
+        """
+        Digest of everything the mesh assertions look at: the merged peers,
+        the receptor-related host variables and the membership of the groups
+        used by calculate_mesh.
+        """
+        hostvars = task_vars['hostvars']
+        groups = task_vars['groups']
+
+        topology = {
+            'peers': {node: sorted(targets) for node, targets in peers.items()},
+            'groups': {
+                group: list(members) for group, members in groups.items()
+                if group in _NODE_VALID_TYPES or group.startswith(_INSTANCE_GROUP)
+            },
+        }
+        hosts = {host for members in topology['groups'].values() for host in members}
+        topology['hostvars'] = {
+            host: {attr: hostvars[host][attr] for attr in _FINGERPRINT_HOSTVARS if attr in hostvars[host]}
+            for host in hosts if host in hostvars
+        }
 
-    def write_dot_graph_to_file(self, control_nodes, all_nodes, filename="mesh.dot"):
+        encoded = json.dumps(topology, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
 
-        if not filename:
-            return
+    def read_fingerprint(self, filename):
+        try:
+            with open(filename) as f:
+                return f.read().strip()
+        except (IOError, OSError):
+            return None
 
-        with open(filename, mode='w') as f:
-            # Write the header and subgraph header
-            f.write(
-                'strict digraph "" {\n'
-                '    rankdir = TB\n'
-                '    node [shape=box];\n'
-                '    subgraph cluster_0 {\n'
-                '        graph [label="Control Nodes", type=solid];\n'
-                '        {\n'
-                '            rank = same;\n'
-            )
+    def write_fingerprint(self, filename, fingerprint):
+        try:
+            with open(filename, mode='w') as f:
+                f.write(fingerprint + '\n')
+        except (IOError, OSError) as e:
+            self._display.warning(f"Unable to write the mesh fingerprint to {filename}: {e}")
 
-            # Write out each control node
-            for node in control_nodes:
-                f.write(f'            "{node}";\n')
+    def assert_topology_options(self, args):
+        """
+        Return the format and the compression of the topology file,
+        failing on invalid values.
+        """
+        fmt = args.get(_TOPOLOGY_FORMAT_PARAM) or 'dot'
+        if fmt not in _TOPOLOGY_EXPORTERS:
+            valid = ', '.join(sorted(_TOPOLOGY_EXPORTERS))
+            raise AnsibleError(f"Invalid topology format {fmt}, it must be one of the following: {valid}")
 
-            for node, peers in control_nodes.items():
-                for peer in peers:
-                    f.write(f'            "{node}" -> "{peer}";\n')
+        try:
+            compress = boolean(args.get(_TOPOLOGY_COMPRESS_PARAM, False))
+        except TypeError as e:
+            raise AnsibleError(f"Invalid {_TOPOLOGY_COMPRESS_PARAM}: {e}")
 
-            f.write(
-                "        }\n"
-                "    }\n\n"
-            )
+        return fmt, compress
 
-            # Write out each execution node
-            for node in set(all_nodes) - set(control_nodes):
-                f.write(f'    "{node}";\n')
+    def write_topology_to_file(self, index, control_nodes, filename="mesh.dot", fmt='dot', compress=False):
 
-            for node, peers in all_nodes.items():
-                for peer in peers:
-                    f.write(f'    "{node}" -> "{peer}";\n')
+        if not filename:
+            return
+
+        exporter = _TOPOLOGY_EXPORTERS[fmt](index, control_nodes)
 
-            f.write("}\n")
+        with open(filename, mode='wb', buffering=_TOPOLOGY_BUFFER_SIZE) as raw:
+            stream = gzip.GzipFile(fileobj=raw, mode='wb') if compress else raw
+            with io.TextIOWrapper(stream, encoding='utf-8') as f:
+                exporter.write(f)
 
     def run(self, tmp=None, task_vars=None):
 
@@ -293,23 +713,36 @@ class ActionModule(ActionBase):
 
         super(ActionModule, self).run(tmp, task_vars)
 
+        # checked first, so that they cannot replace the error of a failed assertion below
+        topology_format, topology_compress = self.assert_topology_options(self._task.args)
+
         # generate a dict of peers connectivity
         control_nodes = self.generate_control_plane_topology(task_vars)
         all_nodes = self.connect_peers(task_vars)
         peers = self.deep_merge_dicts(control_nodes, all_nodes)
 
+        # an unchanged topology was already validated by a previous run
+        fingerprint_file = self._task.args.get(_FINGERPRINT_FILE_PARAM)
+        if fingerprint_file:
+            fingerprint_file = os.path.expanduser(fingerprint_file)
+        fingerprint = self.mesh_fingerprint(task_vars, peers)
+        validated = bool(fingerprint_file) and self.read_fingerprint(fingerprint_file) == fingerprint
+
+        index = MeshIndex(peers)
+
         try:
-            self.assert_no_dangling_peers(peers)
-            # detect cycles; fail gracefully if found
-            self.assert_no_self_peering(peers)
-            self.assert_no_2cycles(peers)
+            if not validated:
+                self.assert_no_dangling_peers(index)
+                # detect cycles; fail gracefully if found
+                self.assert_no_self_peering(index)
+                self.assert_no_2cycles(index)
 
-            # detect disconnected subgraphs
-            base_control = next(iter(control_nodes or [None]))  # pick an arbitrary control-plane node
-            self.assert_no_disconnected(peers, base_control)
+                # detect disconnected subgraphs
+                base_control = next(iter(control_nodes or [None]))  # pick an arbitrary control-plane node
+                self.assert_no_disconnected(index, base_control)
 
             # find the listener-disabled nodes
-            disabled = self.assert_autodisable_listener_without_incoming(task_vars, peers)
+            disabled = self.assert_autodisable_listener_without_incoming(task_vars, index)
 
             # create a skeleton return object and fill it in with peers and node_type
             data, deprovision = {}, {}
@@ -339,23 +772,37 @@ class ActionModule(ActionBase):
                 for group, members in task_vars['groups'].items()
             }
 
-            # ensure that no nodes are shared between automationcontroller and execution_nodes
-            self.assert_unique_group(task_vars)
+            if not validated:
+                # ensure that no nodes are shared between automationcontroller and execution_nodes
+                self.assert_unique_group(task_vars)
+
+                # ensure that there exists at least one hybrid or execution node
+                self.assert_some_execution_capable_nodes(data)
 
-            # ensure that there exists at least one hybrid or execution node
-            self.assert_some_execution_capable_nodes(data)
+                # ensure automationcontroller[0] has node_state=active for minimum quorum
+                self.assert_minimal_active_nodes(task_vars)
 
-            # ensure automationcontroller[0] has node_state=active for minimum quorum
-            self.assert_minimal_active_nodes(task_vars)
+                # ensure instance_group_* members are not control only
+                self.assert_control_only_nodes(task_vars, data)
 
-            # ensure instance_group_* members are not control only
-            self.assert_control_only_nodes(task_vars, data)
+                if fingerprint_file:
+                    self.write_fingerprint(fingerprint_file, fingerprint)
+
+            analysis = None
+            if boolean(self._task.args.get(_ANALYZE_MESH_PARAM, False), strict=False):
+                analysis = self.analyze_mesh(index, control_nodes)
 
         finally:
             # generate dot file if user expressed interest in doing so
             if _GENERATE_DOT_FILE_PARAM in self._task.args:
-                self.write_dot_graph_to_file(control_nodes, all_nodes,
-                                             self._task.args[_GENERATE_DOT_FILE_PARAM])
+                self.write_topology_to_file(
+                    index, control_nodes, self._task.args[_GENERATE_DOT_FILE_PARAM],
+                    fmt=topology_format, compress=topology_compress,
+                )
 
-        return dict(mesh=data, deprovision_mesh=deprovision,
-                    mesh_groups={group: members for group, members in groups.items() if members})
+        result = dict(mesh=data, deprovision_mesh=deprovision,
+                      mesh_groups={group: members for group, members in groups.items() if members},
+                      mesh_fingerprint=fingerprint, mesh_validation_skipped=validated)
+        if analysis is not None:
+            result['mesh_analysis'] = analysis
+        return result
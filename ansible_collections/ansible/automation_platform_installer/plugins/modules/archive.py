@@ -29,9 +29,19 @@ options:
     description:
       - The type of compression to use.
       - Support for xz was added in Ansible 2.5.
+      - C(zst) requires the zstandard Python library.
     type: str
-    choices: [ bz2, gz, tar, xz, zip ]
+    choices: [ bz2, gz, tar, xz, zip, zst ]
     default: gz
+  compression_workers:
+    description:
+      - Number of threads compressing the archive or file in parallel, for the C(bz2), C(gz), C(xz) and C(zst) formats.
+      - With more than one thread, the data is split into blocks of 4 MiB compressed independently, the way pigz and pixz do.
+        The result is a concatenation of gzip members, bzip2 or xz streams or zstd frames, which the usual tools decompress as a single file.
+      - Set to C(0) to use one thread per CPU.
+      - With the default of C(1) the data is compressed in a single stream, as it is written.
+    type: int
+    default: 1
   dest:
     description:
       - The file name of the destination archive. The parent directory must exists on the remote host.
@@ -53,12 +63,41 @@ options:
   remove:
     description:
       - Remove any added source files and trees after adding to archive.
+      - Cannot be used with I(reference_manifest).
     type: bool
     default: no
+  manifest:
+    description:
+      - Path of a JSON manifest recording the path, type, size, modification time and optionally checksum of every archive member.
+      - It describes all the source files, including the ones left out of a differential archive because of I(reference_manifest).
+      - When the manifest already exists, I(dest) exists, and none of the source files changed since the manifest was written,
+        the archive is not written again, RV(archived) is empty, and I(remove) does not remove anything.
+      - Only supported when creating an archive, not when compressing a single file.
+    type: path
+  reference_manifest:
+    description:
+      - Path of a manifest written by an earlier run through I(manifest).
+      - Only the files and directories which are new or changed since that run are archived.
+        Pass the manifest of a full archive to create differential archives, or the manifest of the previous run for incremental ones.
+      - Extracting the full archive and then the differential ones in order restores the new and changed source files.
+      - Extracting does not delete anything. The members removed since the reference are not in the archive,
+        they are returned in RV(removed) and recorded in the C(removed) list of I(manifest), and have to be deleted after extracting it.
+      - Only supported when creating an archive, not when compressing a single file.
+    type: path
+  manifest_checksum:
+    description:
+      - Checksum recorded in I(manifest) for every file, and compared to the one of I(reference_manifest).
+      - With C(none), a file is considered unchanged when its size and modification time are.
+      - Computing the checksums reads every source file once more.
+    type: str
+    choices: [ none, sha1, sha256 ]
+    default: none
 notes:
     - Requires tarfile, zipfile, gzip and bzip2 packages on target host.
     - Requires lzma or backports.lzma if using xz format.
-    - Can produce I(gzip), I(bzip2), I(lzma) and I(zip) compressed files or archives.
+    - Requires zstandard if using zst format.
+    - Can produce I(gzip), I(bzip2), I(lzma), I(zstd) and I(zip) compressed files or archives.
+    - Archives are compressed as they are written, the memory used does not depend on their size.
 seealso:
 - module: ansible.builtin.unarchive
 author:
@@ -120,6 +159,46 @@ EXAMPLES = r'''
     dest: /path/file.tar.gz
     format: gz
     force_archive: true
+
+- name: Create a full archive of /var/lib/awx and record its manifest
+  community.general.archive:
+    path: /var/lib/awx
+    dest: /backup/awx-full.tar.gz
+    manifest: /backup/awx-full.manifest.json
+
+- name: Archive only what changed since the full archive
+  community.general.archive:
+    path: /var/lib/awx
+    dest: /backup/awx-diff.tar.gz
+    reference_manifest: /backup/awx-full.manifest.json
+    manifest: /backup/awx-diff.manifest.json
+
+- name: Restore the full archive, then the differential one
+  ansible.builtin.unarchive:
+    src: "{{ item }}"
+    dest: /var/lib
+    remote_src: true
+  loop:
+    - /backup/awx-full.tar.gz
+    - /backup/awx-diff.tar.gz
+
+- name: Read the manifest of the differential archive
+  ansible.builtin.slurp:
+    src: /backup/awx-diff.manifest.json
+  register: awx_diff_manifest
+
+- name: Delete the files removed since the full archive
+  ansible.builtin.file:
+    path: "/var/lib/{{ item }}"
+    state: absent
+  loop: "{{ (awx_diff_manifest.content | b64decode | from_json).removed }}"
+
+- name: Create a zstd compressed archive of a directory on all CPUs
+  community.general.archive:
+    path: /path/to/foo
+    dest: /path/file.tar.zst
+    format: zst
+    compression_workers: 0
 '''
 
 RETURN = r'''
@@ -152,13 +231,26 @@ expanded_exclude_paths:
     description: The list of matching exclude paths from the exclude_path argument.
     type: list
     returned: always
+unchanged:
+    description: Number of members left out of the archive because they did not change since I(reference_manifest).
+    type: int
+    returned: when I(reference_manifest) is set
+removed:
+    description: Members of I(reference_manifest) which do not exist anymore.
+    type: list
+    elements: str
+    returned: when I(reference_manifest) is set
 '''
 
 import bz2
+import collections
 import glob
 import gzip
-import io
+import hashlib
+import json
 import os
+import stat
+import tempfile
 import re
 import shutil
 import tarfile
@@ -186,6 +278,25 @@ else:
         LZMA_IMP_ERR = format_exc()
         HAS_LZMA = False
 
+ZSTANDARD_IMP_ERR = None
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    ZSTANDARD_IMP_ERR = format_exc()
+    HAS_ZSTANDARD = False
+
+FUTURES_IMP_ERR = None
+try:
+    from concurrent.futures import ThreadPoolExecutor
+    HAS_FUTURES = True
+except ImportError:
+    FUTURES_IMP_ERR = format_exc()
+    HAS_FUTURES = False
+
+# size of the independently compressed blocks with compression_workers
+PARALLEL_BLOCK_SIZE = 4 * 1024 * 1024
+
 
 def to_b(s):
     return to_bytes(s, errors='surrogate_or_strict')
@@ -199,6 +310,168 @@ def to_na(s):
     return to_native(s, errors='surrogate_or_strict', encoding='ascii')
 
 
+def compress_block(fmt, data):
+    """
+    Compresses data into a complete gzip member, bzip2 or xz stream, or zstd frame.
+    The compressors release the GIL, so blocks are compressed in parallel on threads.
+    """
+    if fmt == 'gz':
+        return gzip.compress(data, compresslevel=9)
+    if fmt == 'bz2':
+        return bz2.compress(data)
+    if fmt == 'xz':
+        return lzma.compress(data)
+    if fmt == 'zst':
+        return zstandard.ZstdCompressor().compress(data)
+    raise OSError("Invalid format")
+
+
+class ParallelCompressor(object):
+    """
+    Write-only file object which compresses the data written to it in
+    independent blocks on a pool of threads, and writes the compressed
+    blocks to fileobj in order. At most two blocks per thread are held in
+    memory at any time.
+    """
+
+    def __init__(self, fileobj, fmt, workers, block_size=None):
+        self._fileobj = fileobj
+        self._fmt = fmt
+        self._block_size = block_size or PARALLEL_BLOCK_SIZE
+        self._chunks = []
+        self._buffered = 0
+        self._blocks = 0
+        self._pending = collections.deque()
+        self._max_pending = 2 * workers
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._buffered += len(data)
+        if self._buffered >= self._block_size:
+            self._submit()
+        return len(data)
+
+    def _submit(self):
+        block = b''.join(self._chunks)
+        self._chunks = []
+        self._buffered = 0
+        self._blocks += 1
+        self._pending.append(self._pool.submit(compress_block, self._fmt, block))
+        while len(self._pending) >= self._max_pending:
+            self._fileobj.write(self._pending.popleft().result())
+
+    def close(self):
+        if self._pool is None:
+            return
+        try:
+            # an empty input still has to produce a valid compressed file
+            if self._buffered or not self._blocks:
+                self._submit()
+            while self._pending:
+                self._fileobj.write(self._pending.popleft().result())
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+            self._fileobj.close()
+
+
+def open_compressor(b_dest, fmt, workers):
+    """
+    Opens b_dest to write data compressed with fmt to it, as a single stream
+    or in parallel on workers threads.
+    Returns the file object to write to, and the underlying file if it has
+    to be closed separately.
+    """
+    n_dest = to_na(b_dest)
+    if workers > 1:
+        return ParallelCompressor(open(n_dest, 'wb'), fmt, workers), None
+    if fmt == 'gz':
+        return gzip.open(n_dest, 'wb'), None
+    if fmt == 'bz2':
+        return bz2.BZ2File(n_dest, 'wb'), None
+    if fmt == 'xz':
+        return lzma.LZMAFile(n_dest, 'wb'), None
+    if fmt == 'zst':
+        f_raw = open(n_dest, 'wb')
+        return zstandard.ZstdCompressor().stream_writer(f_raw), f_raw
+    raise OSError("Invalid format")
+
+
+def collect_members(b_archive_paths, b_arcroot):
+    """
+    Yields the (path, arcname, is_file) of everything to add to the archive,
+    in the order it is added. Directories given in the paths are recursed
+    into, but not added themselves.
+    """
+    b_sep = to_b(os.sep)
+    b_match_root = re.compile(br'^%s' % re.escape(b_arcroot))
+    for b_path in b_archive_paths:
+        if os.path.isdir(b_path):
+            for b_dirpath, b_dirnames, b_filenames in os.walk(b_path, topdown=True):
+                if not b_dirpath.endswith(b_sep):
+                    b_dirpath += b_sep
+
+                for b_dirname in b_dirnames:
+                    b_fullpath = b_dirpath + b_dirname
+                    yield b_fullpath, to_n(b_match_root.sub(b'', b_fullpath)), False
+
+                for b_filename in b_filenames:
+                    b_fullpath = b_dirpath + b_filename
+                    yield b_fullpath, to_n(b_match_root.sub(b'', b_fullpath)), True
+        else:
+            yield b_path, to_n(b_match_root.sub(b'', b_path)), True
+
+
+def file_checksum(b_path, algorithm):
+    digest = hashlib.new(algorithm)
+    with open(b_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_entry(b_path, algorithm):
+    """
+    Returns the [type, size, mtime, checksum] manifest entry of a path, or
+    None if it vanished meanwhile.
+    """
+    try:
+        st = os.lstat(b_path)
+    except OSError:
+        return None
+    if stat.S_ISDIR(st.st_mode):
+        return ['d', 0, st.st_mtime, None]
+    if stat.S_ISLNK(st.st_mode):
+        return ['l', 0, st.st_mtime, to_n(os.readlink(b_path))]
+    checksum = None
+    if algorithm != 'none' and stat.S_ISREG(st.st_mode):
+        checksum = file_checksum(b_path, algorithm)
+    return ['f', st.st_size, st.st_mtime, checksum]
+
+
+def entry_changed(entry, reference):
+    if reference is None or entry[0] != reference[0]:
+        return True
+    if entry[0] == 'd':
+        return False
+    if entry[3] is not None and reference[3] is not None:
+        return entry[3] != reference[3] or entry[1] != reference[1]
+    return entry[1:3] != reference[1:3]
+
+
+def read_manifest(b_path):
+    with open(b_path, 'rb') as f:
+        return json.loads(to_native(f.read(), errors='surrogate_or_strict'))
+
+
+def write_manifest(b_path, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(b_path) or b'.', prefix=b'.manifest-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(to_b(json.dumps(manifest, sort_keys=True)))
+    os.rename(tmp_path, b_path)
+
+
 def expand_paths(paths):
     expanded_path = []
     is_globby = False
@@ -218,12 +491,17 @@ def main():
     module = AnsibleModule(
         argument_spec=dict(
             path=dict(type='list', elements='path', required=True),
-            format=dict(type='str', default='gz', choices=['bz2', 'gz', 'tar', 'xz', 'zip']),
+            format=dict(type='str', default='gz', choices=['bz2', 'gz', 'tar', 'xz', 'zip', 'zst']),
+            compression_workers=dict(type='int', default=1),
             dest=dict(type='path'),
             exclude_path=dict(type='list', elements='path'),
             force_archive=dict(type='bool', default=False),
             remove=dict(type='bool', default=False),
+            manifest=dict(type='path'),
+            reference_manifest=dict(type='path'),
+            manifest_checksum=dict(type='str', default='none', choices=['none', 'sha1', 'sha256']),
         ),
+        mutually_exclusive=[('remove', 'reference_manifest')],
         add_file_common_args=True,
         supports_check_mode=True,
     )
@@ -239,7 +517,12 @@ def main():
     fmt = params['format']
     b_fmt = to_b(fmt)
     force_archive = params['force_archive']
+    workers = params['compression_workers']
+    manifest = params['manifest']
+    reference_manifest = params['reference_manifest']
+    checksum = params['manifest_checksum']
     changed = False
+    extra = {}
     state = 'absent'
 
     # Simple or archive file compression (inapplicable with 'zip' since it's always an archive)
@@ -251,6 +534,18 @@ def main():
                          exception=LZMA_IMP_ERR)
         module.fail_json(msg="lzma or backports.lzma is required when using xz format.")
 
+    if not HAS_ZSTANDARD and fmt == 'zst':
+        module.fail_json(msg=missing_required_lib("zstandard", reason="when using zst format"),
+                         exception=ZSTANDARD_IMP_ERR)
+
+    if workers < 0:
+        module.fail_json(msg="compression_workers cannot be negative.")
+    if workers == 0:
+        workers = (os.cpu_count() or 1) if PY3 else 1
+    if workers > 1 and not (PY3 and HAS_FUTURES):
+        module.fail_json(msg=missing_required_lib("Python 3", reason="when using compression_workers"),
+                         exception=FUTURES_IMP_ERR)
+
     b_expanded_paths, globby = expand_paths(paths)
     if not b_expanded_paths:
         return module.fail_json(
@@ -279,6 +574,17 @@ def main():
     if archive and not b_dest:
         module.fail_json(dest=dest, path=', '.join(paths), msg='Error, must specify "dest" when archiving multiple files or trees')
 
+    if not archive and (manifest or reference_manifest):
+        module.fail_json(path=', '.join(paths), msg='Error, manifest and reference_manifest are only supported when archiving, see force_archive')
+
+    b_manifest = to_b(manifest) if manifest else None
+    reference = None
+    if reference_manifest:
+        try:
+            reference = read_manifest(to_b(reference_manifest))['members']
+        except Exception as e:
+            module.fail_json(msg='Error reading reference manifest %s: %s' % (reference_manifest, to_native(e)))
+
     b_sep = to_b(os.sep)
 
     b_archive_paths = []
@@ -320,7 +626,7 @@ def main():
     # No source files were found but the named archive exists: are we 'compress' or 'archive' now?
     if len(b_missing) == len(b_expanded_paths) and b_dest and os.path.exists(b_dest):
         # Just check the filename to know if it's an archive or simple compressed file
-        if re.search(br'\.(tar|tar\.(gz|bz2|xz)|tgz|tbz2|zip)$', os.path.basename(b_dest), re.IGNORECASE):
+        if re.search(br'\.(tar|tar\.(gz|bz2|xz|zst)|tgz|tbz2|zip)$', os.path.basename(b_dest), re.IGNORECASE):
             state = 'archive'
         else:
             state = 'compress'
@@ -335,14 +641,45 @@ def main():
             # SOME source files were found, but not all of them
             state = 'incomplete'
 
-        archive = None
+        arcfile = f_out = f_raw = None
         size = 0
         errors = []
+        skip = False
 
         if os.path.lexists(b_dest):
             size = os.path.getsize(b_dest)
 
-        if state != 'archive':
+        # Without a manifest the members are streamed from the walk into the archive
+        members = collect_members(b_archive_paths, b_arcroot)
+        if (b_manifest or reference is not None) and state != 'archive':
+            entries = {}
+            members = list(members)
+            for b_fullpath, n_arcname, is_file in members:
+                entry = manifest_entry(b_fullpath, checksum)
+                if entry is not None:
+                    entries[n_arcname] = entry
+            new_manifest = dict(version=1, checksum=checksum, members=entries)
+
+            if reference is not None:
+                members = [m for m in members if m[1] in entries and entry_changed(entries[m[1]], reference.get(m[1]))]
+                removed = sorted(name for name in reference if name not in entries)
+                new_manifest['removed'] = removed
+                extra.update(unchanged=len(entries) - len(members), removed=removed)
+
+            if b_manifest and os.path.exists(b_manifest) and os.path.lexists(b_dest):
+                try:
+                    previous = read_manifest(b_manifest)
+                except Exception:
+                    previous = None
+                # nothing changed since the archive was written
+                skip = previous == json.loads(json.dumps(new_manifest))
+
+        if skip:
+            # the archive is up to date, nothing was added to it this time
+            if state != 'incomplete':
+                state = 'archive'
+
+        elif state != 'archive':
             if check_mode:
                 changed = True
 
@@ -357,65 +694,28 @@ def main():
                             True
                         )
 
-                    # Easier compression using tarfile module
-                    elif fmt == 'gz' or fmt == 'bz2':
-                        arcfile = tarfile.open(to_na(b_dest), 'w|' + fmt)
-
-                    # python3 tarfile module allows xz format but for python2 we have to create the tarfile
-                    # in memory and then compress it with lzma.
-                    elif fmt == 'xz':
-                        arcfileIO = io.BytesIO()
-                        arcfile = tarfile.open(fileobj=arcfileIO, mode='w')
-
-                    # Or plain tar archiving
+                    # Plain tar archiving
                     elif fmt == 'tar':
                         arcfile = tarfile.open(to_na(b_dest), 'w')
 
-                    b_match_root = re.compile(br'^%s' % re.escape(b_arcroot))
-                    for b_path in b_archive_paths:
-                        if os.path.isdir(b_path):
-                            # Recurse into directories
-                            for b_dirpath, b_dirnames, b_filenames in os.walk(b_path, topdown=True):
-                                if not b_dirpath.endswith(b_sep):
-                                    b_dirpath += b_sep
-
-                                for b_dirname in b_dirnames:
-                                    b_fullpath = b_dirpath + b_dirname
-                                    n_fullpath = to_na(b_fullpath)
-                                    n_arcname = to_native(b_match_root.sub(b'', b_fullpath), errors='surrogate_or_strict')
-
-                                    try:
-                                        if fmt == 'zip':
-                                            arcfile.write(n_fullpath, n_arcname)
-                                        else:
-                                            arcfile.add(n_fullpath, n_arcname, recursive=False)
-
-                                    except Exception as e:
-                                        errors.append('%s: %s' % (n_fullpath, to_native(e)))
-
-                                for b_filename in b_filenames:
-                                    b_fullpath = b_dirpath + b_filename
-                                    n_fullpath = to_na(b_fullpath)
-                                    n_arcname = to_n(b_match_root.sub(b'', b_fullpath))
-
-                                    try:
-                                        if fmt == 'zip':
-                                            arcfile.write(n_fullpath, n_arcname)
-                                        else:
-                                            arcfile.add(n_fullpath, n_arcname, recursive=False)
-
-                                        b_successes.append(b_fullpath)
-                                    except Exception as e:
-                                        errors.append('Adding %s: %s' % (to_native(b_path), to_native(e)))
-                        else:
-                            path = to_na(b_path)
-                            arcname = to_n(b_match_root.sub(b'', b_path))
+                    # Or a tar stream written through the compressor, so that
+                    # the archive is never held in memory
+                    else:
+                        f_out, f_raw = open_compressor(b_dest, fmt, workers)
+                        arcfile = tarfile.open(fileobj=f_out, mode='w|')
+
+                    for b_fullpath, n_arcname, is_file in members:
+                        n_fullpath = to_na(b_fullpath)
+                        try:
                             if fmt == 'zip':
-                                arcfile.write(path, arcname)
+                                arcfile.write(n_fullpath, n_arcname)
                             else:
-                                arcfile.add(path, arcname, recursive=False)
+                                arcfile.add(n_fullpath, n_arcname, recursive=False)
 
-                            b_successes.append(b_path)
+                            if is_file:
+                                b_successes.append(b_fullpath)
+                        except Exception as e:
+                            errors.append('Adding %s: %s' % (n_fullpath, to_native(e)))
 
                 except Exception as e:
                     expanded_fmt = 'zip' if fmt == 'zip' else ('tar.' + fmt)
@@ -427,16 +727,21 @@ def main():
                 if arcfile:
                     arcfile.close()
                     state = 'archive'
-
-                if fmt == 'xz':
-                    with lzma.open(b_dest, 'wb') as f:
-                        f.write(arcfileIO.getvalue())
-                    arcfileIO.close()
+                if f_out:
+                    f_out.close()
+                if f_raw:
+                    f_raw.close()
 
                 if errors:
                     module.fail_json(msg='Errors when writing archive at %s: %s' % (dest, '; '.join(errors)))
 
-        if state in ['archive', 'incomplete'] and remove:
+                if b_manifest:
+                    try:
+                        write_manifest(b_manifest, new_manifest)
+                    except (IOError, OSError) as e:
+                        module.fail_json(msg='Error writing manifest %s: %s' % (manifest, to_native(e)))
+
+        if state in ['archive', 'incomplete'] and remove and not skip:
             for b_path in b_successes:
                 try:
                     if os.path.isdir(b_path):
@@ -457,7 +762,8 @@ def main():
                 module.fail_json(dest=dest, msg='Error deleting some source files: ', files=errors)
 
         # Rudimentary check: If size changed then file changed. Not perfect, but easy.
-        if not check_mode and os.path.getsize(b_dest) != size:
+        # Archives written again from an updated manifest always changed.
+        if not check_mode and not skip and (os.path.getsize(b_dest) != size or b_manifest):
             changed = True
 
         if b_successes and state != 'incomplete':
@@ -481,7 +787,7 @@ def main():
                     changed = True
             else:
                 size = 0
-                f_in = f_out = arcfile = None
+                f_in = f_out = f_raw = arcfile = None
 
                 if os.path.lexists(b_dest):
                     size = os.path.getsize(b_dest)
@@ -506,18 +812,8 @@ def main():
                         arcfile.close()
                     else:
                         f_in = open(b_path, 'rb')
-
-                        n_dest = to_na(b_dest)
-                        if fmt == 'gz':
-                            f_out = gzip.open(n_dest, 'wb')
-                        elif fmt == 'bz2':
-                            f_out = bz2.BZ2File(n_dest, 'wb')
-                        elif fmt == 'xz':
-                            f_out = lzma.LZMAFile(n_dest, 'wb')
-                        else:
-                            raise OSError("Invalid format")
-
-                        shutil.copyfileobj(f_in, f_out)
+                        f_out, f_raw = open_compressor(b_dest, fmt, workers)
+                        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
 
                     b_successes.append(b_path)
 
@@ -534,6 +830,8 @@ def main():
                     f_in.close()
                 if f_out:
                     f_out.close()
+                if f_raw:
+                    f_raw.close()
 
                 # Rudimentary check: If size changed then file changed. Not perfect, but easy.
                 if os.path.getsize(b_dest) != size:
@@ -571,6 +869,7 @@ def main():
         missing=[to_n(p) for p in b_missing],
         expanded_paths=[to_n(p) for p in b_expanded_paths],
         expanded_exclude_paths=[to_n(p) for p in b_expanded_exclude_paths],
+        **extra
     )
 
 
@@ -20,8 +20,35 @@ options:
   generate_dot_file:
     description:
       - Output a GraphViz dot-format file that can be rendered to show the graph of the mesh network.
+      - The file format can be changed with topology_format.
+      - Every node is annotated with its in_degree, out_degree and the number of hops to the closest control node.
     type: str
     default: mesh.dot
+  topology_format:
+    description:
+      - Format of the topology file written to generate_dot_file.
+      - C(json) is a compact adjacency list, where nodes are referenced by their index in the C(nodes) list.
+    type: str
+    choices: [dot, graphml, json]
+    default: dot
+  topology_compress:
+    description:
+      - Compress the topology file with gzip.
+    type: bool
+    default: false
+  analyze_mesh:
+    description:
+      - Report the articulation points and bridges of the mesh, and for every non-control node its hop count
+        to the closest control node and the nodes whose loss would cut it off from the control plane.
+      - The report is returned as mesh_analysis.
+    type: bool
+    default: false
+  fingerprint_file:
+    description:
+      - Path to a file on the controller holding the fingerprint of the last mesh topology that passed validation.
+      - When the current topology has the same fingerprint, the mesh sanity checks are skipped.
+      - The file is written after every successful validation.
+    type: str
 author:
   - Ansible Controller Team
   - Sarabraj Singh
@@ -40,6 +67,25 @@ EXAMPLES = """
   ansible.automation_platform_installer.calculate_mesh:
     generate_dot_file: /foo/bar/baz.dot
   run_once: true
+
+- name: Output a gzipped GraphML file
+  ansible.automation_platform_installer.calculate_mesh:
+    generate_dot_file: /foo/bar/baz.graphml.gz
+    topology_format: graphml
+    topology_compress: true
+  run_once: true
+
+- name: Find the single points of failure of the mesh
+  ansible.automation_platform_installer.calculate_mesh:
+    analyze_mesh: true
+  register: mesh
+  run_once: true
+
+- name: Skip the mesh sanity checks when the topology did not change
+  ansible.automation_platform_installer.calculate_mesh:
+    fingerprint_file: ~/.ansible/mesh.fingerprint
+  register: mesh
+  run_once: true
 """
 
 RETURN = """
@@ -60,4 +106,55 @@ mesh:
     node3:
       node_type: hybrid
       peers:
+mesh_fingerprint:
+  description: SHA-256 digest of the mesh topology and the host variables the sanity checks depend on.
+  returned: success
+  type: str
+mesh_validation_skipped:
+  description: Whether the sanity checks were skipped because fingerprint_file matched the current topology.
+  returned: success
+  type: bool
+mesh_analysis:
+  description: Reachability and redundancy report of the mesh, links are considered bidirectional.
+  returned: when analyze_mesh is true
+  type: dict
+  contains:
+    articulation_points:
+      description: Nodes whose loss would split the mesh.
+      type: list
+      elements: str
+    bridges:
+      description: Links whose loss would split the mesh.
+      type: list
+      elements: list
+    nodes:
+      description:
+        - Per non-control node C(hops) to the closest control node, C(single_points_of_failure) that would cut it off
+          from the control plane, and the number of node-disjoint C(disjoint_paths) back to it, capped at 2.
+      type: dict
+    max_hops:
+      description: Largest hop count of any node.
+      type: int
+    min_disjoint_paths:
+      description: Smallest disjoint_paths of any node.
+      type: int
+  sample:
+    articulation_points:
+      - hop1
+    bridges:
+      - [exec1, hop1]
+    nodes:
+      hop1:
+        hops: 1
+        disjoint_paths: 1
+        single_points_of_failure:
+          - node1
+      exec1:
+        hops: 2
+        disjoint_paths: 1
+        single_points_of_failure:
+          - node1
+          - hop1
+    max_hops: 2
+    min_disjoint_paths: 1
 """
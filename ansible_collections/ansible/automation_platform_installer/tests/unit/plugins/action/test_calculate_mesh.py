@@ -0,0 +1,298 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import gzip
+import io
+import json
+import os
+import re
+
+from unittest.mock import MagicMock
+from xml.etree import ElementTree
+
+import pytest
+
+from ansible.errors import AnsibleError
+
+from ansible_collections.ansible.automation_platform_installer.plugins.action.calculate_mesh import ActionModule, MeshIndex
+
+
+def make_action(**args):
+    task = MagicMock(args=args, async_val=0, check_mode=False)
+    return ActionModule(task=task, connection=MagicMock(), play_context=MagicMock(), loader=None, templar=None,
+                        shared_loader_obj=None)
+
+
+def inventory(controllers=('c1', 'c2'), execution=None, groups=None, **hostvars):
+    """
+    Task vars of an inventory with the given controllers, and execution
+    nodes given as a dict of their host variables. The host variables of
+    any host can be given as keyword arguments.
+    """
+    execution = execution if execution is not None else {'e1': dict(peers='automationcontroller')}
+    task_vars = dict(
+        groups={'automationcontroller': list(controllers), 'execution_nodes': list(execution)},
+        hostvars=dict((host, {}) for host in controllers),
+    )
+    task_vars['groups'].update(groups or {})
+    task_vars['hostvars'].update((host, dict(host_vars)) for host, host_vars in execution.items())
+    for host, host_vars in hostvars.items():
+        task_vars['hostvars'].setdefault(host, {}).update(host_vars)
+    return task_vars
+
+
+def run(task_vars, **args):
+    return make_action(**args).run(task_vars=task_vars)
+
+
+def test_invalid_topology_options(tmp_path):
+    path = str(tmp_path / 'mesh.svg')
+    # the mesh has a two-way link, but the options are checked first
+    task_vars = inventory(c1=dict(peers='e1'))
+
+    with pytest.raises(AnsibleError, match='Invalid topology format svg'):
+        run(task_vars, generate_dot_file=path, topology_format='svg')
+    with pytest.raises(AnsibleError, match='Invalid topology_compress'):
+        run(task_vars, generate_dot_file=path, topology_compress='maybe')
+    assert not os.path.exists(path)
+
+
+def test_failed_assertion_is_not_hidden(tmp_path):
+    path = str(tmp_path / 'mesh.json')
+
+    with pytest.raises(AnsibleError, match='Two-way link'):
+        run(inventory(c1=dict(peers='e1')), generate_dot_file=path, topology_format='json')
+    # the topology is written all the same, to look into the failure
+    assert os.path.exists(path)
+
+
+def test_mesh():
+    result = run(inventory(execution={'e1': dict(peers='automationcontroller'), 'h1': dict(node_type='hop', peers='c2'),
+                                      'e2': dict(peers=['h1'])}))
+
+    assert result['mesh']['c1']['peers'] == ['c2']
+    assert result['mesh']['e1']['peers'] == ['c1', 'c2']
+    assert result['mesh']['e2']['peers'] == ['h1']
+    assert result['mesh']['h1']['node_type'] == 'hop'
+    assert result['mesh']['c1']['node_type'] == 'hybrid'
+    assert result['deprovision_mesh'] == {}
+    assert not result['mesh_validation_skipped']
+
+
+@pytest.mark.parametrize('task_vars, message', [
+    (inventory(e1=dict(peers='c1,ghost')), "peer to a node that doesn't exist: ghost"),
+    (inventory(e1=dict(peers='e1')), 'Cannot have nodes peering to themselves: e1'),
+    (inventory(c2=dict(peers='e1')), r'Two-way link\(s\) detected: \[(c2|e1)\] <-> \[(c2|e1)\]'),
+    (inventory(execution={'e1': dict(peers='c1'), 'e2': {}, 'e3': dict(peers='e2')}),
+     'do not have a path back to the control plane: e2, e3'),
+    (inventory(controllers=()), 'There were no automationcontroller nodes found'),
+    (inventory(c1=dict(receptor_listener=False)), 'listener turned off that have incoming peers: c1'),
+    (inventory(groups={'instance_group_a': ['e1', 'c1']}, c1=dict(node_type='control')),
+     "The host 'c1' is a member of the group 'instance_group_a', its node_type must be one of these types"),
+    (inventory(groups={'instance_group_a': ['other']}, other={}), "The host 'other' is not present in either"),
+])
+def test_assertions(task_vars, message):
+    with pytest.raises(AnsibleError, match=message):
+        run(task_vars)
+
+
+def test_control_only_nodes():
+    task_vars = inventory(groups={'instance_group_a': ['e1', 'c1'], 'instance_group_b': ['c2', 'gone']},
+                          c1=dict(node_type='hybrid'), c2=dict(node_type='control'), gone=dict(node_state='deprovision'))
+    # deprovisioned members are left out
+    with pytest.raises(AnsibleError, match="'c2' is a member of the group 'instance_group_b'"):
+        run(task_vars)
+
+    task_vars['hostvars']['c2']['node_type'] = 'hybrid'
+    assert run(task_vars)['mesh_groups']['instance_group_b'] == ['c2']
+
+
+def test_listener_autodisable():
+    result = run(inventory(execution={'e1': dict(peers='c1'), 'e2': dict(peers='c1', receptor_listener=True)}))
+
+    # nodes without incoming peers only listen if told so
+    assert result['mesh']['e1']['receptor_listener'] is False
+    assert result['mesh']['e2']['receptor_listener'] is True
+    assert result['mesh']['c1']['receptor_listener'] is True
+    assert result['mesh']['c2']['receptor_listener'] is True
+
+
+@pytest.fixture
+def fingerprint_file(tmp_path, monkeypatch):
+    # counts the validations actually done
+    calls = []
+    assert_no_disconnected = ActionModule.assert_no_disconnected
+    monkeypatch.setattr(ActionModule, 'assert_no_disconnected',
+                        lambda self, *args: calls.append(args) or assert_no_disconnected(self, *args))
+
+    def validated(task_vars):
+        count = len(calls)
+        result = run(task_vars, fingerprint_file=str(tmp_path / 'mesh.sha256'))
+        assert result['mesh_validation_skipped'] == (len(calls) == count)
+        return result['mesh_validation_skipped']
+    return validated
+
+
+def test_fingerprint_skips_validation(fingerprint_file):
+    assert not fingerprint_file(inventory())
+    assert fingerprint_file(inventory())
+    # variables the assertions do not look at do not matter
+    assert fingerprint_file(inventory(e1=dict(receptor_log_level='debug')))
+
+
+@pytest.mark.parametrize('task_vars', [
+    inventory(e1=dict(node_state='iso')),
+    inventory(e1=dict(peers='c1')),
+    inventory(groups={'instance_group_a': ['e1']}),
+    inventory(execution={'e1': dict(peers='automationcontroller'), 'e2': dict(peers='e1')}),
+])
+def test_fingerprint_changes(fingerprint_file, task_vars):
+    assert not fingerprint_file(inventory())
+    assert not fingerprint_file(task_vars)
+    assert fingerprint_file(task_vars)
+
+
+def test_fingerprint_not_written_on_failure(fingerprint_file):
+    task_vars = inventory(c2=dict(peers='e1'))
+    for dummy in range(2):
+        with pytest.raises(AnsibleError, match='Two-way link'):
+            fingerprint_file(task_vars)
+
+
+# c1 <- e1, c2 <- h1 <- e2, and the control plane link c1 -> c2
+EXPORTED_EDGES = {('c1', 'c2'), ('e1', 'c1'), ('h1', 'c2'), ('e2', 'h1')}
+EXPORTED_NODES = {
+    'c1': dict(control=True, in_degree=1, out_degree=1, hops=0),
+    'c2': dict(control=True, in_degree=2, out_degree=0, hops=0),
+    'e1': dict(control=False, in_degree=0, out_degree=1, hops=1),
+    'h1': dict(control=False, in_degree=1, out_degree=1, hops=1),
+    'e2': dict(control=False, in_degree=0, out_degree=1, hops=2),
+}
+
+
+def parse_dot(text):
+    nodes, edges = {}, set()
+    control = text[:text.index('\n    }\n')]
+    for name, attrs in re.findall(r'^ *"([^"]+)" \[([^\]]*)\];$', text, re.M):
+        node = dict((k, int(v)) for k, v in (attr.split('=') for attr in attrs.split(', ')))
+        node['control'] = '"%s" [' % name in control
+        nodes[name] = node
+    for source, target in re.findall(r'^ *"([^"]+)" -> "([^"]+)";$', text, re.M):
+        edges.add((source, target))
+    assert text.startswith('strict digraph "" {') and text.endswith('}\n')
+    return nodes, edges
+
+
+def parse_graphml(text):
+    ns = {'g': 'http://graphml.graphdrawing.org/xmlns'}
+    graph = ElementTree.fromstring(text.encode('utf-8')).find('g:graph', ns)
+    nodes = {}
+    for node in graph.findall('g:node', ns):
+        data = dict((d.get('key'), d.text) for d in node.findall('g:data', ns))
+        nodes[node.get('id')] = dict((k, v == 'true' if k == 'control' else int(v)) for k, v in data.items())
+    edges = set((edge.get('source'), edge.get('target')) for edge in graph.findall('g:edge', ns))
+    return nodes, edges
+
+
+def parse_json(text):
+    doc = json.loads(text)
+    names = doc['nodes']
+    nodes = dict((name, dict(control=i in doc['control'], in_degree=doc['in_degree'][i],
+                             out_degree=doc['out_degree'][i], hops=doc['hops'][i]))
+                 for i, name in enumerate(names))
+    edges = set((names[i], names[j]) for i, peers in enumerate(doc['peers']) for j in peers)
+    return nodes, edges
+
+
+@pytest.mark.parametrize('compress', [False, True])
+@pytest.mark.parametrize('fmt, parse', [('dot', parse_dot), ('graphml', parse_graphml), ('json', parse_json)])
+def test_topology_export(tmp_path, fmt, parse, compress):
+    path = str(tmp_path / 'mesh')
+    run(inventory(execution={'e1': dict(peers='c1'), 'h1': dict(node_type='hop', peers='c2'), 'e2': dict(peers='h1')}),
+        generate_dot_file=path, topology_format=fmt, topology_compress=compress)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.startswith(b'\x1f\x8b') == compress
+    if compress:
+        data = gzip.GzipFile(fileobj=io.BytesIO(data)).read()
+
+    nodes, edges = parse(data.decode('utf-8'))
+    assert nodes == EXPORTED_NODES
+    assert edges == EXPORTED_EDGES
+
+
+def analyze(peers, control_nodes):
+    peers = dict((node, set(targets)) for node, targets in peers.items())
+    return make_action().analyze_mesh(MeshIndex(peers), control_nodes)
+
+
+def node(hops, *spof):
+    return dict(hops=hops, disjoint_paths=1 if spof else 2, single_points_of_failure=list(spof))
+
+
+def test_analyze_chain():
+    analysis = analyze({'c': [], 'a': ['c'], 'b': ['a'], 'd': ['b']}, ['c'])
+
+    assert analysis == dict(
+        articulation_points=['a', 'b'],
+        bridges=[['a', 'b'], ['a', 'c'], ['b', 'd']],
+        nodes=dict(a=node(1, 'c'), b=node(2, 'c', 'a'), d=node(3, 'c', 'a', 'b')),
+        max_hops=3,
+        min_disjoint_paths=1,
+    )
+
+
+def test_analyze_ring():
+    analysis = analyze({'c1': ['c2'], 'c2': [], 'e1': ['c1'], 'e2': ['e1', 'c2']}, ['c1', 'c2'])
+
+    assert analysis == dict(
+        articulation_points=[],
+        bridges=[],
+        nodes=dict(e1=node(1), e2=node(1)),
+        max_hops=1,
+        min_disjoint_paths=2,
+    )
+
+
+def test_analyze_bridged_rings():
+    # the rings c1, c2, a1 and b1, b2, b3, linked by a1 <- b1
+    analysis = analyze({'c1': ['c2'], 'c2': [], 'a1': ['c1', 'c2'],
+                        'b1': ['b2', 'a1'], 'b2': ['b3'], 'b3': ['b1']}, ['c1', 'c2'])
+
+    assert analysis == dict(
+        articulation_points=['a1', 'b1'],
+        bridges=[['a1', 'b1']],
+        nodes=dict(a1=node(1), b1=node(2, 'a1'), b2=node(3, 'a1', 'b1'), b3=node(3, 'a1', 'b1')),
+        max_hops=3,
+        min_disjoint_paths=1,
+    )
+
+
+def test_analyze_disjoint_paths_to_controllers():
+    # x reaches c1 through h1 and h3, and c2 through h2; the controllers are not linked,
+    # so the mesh has articulation points, but none of them cuts x off from the control plane
+    analysis = analyze({'c1': [], 'c2': [], 'h1': ['c1'], 'h2': ['c2'], 'h3': ['c1'],
+                        'x': ['h1', 'h2', 'h3'], 'y': ['x'], 'lost': []}, ['c1', 'c2'])
+
+    assert analysis['articulation_points'] == ['h2', 'x']
+    assert analysis['bridges'] == [['c2', 'h2'], ['h2', 'x'], ['x', 'y']]
+    assert analysis['nodes'] == dict(
+        h1=node(1), h2=node(1), h3=node(1),
+        # three disjoint paths are reported as two
+        x=node(2),
+        y=node(3, 'x'),
+        lost=dict(hops=-1, disjoint_paths=0, single_points_of_failure=[]),
+    )
+    assert analysis['max_hops'] == 3
+    assert analysis['min_disjoint_paths'] == 0
+
+
+def test_analyze_from_run():
+    result = run(inventory(execution={'e1': dict(peers='c1'), 'e2': dict(peers='e1')}), analyze_mesh=True)
+
+    # a node linked to a single controller is cut off when that one is lost
+    assert result['mesh_analysis']['nodes'] == dict(e1=node(1, 'c1'), e2=node(2, 'c1', 'e1'))
+    assert 'mesh_analysis' not in run(inventory())
@@ -0,0 +1,24 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible_collections.ansible.automation_platform_installer.plugins.filter.mesh_report import do_mesh_report
+
+
+def test_receptorctl_loop_results():
+    cmd = ['receptorctl', '--socket', '/run/receptor.sock', 'ping', 'node', '--count', '1']
+    task_output = dict(changed=True, results=[
+        dict(cmd=cmd, item='host1', stdout='Reply from node1 in 1ms'),
+        dict(cmd=cmd, item='host2', stdout='Error: no route to node'),
+    ])
+
+    assert do_mesh_report(task_output) == dict(mesh_successful_pings=['host1'], mesh_failed_pings=['host2'])
+
+
+def test_receptor_mesh_ping_result():
+    latency = dict(host1=dict(samples=1, min=1.0, max=1.0, mean=1.0, p50=1.0, p95=1.0))
+    task_output = dict(changed=False, mesh_successful_pings=['host1'], mesh_failed_pings=['host2'],
+                       mesh_ping_latency=latency, mesh_ping_errors=dict(host2='Error: no route to node'))
+
+    assert do_mesh_report(task_output) == dict(mesh_successful_pings=['host1'], mesh_failed_pings=['host2'], mesh_ping_latency=latency)
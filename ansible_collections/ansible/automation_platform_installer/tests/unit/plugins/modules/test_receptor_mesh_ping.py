@@ -0,0 +1,120 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import stat
+import sys
+
+import pytest
+
+from ansible_collections.ansible.automation_platform_installer.plugins.modules import receptor_mesh_ping
+from ansible_collections.ansible.automation_platform_installer.tests.unit.plugins.modules.utils import run_module
+
+
+# Behaves like "receptorctl --socket <socket> ping <node> --count <count>" according to
+# the behaviour of the node in behaviour.json, and logs every call.
+FAKE_RECEPTORCTL = '''#!%s
+import json, os, sys, time
+args = sys.argv[1:]
+node, count = args[3], int(args[5])
+here = os.path.dirname(os.path.abspath(__file__))
+behaviour = json.load(open(os.path.join(here, 'behaviour.json'))).get(node, {})
+log = os.path.join(here, 'calls.log')
+attempt = 0
+if os.path.exists(log):
+    attempt = sum(1 for line in open(log) if json.loads(line)['node'] == node)
+start = time.time()
+time.sleep(behaviour.get('sleep', 0))
+with open(log, 'a') as f:
+    f.write(json.dumps(dict(node=node, attempt=attempt, start=start, end=time.time())) + '\\n')
+if behaviour.get('down') or attempt < behaviour.get('fail', 0):
+    print('Error: no route to node')
+    sys.exit(1)
+for dummy in range(count):
+    print('Reply from %%s in %%s' %% (node, behaviour.get('reply', '1.5ms')))
+'''
+
+
+@pytest.fixture
+def receptorctl(tmp_path):
+    script = tmp_path / 'receptorctl'
+    script.write_text(FAKE_RECEPTORCTL % sys.executable)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+    def setup(behaviour):
+        (tmp_path / 'behaviour.json').write_text(json.dumps(behaviour))
+        return str(script)
+
+    def calls():
+        log = tmp_path / 'calls.log'
+        if not log.exists():
+            return []
+        return [json.loads(line) for line in log.read_text().splitlines()]
+
+    setup.calls = calls
+    return setup
+
+
+def ping(mocker, receptorctl_path, **args):
+    args = dict(socket='/run/receptor.sock', receptorctl_path=receptorctl_path, delay=0, **args)
+    return run_module(mocker, receptor_mesh_ping.main, args)
+
+
+def max_overlap(calls):
+    events = sorted([(call['start'], 1) for call in calls] + [(call['end'], -1) for call in calls])
+    running = peak = 0
+    for dummy, change in events:
+        running += change
+        peak = max(peak, running)
+    return peak
+
+
+def test_pings_concurrently_within_workers(mocker, receptorctl):
+    nodes = ['node%d' % i for i in range(6)]
+    path = receptorctl(dict((node, dict(sleep=0.5)) for node in nodes))
+
+    result = ping(mocker, path, nodes=nodes, workers=3)
+
+    assert result['mesh_successful_pings'] == nodes
+    assert result['mesh_failed_pings'] == []
+    assert max_overlap(receptorctl.calls()) == 3
+
+
+def test_latency_statistics(mocker, receptorctl):
+    path = receptorctl(dict(node1=dict(reply='612.5µs')))
+
+    result = ping(mocker, path, nodes=['node1'], count=3)
+
+    assert result['mesh_ping_latency'] == dict(node1=dict(samples=3, min=0.613, max=0.613, mean=0.613, p50=0.613, p95=0.613))
+
+
+def test_retries_and_per_node_failure(mocker, receptorctl):
+    path = receptorctl(dict(flaky=dict(fail=2), down=dict(down=True)))
+
+    result = ping(mocker, path, nodes=['ok', 'flaky', 'down'], names=['host1', 'host2', 'host3'], retries=3)
+
+    assert result['mesh_successful_pings'] == ['host1', 'host2']
+    assert result['mesh_failed_pings'] == ['host3']
+    assert result['mesh_ping_errors'] == dict(host3='Error: no route to node')
+    assert sorted(result['mesh_ping_latency']) == ['host1', 'host2']
+    attempts = [call['node'] for call in receptorctl.calls()]
+    assert (attempts.count('ok'), attempts.count('flaky'), attempts.count('down')) == (1, 3, 4)
+
+
+def test_timeout(mocker, receptorctl):
+    path = receptorctl(dict(slow=dict(sleep=5)))
+
+    result = ping(mocker, path, nodes=['slow', 'fast'], timeout=0.5, retries=1)
+
+    assert result['mesh_successful_pings'] == ['fast']
+    assert result['mesh_failed_pings'] == ['slow']
+    assert 'timed out after 0.5 seconds' in result['mesh_ping_errors']['slow']
+
+
+def test_names_must_match_nodes(mocker, receptorctl):
+    result = ping(mocker, receptorctl({}), nodes=['node1', 'node2'], names=['host1'])
+
+    assert result['failed']
+    assert result['msg'] == 'names must have one entry per node'
@@ -0,0 +1,115 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import io
+import json
+import time
+
+import pytest
+
+from ansible.plugins.loader import callback_loader
+from ansible.utils import display as display_module
+
+from ansible_collections.ansible.posix.tests.unit.compat.mock import MagicMock
+from ansible_collections.ansible.posix.plugins.callback.jsonl import BufferedSink
+
+
+def read(path):
+    with io.open(str(path), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_sink_flushes_every_line(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    sink = BufferedSink(io.open(str(path), 'a', buffering=65536, encoding='utf-8'))
+
+    sink.write('{"a":1}')
+    assert read(path) == '{"a":1}\n'
+
+    sink.close()
+    sink.close()
+
+
+def test_sink_flush_interval(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    stream = io.open(str(path), 'a', buffering=65536, encoding='utf-8')
+    sink = BufferedSink(stream, flush_interval=0.1)
+
+    sink.write('{"a":1}')
+    sink.write('{"b":2}')
+    assert read(path) == ''
+
+    # the background thread flushes the buffer
+    deadline = time.time() + 5
+    while read(path) == '' and time.time() < deadline:
+        time.sleep(0.05)
+    assert read(path) == '{"a":1}\n{"b":2}\n'
+
+    sink.write('{"c":3}')
+    sink.close()
+    assert read(path).endswith('{"c":3}\n')
+    assert stream.closed
+
+
+@pytest.fixture
+def jsonl(monkeypatch):
+    monkeypatch.setattr(display_module, 'logger', None)
+
+    def load(**env):
+        for name, value in env.items():
+            monkeypatch.setenv('ANSIBLE_JSONL_%s' % name.upper(), str(value))
+        return callback_loader.get('ansible.posix.jsonl')
+    return load
+
+
+def play_events(callback, result):
+    play = MagicMock(strategy='linear', _uuid='play-uuid')
+    play.get_name.return_value = 'my play'
+    task = MagicMock(_uuid='task-uuid', action='command')
+    task.get_name.return_value = 'my task'
+    host = MagicMock()
+    host.name = 'host1'
+    host.get_name.return_value = 'host1'
+
+    callback.v2_playbook_on_play_start(play)
+    callback.v2_playbook_on_task_start(task, False)
+    callback.v2_runner_on_ok(MagicMock(_host=host, _task=task, _result=result))
+    callback._sink.close()
+
+
+def test_truncation(tmp_path, jsonl):
+    path = tmp_path / 'events.jsonl'
+    callback = jsonl(output_file=path, max_event_size=600)
+
+    play_events(callback, dict(changed=True, rc=0, msg='m' * 2000, stdout='x' * 2000))
+
+    events = [json.loads(line) for line in read(path).splitlines()]
+    assert [event['_event'] for event in events] == ['v2_playbook_on_play_start', 'v2_playbook_on_task_start', 'v2_runner_on_ok']
+    assert '_truncated' not in events[0]
+    result = events[2]
+    assert result['_truncated']
+    assert result['_original_size'] > 4000
+    assert result['task']['name'] == 'my task'
+    assert 'hosts' not in result
+    assert all(len(line) <= 600 for line in read(path).splitlines())
+
+    path.unlink()
+    callback = jsonl(output_file=path, max_event_size=1500)
+    play_events(callback, dict(changed=True, rc=0, msg='m' * 2000, stdout='x' * 2000))
+    host = json.loads(read(path).splitlines()[2])['hosts']['host1']
+    assert host == dict(action='command', changed=True, rc=0, msg='m' * 1024 + '...', _truncated=True)
+
+
+def test_stdout_fallback(monkeypatch, jsonl):
+    # a stdout without a file descriptor is written to directly, and left open
+    stdout = io.StringIO()
+    monkeypatch.setattr('sys.stdout', stdout)
+    callback = jsonl()
+
+    play_events(callback, dict(changed=False))
+
+    assert not stdout.closed
+    assert [json.loads(line)['_event'] for line in stdout.getvalue().splitlines()] == [
+        'v2_playbook_on_play_start', 'v2_playbook_on_task_start', 'v2_runner_on_ok']
@@ -13,7 +13,10 @@ DOCUMENTATION = '''
     short_description: Pickle formatted files.
     description:
         - This cache uses Python's pickle serialization format, in per host files, saved to the filesystem.
+        - The files can be spread over subdirectories, compressed, and listed through an index, see O(_shards), O(_compression) and O(_index).
     author: Brian Coca (@bcoca)
+    extends_documentation_fragment:
+      - community.general.file_cache
     options:
       _uri:
         required: true
@@ -50,23 +53,23 @@ except ImportError:
     import pickle
 
 from ansible.module_utils.six import PY3
-from ansible.plugins.cache import BaseFileCacheModule
 
+from ansible_collections.community.general.plugins.plugin_utils.file_cache import IndexedFileCacheModule
 
-class CacheModule(BaseFileCacheModule):
+
+class CacheModule(IndexedFileCacheModule):
     """
     A caching module backed by pickle files.
     """
 
     def _load(self, filepath):
         # Pickle is a binary format
-        with open(filepath, 'rb') as f:
-            if PY3:
-                return pickle.load(f, encoding='bytes')
-            else:
-                return pickle.load(f)
+        data = self._read_file(filepath)
+        if PY3:
+            return pickle.loads(data, encoding='bytes')
+        else:
+            return pickle.loads(data)
 
     def _dump(self, value, filepath):
-        with open(filepath, 'wb') as f:
-            # Use pickle protocol 2 which is compatible with Python 2.3+.
-            pickle.dump(value, f, protocol=2)
+        # Use pickle protocol 2 which is compatible with Python 2.3+.
+        self._write_file(filepath, pickle.dumps(value, protocol=2))
@@ -14,6 +14,8 @@ DOCUMENTATION = '''
     version_added: 3.7.0
     description:
       - This callback creates distributed traces for each Ansible task with OpenTelemetry.
+      - The span of a task for a host is exported in batches as soon as the host finished the task,
+        the span of the playbook when the playbook ends.
       - You can configure the OpenTelemetry exporter and SDK with environment variables.
       - See U(https://opentelemetry-python.readthedocs.io/en/latest/exporter/otlp/otlp.html).
       - See U(https://opentelemetry-python.readthedocs.io/en/latest/sdk/environment_variables.html#opentelemetry-sdk-environment-variables).
@@ -110,6 +112,54 @@ DOCUMENTATION = '''
           - section: callback_opentelemetry
             key: otel_exporter_otlp_traces_protocol
         version_added: 9.0.0
+      otel_bsp_max_queue_size:
+        type: int
+        description:
+          - The maximum number of ended spans queued for export. Spans ended while the queue is full are dropped.
+          - When not set, the OpenTelemetry SDK default is used.
+        env:
+          - name: OTEL_BSP_MAX_QUEUE_SIZE
+        ini:
+          - section: callback_opentelemetry
+            key: otel_bsp_max_queue_size
+        version_added: 9.5.0
+      otel_bsp_max_export_batch_size:
+        type: int
+        description:
+          - The maximum number of spans exported at once. It must not be greater than O(otel_bsp_max_queue_size).
+          - When not set, the OpenTelemetry SDK default is used.
+        env:
+          - name: OTEL_BSP_MAX_EXPORT_BATCH_SIZE
+        ini:
+          - section: callback_opentelemetry
+            key: otel_bsp_max_export_batch_size
+        version_added: 9.5.0
+      otel_bsp_schedule_delay:
+        type: int
+        description:
+          - The delay in milliseconds between two exports of the queued spans.
+          - When not set, the OpenTelemetry SDK default is used.
+        env:
+          - name: OTEL_BSP_SCHEDULE_DELAY
+        ini:
+          - section: callback_opentelemetry
+            key: otel_bsp_schedule_delay
+        version_added: 9.5.0
+      max_retained_tasks:
+        type: int
+        default: 100
+        description:
+          - The number of tasks whose data is kept in memory while the playbook runs.
+          - The span of a task and host is exported as soon as the host finished the task, so a task is only
+            kept to recognize further results for it. When more tasks were started, the data of the oldest one is dropped.
+          - A result received for a task that was dropped already, for example with the V(free) strategy,
+            creates a span which starts when the result was received.
+        env:
+          - name: ANSIBLE_OPENTELEMETRY_MAX_RETAINED_TASKS
+        ini:
+          - section: callback_opentelemetry
+            key: max_retained_tasks
+        version_added: 9.5.0
     requirements:
       - opentelemetry-api (Python library)
       - opentelemetry-exporter-otlp (Python library)
@@ -157,10 +207,7 @@ try:
     from opentelemetry.trace.status import Status, StatusCode
     from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
     from opentelemetry.sdk.trace import TracerProvider
-    from opentelemetry.sdk.trace.export import (
-        BatchSpanProcessor,
-        SimpleSpanProcessor
-    )
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
     from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
         InMemorySpanExporter
     )
@@ -211,9 +258,10 @@ class TaskData:
                 # concatenate task include output from multiple items
                 host.result = '%s\n%s' % (self.host_data[host.uuid].result, host.result)
             else:
-                return
+                return False
 
         self.host_data[host.uuid] = host
+        return True
 
 
 class HostData:
@@ -233,6 +281,10 @@ class OpenTelemetrySource(object):
     def __init__(self, display):
         self.ansible_playbook = ""
         self.ansible_version = None
+        self.tracer_provider = None
+        self.tracer = None
+        self.otel_exporter = None
+        self.parent_span = None
         self.session = str(uuid.uuid4())
         self.host = socket.gethostname()
         try:
@@ -284,65 +336,82 @@ class OpenTelemetrySource(object):
             self.ansible_version = result._task_fields['args'].get('_ansible_version')
 
         task.dump = dump
-        task.add_host(HostData(host_uuid, host_name, status, result))
-
-    def generate_distributed_traces(self,
-                                    otel_service_name,
-                                    ansible_playbook,
-                                    tasks_data,
-                                    status,
-                                    traceparent,
-                                    disable_logs,
-                                    disable_attributes_in_logs,
-                                    otel_exporter_otlp_traces_protocol,
-                                    store_spans_in_file):
-        """ generate distributed traces from the collected TaskData and HostData """
-
-        tasks = []
-        parent_start_time = None
-        for task_uuid, task in tasks_data.items():
-            if parent_start_time is None:
-                parent_start_time = task.start
-            tasks.append(task)
-
-        trace.set_tracer_provider(
-            TracerProvider(
-                resource=Resource.create({SERVICE_NAME: otel_service_name})
-            )
+        host = HostData(host_uuid, host_name, status, result)
+        if task.add_host(host):
+            return host
+        return None
+
+    def init_tracer(self,
+                    otel_service_name,
+                    otel_exporter_otlp_traces_protocol,
+                    store_spans_in_file,
+                    max_queue_size=None,
+                    max_export_batch_size=None,
+                    schedule_delay=None):
+        """ create the tracer provider, exporting the spans in batches as they end """
+
+        self.tracer_provider = TracerProvider(
+            resource=Resource.create({SERVICE_NAME: otel_service_name})
         )
 
-        otel_exporter = None
         if store_spans_in_file:
-            otel_exporter = InMemorySpanExporter()
-            processor = SimpleSpanProcessor(otel_exporter)
+            self.otel_exporter = InMemorySpanExporter()
+        elif otel_exporter_otlp_traces_protocol == 'grpc':
+            self.otel_exporter = GRPCOTLPSpanExporter()
         else:
-            if otel_exporter_otlp_traces_protocol == 'grpc':
-                otel_exporter = GRPCOTLPSpanExporter()
-            else:
-                otel_exporter = HTTPOTLPSpanExporter()
-            processor = BatchSpanProcessor(otel_exporter)
-
-        trace.get_tracer_provider().add_span_processor(processor)
-
-        tracer = trace.get_tracer(__name__)
-
-        with tracer.start_as_current_span(ansible_playbook, context=self.traceparent_context(traceparent),
-                                          start_time=parent_start_time, kind=SpanKind.SERVER) as parent:
-            parent.set_status(status)
-            # Populate trace metadata attributes
-            if self.ansible_version is not None:
-                parent.set_attribute("ansible.version", self.ansible_version)
-            parent.set_attribute("ansible.session", self.session)
-            parent.set_attribute("ansible.host.name", self.host)
-            if self.ip_address is not None:
-                parent.set_attribute("ansible.host.ip", self.ip_address)
-            parent.set_attribute("ansible.host.user", self.user)
-            for task in tasks:
-                for host_uuid, host_data in task.host_data.items():
-                    with tracer.start_as_current_span(task.name, start_time=task.start, end_on_exit=False) as span:
-                        self.update_span_data(task, host_data, span, disable_logs, disable_attributes_in_logs)
-
-        return otel_exporter
+            self.otel_exporter = HTTPOTLPSpanExporter()
+
+        # unset values are left to the SDK, which reads them from the OTEL_BSP_* environment variables
+        processor = BatchSpanProcessor(self.otel_exporter,
+                                       max_queue_size=max_queue_size,
+                                       schedule_delay_millis=schedule_delay,
+                                       max_export_batch_size=max_export_batch_size)
+        self.tracer_provider.add_span_processor(processor)
+
+        self.tracer = self.tracer_provider.get_tracer(__name__)
+
+    def start_trace(self, ansible_playbook, traceparent, start_time=None):
+        """ start the span of the playbook, the parent of the task spans """
+
+        self.parent_span = self.tracer.start_span(ansible_playbook, context=self.traceparent_context(traceparent),
+                                                  start_time=start_time, kind=SpanKind.SERVER)
+
+    def finish_trace(self, status):
+        """ end the span of the playbook and export the spans not exported yet """
+
+        parent = self.parent_span
+        parent.set_status(status)
+        # Populate trace metadata attributes
+        if self.ansible_version is not None:
+            parent.set_attribute("ansible.version", self.ansible_version)
+        parent.set_attribute("ansible.session", self.session)
+        parent.set_attribute("ansible.host.name", self.host)
+        if self.ip_address is not None:
+            parent.set_attribute("ansible.host.ip", self.ip_address)
+        parent.set_attribute("ansible.host.user", self.user)
+        parent.end()
+
+        # flushes the span processor before shutting down the exporter
+        self.tracer_provider.shutdown()
+        return self.otel_exporter
+
+    def export_host(self, task_data, host_data, disable_logs, disable_attributes_in_logs):
+        """ create and end the span of a task for a host, then drop the host result """
+
+        span = self.tracer.start_span(task_data.name, context=trace.set_span_in_context(self.parent_span),
+                                      start_time=task_data.start)
+        self.update_span_data(task_data, host_data, span, disable_logs, disable_attributes_in_logs)
+        # the host is kept to ignore further results for it
+        host_data.result = None
+        task_data.dump = None
+
+    def release_task(self, tasks_data, task_uuid, disable_logs, disable_attributes_in_logs):
+        """ export the task include spans of a task, which can only be known to be complete now, and forget the task """
+
+        task = tasks_data.pop(task_uuid)
+        for host_data in task.host_data.values():
+            if host_data.status == 'included':
+                self.export_host(task, host_data, disable_logs, disable_attributes_in_logs)
 
     def update_span_data(self, task_data, host_data, span, disable_logs, disable_attributes_in_logs):
         """ update the span with the given TaskData and HostData """
@@ -517,6 +586,7 @@ class CallbackModule(CallbackBase):
         self.traceparent = False
         self.store_spans_in_file = False
         self.otel_exporter_otlp_traces_protocol = None
+        self.max_retained_tasks = None
 
         if OTEL_LIBRARY_IMPORT_ERROR:
             raise_from(
@@ -556,6 +626,8 @@ class CallbackModule(CallbackBase):
 
         self.otel_exporter_otlp_traces_protocol = self.get_option('otel_exporter_otlp_traces_protocol')
 
+        self.max_retained_tasks = max(self.get_option('max_retained_tasks'), 1)
+
     def dump_results(self, task, result):
         """ dump the results if disable_logs is not enabled """
         if self.disable_logs:
@@ -570,13 +642,7 @@ class CallbackModule(CallbackBase):
             save.pop("content")
         return self._dump_results(save)
 
-    def v2_playbook_on_start(self, playbook):
-        self.ansible_playbook = basename(playbook._file_name)
-
-    def v2_playbook_on_play_start(self, play):
-        self.play_name = play.get_name()
-
-    def v2_runner_on_no_hosts(self, task):
+    def _start_task(self, task):
         self.opentelemetry.start_task(
             self.tasks_data,
             self.hide_task_arguments,
@@ -584,29 +650,62 @@ class CallbackModule(CallbackBase):
             task
         )
 
-    def v2_playbook_on_task_start(self, task, is_conditional):
-        self.opentelemetry.start_task(
+        if self.opentelemetry.parent_span is None:
+            self.opentelemetry.start_trace(self.ansible_playbook, self.traceparent, self.tasks_data[task._uuid].start)
+
+        while len(self.tasks_data) > self.max_retained_tasks:
+            self.opentelemetry.release_task(
+                self.tasks_data,
+                next(iter(self.tasks_data)),
+                self.disable_logs,
+                self.disable_attributes_in_logs
+            )
+
+    def _finish_task(self, status, result, dump=None):
+        if result._task._uuid not in self.tasks_data:
+            # a late result of a task which was released already
+            self._start_task(result._task)
+
+        task_data = self.tasks_data[result._task._uuid]
+        if dump is None:
+            dump = self.dump_results(task_data, result)
+
+        host_data = self.opentelemetry.finish_task(
             self.tasks_data,
-            self.hide_task_arguments,
-            self.play_name,
-            task
+            status,
+            result,
+            dump
         )
 
-    def v2_playbook_on_cleanup_task_start(self, task):
-        self.opentelemetry.start_task(
-            self.tasks_data,
-            self.hide_task_arguments,
-            self.play_name,
-            task
+        # task include results are concatenated until the task is released
+        if host_data is not None and status != 'included':
+            self.opentelemetry.export_host(task_data, host_data, self.disable_logs, self.disable_attributes_in_logs)
+
+    def v2_playbook_on_start(self, playbook):
+        self.ansible_playbook = basename(playbook._file_name)
+        self.opentelemetry.init_tracer(
+            self.otel_service_name,
+            self.otel_exporter_otlp_traces_protocol,
+            self.store_spans_in_file,
+            self.get_option('otel_bsp_max_queue_size'),
+            self.get_option('otel_bsp_max_export_batch_size'),
+            self.get_option('otel_bsp_schedule_delay')
         )
 
+    def v2_playbook_on_play_start(self, play):
+        self.play_name = play.get_name()
+
+    def v2_runner_on_no_hosts(self, task):
+        self._start_task(task)
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._start_task(task)
+
+    def v2_playbook_on_cleanup_task_start(self, task):
+        self._start_task(task)
+
     def v2_playbook_on_handler_task_start(self, task):
-        self.opentelemetry.start_task(
-            self.tasks_data,
-            self.hide_task_arguments,
-            self.play_name,
-            task
-        )
+        self._start_task(task)
 
     def v2_runner_on_failed(self, result, ignore_errors=False):
         if ignore_errors:
@@ -615,53 +714,28 @@ class CallbackModule(CallbackBase):
             status = 'failed'
             self.errors += 1
 
-        self.opentelemetry.finish_task(
-            self.tasks_data,
-            status,
-            result,
-            self.dump_results(self.tasks_data[result._task._uuid], result)
-        )
+        self._finish_task(status, result)
 
     def v2_runner_on_ok(self, result):
-        self.opentelemetry.finish_task(
-            self.tasks_data,
-            'ok',
-            result,
-            self.dump_results(self.tasks_data[result._task._uuid], result)
-        )
+        self._finish_task('ok', result)
 
     def v2_runner_on_skipped(self, result):
-        self.opentelemetry.finish_task(
-            self.tasks_data,
-            'skipped',
-            result,
-            self.dump_results(self.tasks_data[result._task._uuid], result)
-        )
+        self._finish_task('skipped', result)
 
     def v2_playbook_on_include(self, included_file):
-        self.opentelemetry.finish_task(
-            self.tasks_data,
-            'included',
-            included_file,
-            ""
-        )
+        self._finish_task('included', included_file, "")
 
     def v2_playbook_on_stats(self, stats):
         if self.errors == 0:
             status = Status(status_code=StatusCode.OK)
         else:
             status = Status(status_code=StatusCode.ERROR)
-        otel_exporter = self.opentelemetry.generate_distributed_traces(
-            self.otel_service_name,
-            self.ansible_playbook,
-            self.tasks_data,
-            status,
-            self.traceparent,
-            self.disable_logs,
-            self.disable_attributes_in_logs,
-            self.otel_exporter_otlp_traces_protocol,
-            self.store_spans_in_file
-        )
+
+        for task_uuid in list(self.tasks_data):
+            self.opentelemetry.release_task(self.tasks_data, task_uuid, self.disable_logs, self.disable_attributes_in_logs)
+        if self.opentelemetry.parent_span is None:
+            self.opentelemetry.start_trace(self.ansible_playbook, self.traceparent)
+        otel_exporter = self.opentelemetry.finish_trace(status)
 
         if self.store_spans_in_file:
             spans = [json.loads(span.to_json()) for span in otel_exporter.get_finished_spans()]
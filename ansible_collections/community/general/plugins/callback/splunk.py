@@ -19,6 +19,10 @@ DOCUMENTATION = '''
       - Whitelisting this callback plugin
       - 'Create a HTTP Event Collector in Splunk'
       - 'Define the URL and token in C(ansible.cfg)'
+    extends_documentation_fragment:
+      - community.general.event_shipper
+      - community.general.event_shipper.send_in_background
+      - community.general.event_shipper.compress
     options:
       url:
         description: URL to the Splunk HTTP collector source.
@@ -69,6 +73,54 @@ DOCUMENTATION = '''
             key: batch
         type: str
         version_added: 3.3.0
+      send_in_background:
+        env:
+          - name: SPLUNK_SEND_IN_BACKGROUND
+        ini:
+          - section: callback_splunk
+            key: send_in_background
+      queue_size:
+        env:
+          - name: SPLUNK_QUEUE_SIZE
+        ini:
+          - section: callback_splunk
+            key: queue_size
+      queue_full:
+        env:
+          - name: SPLUNK_QUEUE_FULL
+        ini:
+          - section: callback_splunk
+            key: queue_full
+      max_batch_events:
+        env:
+          - name: SPLUNK_MAX_BATCH_EVENTS
+        ini:
+          - section: callback_splunk
+            key: max_batch_events
+      max_batch_size:
+        env:
+          - name: SPLUNK_MAX_BATCH_SIZE
+        ini:
+          - section: callback_splunk
+            key: max_batch_size
+      flush_interval:
+        env:
+          - name: SPLUNK_FLUSH_INTERVAL
+        ini:
+          - section: callback_splunk
+            key: flush_interval
+      send_retries:
+        env:
+          - name: SPLUNK_SEND_RETRIES
+        ini:
+          - section: callback_splunk
+            key: send_retries
+      compress:
+        env:
+          - name: SPLUNK_COMPRESS
+        ini:
+          - section: callback_splunk
+            key: compress
 '''
 
 EXAMPLES = '''
@@ -99,6 +151,7 @@ from ansible.plugins.callback import CallbackBase
 from ansible_collections.community.general.plugins.module_utils.datetime import (
     now,
 )
+from ansible_collections.community.general.plugins.plugin_utils.event_shipper import EventShipper
 
 
 class SplunkHTTPCollectorSource(object):
@@ -110,6 +163,23 @@ class SplunkHTTPCollectorSource(object):
         self.host = socket.gethostname()
         self.ip_address = socket.gethostbyname(socket.gethostname())
         self.user = getpass.getuser()
+        self.shipper = None
+
+    def post(self, url, authtoken, validate_certs, jsondata, compressed=False):
+        headers = {
+            'Content-type': 'application/json',
+            'Authorization': 'Splunk ' + authtoken
+        }
+        if compressed:
+            headers['Content-Encoding'] = 'gzip'
+
+        open_url(
+            url,
+            jsondata,
+            headers=headers,
+            method='POST',
+            validate_certs=validate_certs
+        )
 
     def send_event(self, url, authtoken, validate_certs, include_milliseconds, batch, state, result, runtime):
         if result._task_fields['args'].get('_ansible_check_mode') is True:
@@ -153,19 +223,14 @@ class SplunkHTTPCollectorSource(object):
         data['ansible_result'] = result._result
 
         # This wraps the json payload in and outer json event needed by Splunk
-        jsondata = json.dumps(data, cls=AnsibleJSONEncoder, sort_keys=True)
+        jsondata = json.dumps(data, cls=AnsibleJSONEncoder)
         jsondata = '{"event":' + jsondata + "}"
 
-        open_url(
-            url,
-            jsondata,
-            headers={
-                'Content-type': 'application/json',
-                'Authorization': 'Splunk ' + authtoken
-            },
-            method='POST',
-            validate_certs=validate_certs
-        )
+        if self.shipper is not None:
+            # HEC accepts several events concatenated in one request body
+            self.shipper.put(jsondata)
+        else:
+            self.post(url, authtoken, validate_certs, jsondata)
 
 
 class CallbackModule(CallbackBase):
@@ -221,6 +286,20 @@ class CallbackModule(CallbackBase):
 
         self.batch = self.get_option('batch')
 
+        if self.get_option('send_in_background') and not self.disabled:
+            compress = self.get_option('compress')
+            self.splunk.shipper = EventShipper(
+                lambda body, key: self.splunk.post(self.url, self.authtoken, self.validate_certs, body, compress),
+                queue_size=self.get_option('queue_size'),
+                max_batch_events=self.get_option('max_batch_events'),
+                max_batch_size=self.get_option('max_batch_size'),
+                flush_interval=self.get_option('flush_interval'),
+                retries=self.get_option('send_retries'),
+                compress=compress,
+                queue_full=self.get_option('queue_full'),
+                warn=self._display.warning,
+            )
+
     def v2_playbook_on_start(self, playbook):
         self.splunk.ansible_playbook = basename(playbook._file_name)
 
@@ -289,3 +368,7 @@ class CallbackModule(CallbackBase):
             result,
             self._runtime(result)
         )
+
+    def v2_playbook_on_stats(self, stats):
+        if self.splunk.shipper is not None:
+            self.splunk.shipper.close()
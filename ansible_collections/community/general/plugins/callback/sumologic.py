@@ -17,6 +17,10 @@ requirements:
   - Whitelisting this callback plugin
   - 'Create a HTTP collector source in Sumologic and specify a custom timestamp format of V(yyyy-MM-dd HH:mm:ss ZZZZ) and a custom timestamp locator
     of V("timestamp": "(.*\)")'
+extends_documentation_fragment:
+  - community.general.event_shipper
+  - community.general.event_shipper.send_in_background
+  - community.general.event_shipper.compress
 options:
   url:
     description: URL to the Sumologic HTTP collector source.
@@ -26,6 +30,54 @@ options:
     ini:
       - section: callback_sumologic
         key: url
+  send_in_background:
+    env:
+      - name: SUMOLOGIC_SEND_IN_BACKGROUND
+    ini:
+      - section: callback_sumologic
+        key: send_in_background
+  queue_size:
+    env:
+      - name: SUMOLOGIC_QUEUE_SIZE
+    ini:
+      - section: callback_sumologic
+        key: queue_size
+  queue_full:
+    env:
+      - name: SUMOLOGIC_QUEUE_FULL
+    ini:
+      - section: callback_sumologic
+        key: queue_full
+  max_batch_events:
+    env:
+      - name: SUMOLOGIC_MAX_BATCH_EVENTS
+    ini:
+      - section: callback_sumologic
+        key: max_batch_events
+  max_batch_size:
+    env:
+      - name: SUMOLOGIC_MAX_BATCH_SIZE
+    ini:
+      - section: callback_sumologic
+        key: max_batch_size
+  flush_interval:
+    env:
+      - name: SUMOLOGIC_FLUSH_INTERVAL
+    ini:
+      - section: callback_sumologic
+        key: flush_interval
+  send_retries:
+    env:
+      - name: SUMOLOGIC_SEND_RETRIES
+    ini:
+      - section: callback_sumologic
+        key: send_retries
+  compress:
+    env:
+      - name: SUMOLOGIC_COMPRESS
+    ini:
+      - section: callback_sumologic
+        key: compress
 '''
 
 EXAMPLES = '''
@@ -56,6 +108,7 @@ from ansible.plugins.callback import CallbackBase
 from ansible_collections.community.general.plugins.module_utils.datetime import (
     now,
 )
+from ansible_collections.community.general.plugins.plugin_utils.event_shipper import EventShipper
 
 
 class SumologicHTTPCollectorSource(object):
@@ -67,6 +120,22 @@ class SumologicHTTPCollectorSource(object):
         self.host = socket.gethostname()
         self.ip_address = socket.gethostbyname(socket.gethostname())
         self.user = getpass.getuser()
+        self.shipper = None
+
+    def post(self, url, jsondata, ansible_host, compressed=False):
+        headers = {
+            'Content-type': 'application/json',
+            'X-Sumo-Host': ansible_host
+        }
+        if compressed:
+            headers['Content-Encoding'] = 'gzip'
+
+        open_url(
+            url,
+            data=jsondata,
+            headers=headers,
+            method='POST'
+        )
 
     def send_event(self, url, state, result, runtime):
         if result._task_fields['args'].get('_ansible_check_mode') is True:
@@ -101,15 +170,13 @@ class SumologicHTTPCollectorSource(object):
         data['ansible_task'] = result._task_fields
         data['ansible_result'] = result._result
 
-        open_url(
-            url,
-            data=json.dumps(data, cls=AnsibleJSONEncoder, sort_keys=True),
-            headers={
-                'Content-type': 'application/json',
-                'X-Sumo-Host': data['ansible_host']
-            },
-            method='POST'
-        )
+        jsondata = json.dumps(data, cls=AnsibleJSONEncoder)
+
+        if self.shipper is not None:
+            # one message per line, batched per host so X-Sumo-Host stays accurate
+            self.shipper.put(jsondata, key=data['ansible_host'])
+        else:
+            self.post(url, jsondata, data['ansible_host'])
 
 
 class CallbackModule(CallbackBase):
@@ -143,6 +210,20 @@ class CallbackModule(CallbackBase):
                                   '`SUMOLOGIC_URL` environment variable or '
                                   'in the ansible.cfg file.')
 
+        if self.get_option('send_in_background') and not self.disabled:
+            compress = self.get_option('compress')
+            self.sumologic.shipper = EventShipper(
+                lambda body, ansible_host: self.sumologic.post(self.url, body, ansible_host, compress),
+                queue_size=self.get_option('queue_size'),
+                max_batch_events=self.get_option('max_batch_events'),
+                max_batch_size=self.get_option('max_batch_size'),
+                flush_interval=self.get_option('flush_interval'),
+                retries=self.get_option('send_retries'),
+                compress=compress,
+                queue_full=self.get_option('queue_full'),
+                warn=self._display.warning,
+            )
+
     def v2_playbook_on_start(self, playbook):
         self.sumologic.ansible_playbook = basename(playbook._file_name)
 
@@ -191,3 +272,7 @@ class CallbackModule(CallbackBase):
             result,
             self._runtime(result)
         )
+
+    def v2_playbook_on_stats(self, stats):
+        if self.sumologic.shipper is not None:
+            self.sumologic.shipper.close()
@@ -6,106 +6,7 @@
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
-DOCUMENTATION = '''
-  name: json_query
-  short_description: Select a single element or a data subset from a complex data structure
-  description:
-    - This filter lets you query a complex JSON structure and iterate over it using a loop structure.
-  positional: expr
-  options:
-    _input:
-      description:
-        - The JSON data to query.
-      type: any
-      required: true
-    expr:
-      description:
-        - The query expression.
-        - See U(http://jmespath.org/examples.html) for examples.
-      type: string
-      required: true
-  requirements:
-    - jmespath
-'''
-
-EXAMPLES = '''
-- name: Define data to work on in the examples below
-  ansible.builtin.set_fact:
-    domain_definition:
-      domain:
-        cluster:
-          - name: cluster1
-          - name: cluster2
-        server:
-          - name: server11
-            cluster: cluster1
-            port: '8080'
-          - name: server12
-            cluster: cluster1
-            port: '8090'
-          - name: server21
-            cluster: cluster2
-            port: '9080'
-          - name: server22
-            cluster: cluster2
-            port: '9090'
-        library:
-          - name: lib1
-            target: cluster1
-          - name: lib2
-            target: cluster2
-
-- name: Display all cluster names
-  ansible.builtin.debug:
-    var: item
-  loop: "{{ domain_definition | community.general.json_query('domain.cluster[*].name') }}"
-
-- name: Display all server names
-  ansible.builtin.debug:
-    var: item
-  loop: "{{ domain_definition | community.general.json_query('domain.server[*].name') }}"
-
-- name: Display all ports from cluster1
-  ansible.builtin.debug:
-    var: item
-  loop: "{{ domain_definition | community.general.json_query(server_name_cluster1_query) }}"
-  vars:
-    server_name_cluster1_query: "domain.server[?cluster=='cluster1'].port"
-
-- name: Display all ports from cluster1 as a string
-  ansible.builtin.debug:
-    msg: "{{ domain_definition | community.general.json_query('domain.server[?cluster==`cluster1`].port') | join(', ') }}"
-
-- name: Display all ports from cluster1
-  ansible.builtin.debug:
-    var: item
-  loop: "{{ domain_definition | community.general.json_query('domain.server[?cluster==''cluster1''].port') }}"
-
-- name: Display all server ports and names from cluster1
-  ansible.builtin.debug:
-    var: item
-  loop: "{{ domain_definition | community.general.json_query(server_name_cluster1_query) }}"
-  vars:
-    server_name_cluster1_query: "domain.server[?cluster=='cluster2'].{name: name, port: port}"
-
-- name: Display all ports from cluster1
-  ansible.builtin.debug:
-    msg: "{{ domain_definition | to_json | from_json | community.general.json_query(server_name_query) }}"
-  vars:
-    server_name_query: "domain.server[?starts_with(name,'server1')].port"
-
-- name: Display all ports from cluster1
-  ansible.builtin.debug:
-    msg: "{{ domain_definition | to_json | from_json | community.general.json_query(server_name_query) }}"
-  vars:
-    server_name_query: "domain.server[?contains(name,'server1')].port"
-'''
-
-RETURN = '''
-  _value:
-    description: The result of the query.
-    type: any
-'''
+from functools import lru_cache
 
 from ansible.errors import AnsibleError, AnsibleFilterError
 
@@ -115,22 +16,44 @@ try:
 except ImportError:
     HAS_LIB = False
 
+# Number of compiled query expressions kept around
+CACHE_SIZE = 256
 
-def json_query(data, expr):
-    '''Query data using jmespath query language ( http://jmespath.org ). Example:
-    - ansible.builtin.debug: msg="{{ instance | json_query(tagged_instances[*].block_device_mapping.*.volume_id') }}"
-    '''
+# Hack to handle Ansible Unsafe text, AnsibleMapping and AnsibleSequence
+# See issue: https://github.com/ansible-collections/community.general/issues/320
+_EXTRA_TYPES = {
+    'string': ('AnsibleUnicode', 'AnsibleUnsafeText'),
+    'array': ('AnsibleSequence', ),
+    'object': ('AnsibleMapping', ),
+}
+
+
+def _register_types():
+    # The plugin can be loaded more than once, so only add the names that are missing
+    types_map = jmespath.functions.REVERSE_TYPES_MAP
+    for jmespath_type, type_names in _EXTRA_TYPES.items():
+        missing = tuple(name for name in type_names if name not in types_map[jmespath_type])
+        if missing:
+            types_map[jmespath_type] = types_map[jmespath_type] + missing
+
+
+if HAS_LIB:
+    _register_types()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile(expr):
+    return jmespath.compile(expr)
+
+
+def _search(expr, data_list):
     if not HAS_LIB:
         raise AnsibleError('You need to install "jmespath" prior to running '
                            'json_query filter')
 
-    # Hack to handle Ansible Unsafe text, AnsibleMapping and AnsibleSequence
-    # See issue: https://github.com/ansible-collections/community.general/issues/320
-    jmespath.functions.REVERSE_TYPES_MAP['string'] = jmespath.functions.REVERSE_TYPES_MAP['string'] + ('AnsibleUnicode', 'AnsibleUnsafeText', )
-    jmespath.functions.REVERSE_TYPES_MAP['array'] = jmespath.functions.REVERSE_TYPES_MAP['array'] + ('AnsibleSequence', )
-    jmespath.functions.REVERSE_TYPES_MAP['object'] = jmespath.functions.REVERSE_TYPES_MAP['object'] + ('AnsibleMapping', )
     try:
-        return jmespath.search(expr, data)
+        expression = _compile(expr)
+        return [expression.search(data) for data in data_list]
     except jmespath.exceptions.JMESPathError as e:
         raise AnsibleFilterError('JMESPathError in json_query filter plugin:\n%s' % e)
     except Exception as e:
@@ -138,10 +61,25 @@ def json_query(data, expr):
         raise AnsibleFilterError('Error in jmespath.search in json_query filter plugin:\n%s' % e)
 
 
+def json_query(data, expr):
+    '''Query data using jmespath query language ( http://jmespath.org ). Example:
+    - ansible.builtin.debug: msg="{{ instance | json_query(tagged_instances[*].block_device_mapping.*.volume_id') }}"
+    '''
+    return _search(expr, [data])[0]
+
+
+def json_query_batch(data_list, expr):
+    '''Apply the same jmespath query to every element of a list, and return the list of results.'''
+    if not isinstance(data_list, (list, tuple)):
+        raise AnsibleFilterError('json_query_batch requires a list, got %s' % type(data_list))
+    return _search(expr, data_list)
+
+
 class FilterModule(object):
     ''' Query filter '''
 
     def filters(self):
         return {
-            'json_query': json_query
+            'json_query': json_query,
+            'json_query_batch': json_query_batch,
         }
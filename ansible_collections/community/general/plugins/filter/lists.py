@@ -8,24 +8,58 @@ __metaclass__ = type
 
 from ansible.errors import AnsibleFilterError
 from ansible.module_utils.common.collections import is_sequence
+from ansible.module_utils.common._collections_compat import Mapping
+
+
+# Tags of the fingerprints of unhashable values, so they never compare equal to a hashable value
+_DICT = object()
+_LIST = object()
+_TUPLE = object()
+
+
+def fingerprint(item):
+    """
+    Returns a hashable value which compares equal for two items exactly when the items are equal.
+
+    Dictionaries, lists and tuples are converted recursively, sets to frozensets,
+    other unhashable values raise TypeError.
+    """
+    try:
+        hash(item)
+        return item
+    except TypeError:
+        pass
+    if isinstance(item, Mapping):
+        return (_DICT, frozenset((key, fingerprint(value)) for key, value in item.items()))
+    if isinstance(item, list):
+        return (_LIST, tuple(fingerprint(value) for value in item))
+    if isinstance(item, tuple):
+        return (_TUPLE, tuple(fingerprint(value) for value in item))
+    if isinstance(item, set):
+        return frozenset(item)
+    raise TypeError('unhashable type: %r' % type(item).__name__)
+
+
+def fingerprints(lst):
+    return set(fingerprint(item) for item in lst)
 
 
 def remove_duplicates(lst):
     seen = set()
     seen_add = seen.add
     result = []
-    for item in lst:
-        try:
-            if item not in seen:
-                seen_add(item)
+    try:
+        for item in lst:
+            key = fingerprint(item)
+            if key not in seen:
+                seen_add(key)
                 result.append(item)
-        except TypeError:
-            # This happens for unhashable values `item`. If this happens,
-            # convert `seen` to a list and continue.
-            seen = list(seen)
-            seen_add = seen.append
-            if item not in seen:
-                seen_add(item)
+    except TypeError:
+        # This happens for values which cannot be fingerprinted.
+        # If this happens, compare all items with each other instead.
+        result = []
+        for item in lst:
+            if item not in result:
                 result.append(item)
     return result
 
@@ -106,8 +140,8 @@ def lists_intersect(*args, **kwargs):
 def do_intersect(a, b):
     isect = []
     try:
-        other = set(b)
-        isect = [item for item in a if item in other]
+        other = fingerprints(b)
+        isect = [item for item in a if fingerprint(item) in other]
     except TypeError:
         # This happens for unhashable values,
         # use a list instead and redo.
@@ -146,8 +180,8 @@ def lists_difference(*args, **kwargs):
 def do_difference(a, b):
     diff = []
     try:
-        other = set(b)
-        diff = [item for item in a if item not in other]
+        other = fingerprints(b)
+        diff = [item for item in a if fingerprint(item) not in other]
     except TypeError:
         # This happens for unhashable values,
         # use a list instead and redo.
@@ -187,8 +221,8 @@ def do_symmetric_difference(a, b):
     sym_diff = []
     union = lists_union(a, b)
     try:
-        isect = set(a) & set(b)
-        sym_diff = [item for item in union if item not in isect]
+        isect = fingerprints(a) & fingerprints(b)
+        sym_diff = [item for item in union if fingerprint(item) not in isect]
     except TypeError:
         # This happens for unhashable values,
         # build the intersection of `a` and `b` backed
@@ -207,25 +207,52 @@ from ansible.module_utils.six import string_types
 from ansible.module_utils.common._collections_compat import Mapping, Sequence
 from ansible.utils.vars import merge_hash
 
-from collections import defaultdict
 from operator import itemgetter
 
 
-def list_mergeby(x, y, index, recursive=False, list_merge='replace'):
-    '''Merge 2 lists by attribute 'index'. The function 'merge_hash'
-       from ansible.utils.vars is used.  This function is used by the
-       function lists_mergeby.
+def group_by_index(lists, index, recursive=False, list_merge='replace'):
+    '''Merge the elements of the lists which have the same attribute
+       'index', in order, with the function 'merge_hash' from
+       ansible.utils.vars. Returns a dictionary indexed by 'index'.
     '''
 
-    d = defaultdict(dict)
-    for lst in (x, y):
+    merged = {}
+    for lst in lists:
         for elem in lst:
             if not isinstance(elem, Mapping):
                 msg = "Elements of list arguments for lists_mergeby must be dictionaries. %s is %s"
                 raise AnsibleFilterError(msg % (elem, type(elem)))
-            if index in elem.keys():
-                d[elem[index]].update(merge_hash(d[elem[index]], elem, recursive, list_merge))
-    return sorted(d.values(), key=itemgetter(index))
+            if index in elem:
+                key = elem[index]
+                previous = merged.get(key)
+                merged[key] = dict(elem) if previous is None else merge_hash(previous, elem, recursive, list_merge)
+    return merged
+
+
+def merge_lists_by(lists, index, recursive=False, list_merge='replace'):
+    '''Merge 2 or more lists by attribute 'index', visiting every element
+       once and sorting once at the end.
+
+       The lists are merged from the highest to the lowest priority, the
+       same way as merging them pairwise with list_mergeby would. This
+       matters because 'merge_hash' is not associative, for example when
+       a key holds a dictionary in one list and a string in another.
+    '''
+
+    merged = group_by_index(lists[-2:], index, recursive, list_merge)
+    for lst in reversed(lists[:-2]):
+        for key, value in group_by_index((lst, ), index, recursive, list_merge).items():
+            higher = merged.get(key)
+            merged[key] = value if higher is None else merge_hash(value, higher, recursive, list_merge)
+    return sorted(merged.values(), key=itemgetter(index))
+
+
+def list_mergeby(x, y, index, recursive=False, list_merge='replace'):
+    '''Merge 2 lists by attribute 'index'. The function 'merge_hash'
+       from ansible.utils.vars is used.
+    '''
+
+    return merge_lists_by((x, y), index, recursive, list_merge)
 
 
 def lists_mergeby(*terms, **kwargs):
@@ -269,12 +296,7 @@ def lists_mergeby(*terms, **kwargs):
                "%s is %s")
         raise AnsibleFilterError(msg % (index, type(index)))
 
-    high_to_low_prio_list_iterator = reversed(lists)
-    result = next(high_to_low_prio_list_iterator)
-    for list in high_to_low_prio_list_iterator:
-        result = list_mergeby(list, result, index, recursive, list_merge)
-
-    return result
+    return merge_lists_by(lists, index, recursive, list_merge)
 
 
 class FilterModule(object):
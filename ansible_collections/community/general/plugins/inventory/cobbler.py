@@ -13,11 +13,14 @@ DOCUMENTATION = '''
     version_added: 1.0.0
     description:
         - Get inventory hosts from the cobbler service.
+        - With O(cache_revalidate=true), the cached profiles and systems are only fetched again once the last modification time
+          of Cobbler changed, and then only the ones which changed since they were cached.
         - "Uses a configuration file as an inventory source, it must end in C(.cobbler.yml) or C(.cobbler.yaml) and have a C(plugin: cobbler) entry."
         - Adds the primary IP addresses to C(cobbler_ipv4_address) and C(cobbler_ipv6_address) host variables if defined in Cobbler.  The primary IP address is
           defined as the management interface if defined, or the interface who's DNS name matches the hostname of the system, or else the first interface found.
     extends_documentation_fragment:
         - inventory_cache
+        - community.general.inventory_fetch.revalidate
     options:
       plugin:
         description: The name of this plugin, it should always be set to V(community.general.cobbler) for this plugin to recognize it as it's own.
@@ -122,6 +125,7 @@ from ansible.module_utils.common.text.converters import to_text
 from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, to_safe_group_name
 from ansible.module_utils.six import text_type
 
+from ansible_collections.community.general.plugins.plugin_utils.inventory_fetch import InventoryFetcher
 from ansible_collections.community.general.plugins.plugin_utils.unsafe import make_unsafe
 
 # xmlrpc
@@ -145,6 +149,8 @@ class InventoryModule(BaseInventoryPlugin, Cacheable):
         super(InventoryModule, self).__init__()
         self.cache_key = None
         self.connection = None
+        self.fetcher = None
+        self.last_modified = None
 
     def verify_file(self, path):
         valid = False
@@ -178,37 +184,58 @@ class InventoryModule(BaseInventoryPlugin, Cacheable):
             self.load_cache_plugin()
             self._cache.get(self.cache_key, {})
 
-    def _get_profiles(self):
-        if not self.use_cache or 'profiles' not in self._cache.get(self.cache_key, {}):
-            c = self._get_connection()
+    def _call(self, method, *args):
+        c = self._get_connection()
+        if self.token is not None:
+            args += (self.token,)
+        return getattr(c, method)(*args)
+
+    def _get_last_modified(self):
+        if self.last_modified is None:
+            self.last_modified = self._call('last_modified_time')
+        return self.last_modified
+
+    def _refresh(self, what, objects):
+        c = self._get_connection()
+        try:
+            return self.fetcher.refresh_collection(
+                what,
+                self._get_last_modified(),
+                objects,
+                fetch_all=lambda: self._call('get_%s' % what),
+                fetch_changed=lambda mtime: getattr(c, 'get_%s_since' % what)(mtime),
+                fetch_keys=lambda: c.get_item_names(what[:-1]),
+            )
+        except xmlrpc_client.Fault as e:
+            # older servers do not know how to list the changed objects
+            self.display.vvv('Cannot revalidate cached %s, fetching all of them: %s\n' % (what, to_text(e)))
+            return self.fetcher.refresh_collection(what, None, None, fetch_all=lambda: self._call('get_%s' % what))
+
+    def _get_collection(self, what):
+        cached = self._cache.get(self.cache_key, {})
+        if not self.use_cache or self.revalidate or what not in cached:
             try:
-                if self.token is not None:
-                    data = c.get_profiles(self.token)
+                if self.revalidate:
+                    data = self._refresh(what, cached.get(what))
                 else:
-                    data = c.get_profiles()
+                    data = self._call('get_%s' % what)
             except (socket.gaierror, socket.error, xmlrpc_client.ProtocolError):
                 self._reload_cache()
             else:
-                self._init_cache()
-                self._cache[self.cache_key]['profiles'] = data
+                if self.revalidate:
+                    # a new dictionary, so that the cache plugin sees that it changed
+                    self._cache[self.cache_key] = dict(cached, **{what: data, 'fetch_state': self.fetcher.state})
+                else:
+                    self._init_cache()
+                    self._cache[self.cache_key][what] = data
 
-        return self._cache[self.cache_key]['profiles']
+        return self._cache[self.cache_key][what]
 
-    def _get_systems(self):
-        if not self.use_cache or 'systems' not in self._cache.get(self.cache_key, {}):
-            c = self._get_connection()
-            try:
-                if self.token is not None:
-                    data = c.get_systems(self.token)
-                else:
-                    data = c.get_systems()
-            except (socket.gaierror, socket.error, xmlrpc_client.ProtocolError):
-                self._reload_cache()
-            else:
-                self._init_cache()
-                self._cache[self.cache_key]['systems'] = data
+    def _get_profiles(self):
+        return self._get_collection('profiles')
 
-        return self._cache[self.cache_key]['systems']
+    def _get_systems(self):
+        return self._get_collection('systems')
 
     def _add_safe_group_name(self, group, child=None):
         group_name = self.inventory.add_group(to_safe_group_name('%s%s' % (self.get_option('group_prefix'), group.lower().replace(" ", ""))))
@@ -233,6 +260,8 @@ class InventoryModule(BaseInventoryPlugin, Cacheable):
         self.cobbler_url = self.get_option('url')
         self.cache_key = self.get_cache_key(path)
         self.use_cache = cache and self.get_option('cache')
+        self.revalidate = self.use_cache and self.get_option('cache_revalidate')
+        self.fetcher = InventoryFetcher(state=self._cache.get(self.cache_key, {}).get('fetch_state') if self.revalidate else None, workers=1)
 
         self.exclude_mgmt_classes = self.get_option('exclude_mgmt_classes')
         self.include_mgmt_classes = self.get_option('include_mgmt_classes')
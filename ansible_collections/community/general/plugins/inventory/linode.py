@@ -19,9 +19,13 @@ DOCUMENTATION = r'''
         - Linode labels are used by default as the hostnames.
         - The default inventory groups are built from groups (deprecated by
           Linode) and not tags.
+        - The pages of instances, and the IP addresses of the instances with
+          O(ip_style=api), are fetched with up to O(fetch_workers) concurrent
+          requests.
     extends_documentation_fragment:
         - constructed
         - inventory_cache
+        - community.general.inventory_fetch
     options:
         cache:
             version_added: 4.5.0
@@ -125,6 +129,7 @@ compose:
 from ansible.errors import AnsibleError
 from ansible.plugins.inventory import BaseInventoryPlugin, Constructable, Cacheable
 
+from ansible_collections.community.general.plugins.plugin_utils.inventory_fetch import InventoryFetcher
 from ansible_collections.community.general.plugins.plugin_utils.unsafe import make_unsafe
 
 
@@ -136,6 +141,9 @@ try:
 except ImportError:
     HAS_LINODE = False
 
+# the largest page the API returns
+PAGE_SIZE = 500
+
 
 class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
@@ -156,12 +164,21 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         self.client = LinodeClient(access_token)
 
+    def _get_instances_page(self, page):
+        return self.client.get('/linode/instances?page=%d&page_size=%d' % (page, PAGE_SIZE))
+
     def _get_instances_inventory(self):
         """Retrieve Linode instance information from cloud inventory."""
         try:
-            self.instances = self.client.linode.instances()
+            first = self._get_instances_page(1)
+            pages = [first] + self.fetcher.map(self._get_instances_page, range(2, first['pages'] + 1))
         except LinodeApiError as exception:
             raise AnsibleError('Linode client raised: %s' % exception)
+        self.instances = [
+            Instance(self.client, i['id'], i)
+            for page in pages
+            for i in page['data']
+        ]
 
     def _add_groups(self):
         """Add Linode instance groups to the dynamic inventory."""
@@ -207,6 +224,12 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
     def _add_hostvars_for_instances(self):
         """Add hostvars for instances in the dynamic inventory."""
         ip_style = self.get_option('ip_style')
+        if ip_style == 'api':
+            # every instance needs its own request, send them concurrently
+            try:
+                self.fetcher.map(lambda instance: instance.ips, self.instances)
+            except LinodeApiError as exception:
+                raise AnsibleError('Linode client raised: %s' % exception)
         for instance in self.instances:
             hostvars = instance._raw_json
             hostname = make_unsafe(instance.label)
@@ -306,6 +329,7 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             raise AnsibleError('the Linode dynamic inventory plugin requires linode_api4.')
 
         self._read_config_data(path)
+        self.fetcher = InventoryFetcher(workers=self.get_option('fetch_workers'))
 
         cache_key = self.get_cache_key(path)
 
@@ -92,6 +92,28 @@ DOCUMENTATION = '''
             type: boolean
             default: true
             version_added: 7.4.0
+        parallel_scans:
+            description:
+                - Number of nmap processes scanning at the same time.
+                - With more than one, an O(address) in CIDR notation is split into networks of equal size, as many as
+                  O(parallel_scans) rounded up to a power of two, and every network is scanned by its own nmap process.
+                  Other addresses are scanned by a single process.
+            type: int
+            default: 1
+            version_added: 9.5.0
+        host_cache_timeout:
+            description:
+                - Keep the result of every host in the inventory cache, and do not scan a host again for that many seconds.
+                - Hosts scanned more recently are excluded from the scan, and their cached results are used instead.
+                  A host which went down stays in the inventory until its cached result expires.
+                - Every run then scans the hosts which are not in the cache, instead of using the cached results of
+                  the whole scan until O(cache_timeout) expires.
+                - Requires O(cache=true). The results are dropped by the cache plugin after O(cache_timeout) like any other
+                  cached data, so set O(cache_timeout) higher, or to V(0).
+                - The default of V(0) disables it.
+            type: int
+            default: 0
+            version_added: 9.5.0
     notes:
         - At least one of O(ipv4) or O(ipv6) is required to be V(true); both can be V(true), but they cannot both be V(false).
         - 'TODO: add OS fingerprinting'
@@ -116,12 +138,27 @@ exclude: 192.168.0.1, web.example.com
 port: 22, 443
 groups:
   web_servers: "ports | selectattr('port', 'equalto', '443')"
+
+# scan a large network with 8 nmap processes, and rescan every host at most once a day
+plugin: community.general.nmap
+address: 10.0.0.0/16
+parallel_scans: 8
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: /var/cache/ansible/nmap
+cache_timeout: 0
+host_cache_timeout: 86400
 '''
 
+import ipaddress
+import math
 import os
-import re
+import tempfile
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import Popen, PIPE
+from xml.etree.ElementTree import ParseError, iterparse
 
 from ansible import constants as C
 from ansible.errors import AnsibleParserError
@@ -132,11 +169,70 @@ from ansible.module_utils.common.process import get_bin_path
 from ansible_collections.community.general.plugins.plugin_utils.unsafe import make_unsafe
 
 
+def parse_host(element):
+    """
+    Returns the inventory entry of a C(host) element of the nmap XML output,
+    or None if the host is down.
+    """
+    status = element.find('status')
+    if status is not None and status.get('state') != 'up':
+        return None
+
+    ip = None
+    for address in element.iter('address'):
+        if address.get('addrtype') != 'mac':
+            ip = address.get('addr')
+            break
+    if ip is None:
+        return None
+
+    host = ip
+    hostname = element.find('hostnames/hostname')
+    # if dns only shows arpa, just use ip instead as hostname
+    if hostname is not None and not hostname.get('name', '').endswith('.in-addr.arpa'):
+        host = hostname.get('name')
+
+    ports = []
+    for port in element.iter('port'):
+        state = port.find('state')
+        service = port.find('service')
+        ports.append({'port': port.get('portid'),
+                      'protocol': port.get('protocol'),
+                      'state': state.get('state') if state is not None else 'unknown',
+                      'service': service.get('name') if service is not None else 'unknown'})
+
+    result = {'name': host, 'ip': ip}
+    if ports:
+        result['ports'] = ports
+    return result
+
+
+def split_address(address, shards):
+    """
+    Splits a network in CIDR notation into at least ``shards`` networks.
+    Other addresses are returned as they are.
+    """
+    if shards < 2:
+        return [address]
+    try:
+        network = ipaddress.ip_network(to_text(address), strict=False)
+    except ValueError:
+        return [address]
+    diff = min(int(math.ceil(math.log(shards, 2))), network.max_prefixlen - network.prefixlen)
+    return [str(subnet) for subnet in network.subnets(prefixlen_diff=diff)]
+
+
+def address_key(host):
+    try:
+        address = ipaddress.ip_address(to_text(host['ip']))
+    except ValueError:
+        return (0, 0, host['ip'])
+    return (address.version, int(address), '')
+
+
 class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
     NAME = 'community.general.nmap'
-    find_host = re.compile(r'^Nmap scan report for ([\w,.,-]+)(?: \(([\w,.,:,\[,\]]+)\))?')
-    find_port = re.compile(r'^(\d+)/(\w+)\s+(\w+)\s+(\w+)')
 
     def __init__(self):
         self._nmap = None
@@ -173,6 +269,113 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         return valid
 
+    def _build_command(self):
+        cmd = [self._nmap]
+
+        if self.get_option('sudo'):
+            cmd.insert(0, 'sudo')
+
+        if self.get_option('port'):
+            cmd.append('-p')
+            cmd.append(self.get_option('port'))
+
+        if not self.get_option('ports'):
+            cmd.append('-sP')
+
+        if self.get_option('ipv4') and not self.get_option('ipv6'):
+            cmd.append('-4')
+        elif self.get_option('ipv6') and not self.get_option('ipv4'):
+            cmd.append('-6')
+        elif not self.get_option('ipv6') and not self.get_option('ipv4'):
+            raise AnsibleParserError('One of ipv4 or ipv6 must be enabled for this plugin')
+
+        if self.get_option('dns_resolve'):
+            cmd.append('-n')
+
+        if self.get_option('udp_scan'):
+            cmd.append('-sU')
+
+        if self.get_option('icmp_timestamp'):
+            cmd.append('-PP')
+
+        if self.get_option('open'):
+            cmd.append('--open')
+
+        if not self.get_option('use_arp_ping'):
+            cmd.append('--disable-arp-ping')
+
+        # XML on stdout, parsed while nmap is running
+        cmd.extend(['-oX', '-'])
+        return cmd
+
+    def _scan(self, cmd):
+        with tempfile.TemporaryFile() as stderr:
+            p = Popen(cmd, stdout=PIPE, stderr=stderr)
+            results = []
+            error = None
+            try:
+                for event, element in iterparse(p.stdout):
+                    if element.tag == 'host':
+                        host = parse_host(element)
+                        if host is not None:
+                            results.append(host)
+                        element.clear()
+            except ParseError as e:
+                # a failing nmap leaves the document unfinished, report its error instead
+                error = e
+            finally:
+                p.stdout.close()
+                p.wait()
+
+            if p.returncode != 0:
+                stderr.seek(0)
+                raise AnsibleParserError('Failed to run nmap, rc=%s: %s' % (p.returncode, to_native(stderr.read())))
+        if error is not None:
+            raise error
+        return results
+
+    def _run_scans(self, cmd, exclude=None):
+        if exclude:
+            cmd = cmd + ['--excludefile', exclude]
+        elif self.get_option('exclude'):
+            cmd = cmd + ['--exclude', ','.join(self.get_option('exclude'))]
+
+        targets = split_address(self.get_option('address'), self.get_option('parallel_scans'))
+        if len(targets) == 1:
+            return self._scan(cmd + targets)
+
+        with ThreadPoolExecutor(max_workers=min(self.get_option('parallel_scans'), len(targets))) as pool:
+            shards = list(pool.map(lambda target: self._scan(cmd + [target]), targets))
+        return [host for shard in shards for host in shard]
+
+    def _run_cached_scans(self, cmd, cached_hosts):
+        """
+        Scans the hosts whose result is not in ``cached_hosts``, a dictionary
+        of the results and scan times of the previously scanned hosts by IP.
+        Returns the results of all hosts, and the updated dictionary.
+        """
+        now = time.time()
+        timeout = self.get_option('host_cache_timeout')
+        fresh = dict((ip, entry) for ip, entry in cached_hosts.items() if now - entry['scanned'] < timeout)
+        if not fresh:
+            scanned = self._run_scans(cmd)
+        else:
+            # --exclude and --excludefile cannot be combined
+            exclude = list(fresh)
+            for item in self.get_option('exclude') or []:
+                exclude.extend(item.split(','))
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+                f.write('\n'.join(address.strip() for address in exclude) + '\n')
+            try:
+                scanned = self._run_scans(cmd, exclude=f.name)
+            finally:
+                os.unlink(f.name)
+
+        for host in scanned:
+            fresh[host['ip']] = {'scanned': now, 'host': host}
+        results = sorted((entry['host'] for entry in fresh.values()), key=address_key)
+        return results, fresh
+
     def parse(self, inventory, loader, path, cache=True):
 
         try:
@@ -190,10 +393,13 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         # get the user's cache option too to see if we should save the cache if it is changing
         user_cache_setting = self.get_option('cache')
 
+        # with a host cache, every run scans the hosts which are not cached
+        host_cache = user_cache_setting and self.get_option('host_cache_timeout') > 0
+
         # read if the user has caching enabled and the cache isn't being refreshed
-        attempt_to_read_cache = user_cache_setting and cache
+        attempt_to_read_cache = user_cache_setting and cache and not host_cache
         # update if the user has caching enabled and the cache is being refreshed; update this value to True if the cache has expired below
-        cache_needs_update = user_cache_setting and not cache
+        cache_needs_update = user_cache_setting and not cache and not host_cache
 
         if attempt_to_read_cache:
             try:
@@ -202,103 +408,20 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 # This occurs if the cache_key is not in the cache or if the cache_key expired, so the cache needs to be updated
                 cache_needs_update = True
 
-        if not user_cache_setting or cache_needs_update:
-            # setup command
-            cmd = [self._nmap]
-
-            if self.get_option('sudo'):
-                cmd.insert(0, 'sudo')
-
-            if self.get_option('port'):
-                cmd.append('-p')
-                cmd.append(self.get_option('port'))
-
-            if not self.get_option('ports'):
-                cmd.append('-sP')
-
-            if self.get_option('ipv4') and not self.get_option('ipv6'):
-                cmd.append('-4')
-            elif self.get_option('ipv6') and not self.get_option('ipv4'):
-                cmd.append('-6')
-            elif not self.get_option('ipv6') and not self.get_option('ipv4'):
-                raise AnsibleParserError('One of ipv4 or ipv6 must be enabled for this plugin')
-
-            if self.get_option('exclude'):
-                cmd.append('--exclude')
-                cmd.append(','.join(self.get_option('exclude')))
-
-            if self.get_option('dns_resolve'):
-                cmd.append('-n')
-
-            if self.get_option('udp_scan'):
-                cmd.append('-sU')
-
-            if self.get_option('icmp_timestamp'):
-                cmd.append('-PP')
-
-            if self.get_option('open'):
-                cmd.append('--open')
-
-            if not self.get_option('use_arp_ping'):
-                cmd.append('--disable-arp-ping')
-
-            cmd.append(self.get_option('address'))
+        if host_cache or not user_cache_setting or cache_needs_update:
+            cmd = self._build_command()
             try:
-                # execute
-                p = Popen(cmd, stdout=PIPE, stderr=PIPE)
-                stdout, stderr = p.communicate()
-                if p.returncode != 0:
-                    raise AnsibleParserError('Failed to run nmap, rc=%s: %s' % (p.returncode, to_native(stderr)))
-
-                # parse results
-                host = None
-                ip = None
-                ports = []
-                results = []
-
-                try:
-                    t_stdout = to_text(stdout, errors='surrogate_or_strict')
-                except UnicodeError as e:
-                    raise AnsibleParserError('Invalid (non unicode) input returned: %s' % to_native(e))
-
-                for line in t_stdout.splitlines():
-                    hits = self.find_host.match(line)
-                    if hits:
-                        if host is not None and ports:
-                            results[-1]['ports'] = ports
-
-                        # if dns only shows arpa, just use ip instead as hostname
-                        if hits.group(1).endswith('.in-addr.arpa'):
-                            host = hits.group(2)
-                        else:
-                            host = hits.group(1)
-
-                        # if no reverse dns exists, just use ip instead as hostname
-                        if hits.group(2) is not None:
-                            ip = hits.group(2)
-                        else:
-                            ip = hits.group(1)
-
-                        if host is not None:
-                            # update inventory
-                            results.append(dict())
-                            results[-1]['name'] = host
-                            results[-1]['ip'] = ip
-                            ports = []
-                        continue
-
-                    host_ports = self.find_port.match(line)
-                    if host is not None and host_ports:
-                        ports.append({'port': host_ports.group(1),
-                                      'protocol': host_ports.group(2),
-                                      'state': host_ports.group(3),
-                                      'service': host_ports.group(4)})
-                        continue
-
-                # if any leftovers
-                if host and ports:
-                    results[-1]['ports'] = ports
-
+                if host_cache:
+                    hosts_cache_key = '%s_hosts' % cache_key
+                    cached_hosts = {}
+                    if cache:
+                        try:
+                            cached_hosts = self._cache[hosts_cache_key]
+                        except KeyError:
+                            pass
+                    results, self._cache[hosts_cache_key] = self._run_cached_scans(cmd, cached_hosts)
+                else:
+                    results = self._run_scans(cmd)
             except Exception as e:
                 raise AnsibleParserError("failed to parse %s: %s " % (to_native(path), to_native(e)))
 
@@ -14,8 +14,13 @@ DOCUMENTATION = r'''
     short_description: Scaleway inventory source
     description:
         - Get inventory hosts from Scaleway.
+        - The servers of the O(regions) are fetched with up to O(fetch_workers) concurrent requests.
     requirements:
         - PyYAML
+    extends_documentation_fragment:
+        - inventory_cache
+        - community.general.inventory_fetch
+        - community.general.inventory_fetch.revalidate
     options:
         plugin:
             description: Token that ensures this is a source file for the 'scaleway' plugin.
@@ -121,42 +126,48 @@ else:
     YAML_IMPORT_ERROR = None
 
 from ansible.errors import AnsibleError
-from ansible.plugins.inventory import BaseInventoryPlugin, Constructable
+from ansible.plugins.inventory import BaseInventoryPlugin, Constructable, Cacheable
 from ansible_collections.community.general.plugins.module_utils.scaleway import SCALEWAY_LOCATION, parse_pagination_link
+from ansible_collections.community.general.plugins.plugin_utils.inventory_fetch import InventoryFetcher
 from ansible_collections.community.general.plugins.plugin_utils.unsafe import make_unsafe
-from ansible.module_utils.urls import open_url
-from ansible.module_utils.common.text.converters import to_native, to_text
+from ansible.module_utils.common.text.converters import to_native
 from ansible.module_utils.six import raise_from
 
 import ansible.module_utils.six.moves.urllib.parse as urllib_parse
 
 
-def _fetch_information(token, url):
-    results = []
+def _fetch_pages(token, url, fetcher, previous=None):
+    """
+    Returns the servers of every page of url, as a list of [page URL, servers].
+    previous is the list returned for url by an earlier run; the servers of
+    a page the API reports unchanged are taken from it.
+    """
+    previous = dict((page_url, dict(servers=servers)) for page_url, servers in previous or [])
+    pages = []
     paginated_url = url
     while True:
         try:
-            response = open_url(paginated_url,
-                                headers={'X-Auth-Token': token,
-                                         'Content-type': 'application/json'})
-        except Exception as e:
-            raise AnsibleError("Error while fetching %s: %s" % (url, to_native(e)))
-        try:
-            raw_json = json.loads(to_text(response.read()))
+            raw_json, headers = fetcher.get_json(paginated_url,
+                                                 headers={'X-Auth-Token': token,
+                                                          'Content-type': 'application/json'},
+                                                 keep_headers=('Link',),
+                                                 cached=previous.get(paginated_url))
         except ValueError:
             raise AnsibleError("Incorrect JSON payload")
+        except Exception as e:
+            raise AnsibleError("Error while fetching %s: %s" % (url, to_native(e)))
 
         try:
-            results.extend(raw_json["servers"])
+            pages.append([paginated_url, raw_json["servers"]])
         except KeyError:
             raise AnsibleError("Incorrect format from the Scaleway API response")
 
-        link = response.headers['Link']
+        link = headers['link']
         if not link:
-            return results
+            return pages
         relations = parse_pagination_link(link)
         if 'next' not in relations:
-            return results
+            return pages
         paginated_url = urllib_parse.urljoin(paginated_url, relations['next'])
 
 
@@ -222,9 +233,13 @@ extractors = {
 }
 
 
-class InventoryModule(BaseInventoryPlugin, Constructable):
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
     NAME = 'community.general.scaleway'
 
+    def __init__(self):
+        super(InventoryModule, self).__init__()
+        self.fetcher = InventoryFetcher()
+
     def _fill_host_variables(self, host, server_info):
         targeted_attributes = (
             "arch",
@@ -277,12 +292,16 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
 
         return None
 
-    def do_zone_inventory(self, zone, token, tags, hostname_preferences):
+    def _fetch_zone(self, zone, token, previous=None):
+        url = _build_server_url(SCALEWAY_LOCATION[zone]["api_endpoint"])
+        return _fetch_pages(token, url, self.fetcher, previous)
+
+    def do_zone_inventory(self, zone, token, tags, hostname_preferences, zone_hosts_infos=None):
         self.inventory.add_group(zone)
-        zone_info = SCALEWAY_LOCATION[zone]
 
-        url = _build_server_url(zone_info["api_endpoint"])
-        raw_zone_hosts_infos = make_unsafe(_fetch_information(url=url, token=token))
+        if zone_hosts_infos is None:
+            zone_hosts_infos = [server for dummy, servers in self._fetch_zone(zone, token) for server in servers]
+        raw_zone_hosts_infos = make_unsafe(zone_hosts_infos)
 
         for host_infos in raw_zone_hosts_infos:
 
@@ -342,6 +361,31 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
         if not token:
             raise AnsibleError("'oauth_token' value is null, you must configure it either in inventory, envvars or scaleway-cli config.")
         hostname_preference = self.get_option("hostnames")
-
-        for zone in self._get_zones(config_zones):
-            self.do_zone_inventory(zone=make_unsafe(zone), token=token, tags=tags, hostname_preferences=hostname_preference)
+        zones = list(self._get_zones(config_zones))
+
+        cache_key = self.get_cache_key(path)
+        use_cache = cache and self.get_option('cache')
+        revalidate = self.get_option('cache') and self.get_option('cache_revalidate')
+
+        cached = None
+        if use_cache:
+            try:
+                cached = self._cache[cache_key]
+            except KeyError:
+                pass
+
+        # the servers of each zone are cached page by page, with the validators of the pages in fetch_state
+        if cached is not None and not revalidate and all(zone in cached.get('pages', {}) for zone in zones):
+            pages = cached['pages']
+        else:
+            # with cache_revalidate, the pages fetched last time are only sent again if they changed
+            previous = cached.get('pages', {}) if cached is not None and revalidate else {}
+            state = cached.get('fetch_state') if cached is not None and revalidate else None
+            self.fetcher = InventoryFetcher(state=state, workers=self.get_option('fetch_workers'))
+            pages = dict(zip(zones, self.fetcher.map(lambda zone: self._fetch_zone(zone, token, previous.get(zone)), zones)))
+            if self.get_option('cache'):
+                self._cache[cache_key] = dict(pages=pages, fetch_state=self.fetcher.state if revalidate else {})
+
+        for zone in zones:
+            self.do_zone_inventory(zone=make_unsafe(zone), token=token, tags=tags, hostname_preferences=hostname_preference,
+                                   zone_hosts_infos=[server for dummy, servers in pages[zone] for server in servers])
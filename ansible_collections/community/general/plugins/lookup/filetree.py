@@ -21,6 +21,23 @@ options:
     required: true
     type: list
     elements: string
+  workers:
+    description:
+      - Number of threads which read the directories of the tree and the properties of their entries.
+      - Directories of the same depth are read in parallel, the result is the same as with a single thread.
+    type: int
+    default: 1
+    version_added: 9.5.0
+  cache_file:
+    description:
+      - Path of a file caching the entries of every directory of the tree and their properties, between runs.
+      - A directory is read again only when its modification time changed, that is when entries were added to it,
+        removed from it or renamed.
+      - Changes which do not modify the directory itself, like changing the content, mode or owner of an existing
+        file, are not noticed. Remove the cache file after such changes.
+      - By default, nothing is cached.
+    type: path
+    version_added: 9.5.0
 '''
 
 EXAMPLES = r"""
@@ -115,10 +132,15 @@ RETURN = r"""
           description: Time of last metadata update or creation (depends on OS).
           type: float
 """
+import json
 import os
 import pwd
 import grp
 import stat
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 HAVE_SELINUX = False
 try:
@@ -127,12 +149,15 @@ try:
 except ImportError:
     pass
 
+from ansible.errors import AnsibleLookupError
 from ansible.plugins.lookup import LookupBase
 from ansible.module_utils.common.text.converters import to_native, to_text
 from ansible.utils.display import Display
 
 display = Display()
 
+CACHE_VERSION = 1
+
 
 # If selinux fails to find a default, return an array of None
 def selinux_context(path):
@@ -151,17 +176,25 @@ def selinux_context(path):
     return context
 
 
-def file_props(root, path):
-    ''' Returns dictionary with file properties, or return None on failure '''
-    abspath = os.path.join(root, path)
+@lru_cache(maxsize=None)
+def user_name(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return uid
+
 
+@lru_cache(maxsize=None)
+def group_name(gid):
     try:
-        st = os.lstat(abspath)
-    except OSError as e:
-        display.warning('filetree: Error using stat() on path %s (%s)' % (abspath, e))
-        return None
+        return to_text(grp.getgrgid(gid).gr_name)
+    except KeyError:
+        return gid
 
-    ret = dict(root=root, path=path)
+
+def stat_props(abspath, st, with_selinux):
+    ''' Returns dictionary with the properties of a file from its lstat() result, or None if its type is not supported '''
+    ret = {}
 
     if stat.S_ISLNK(st.st_mode):
         ret['state'] = 'link'
@@ -177,20 +210,14 @@ def file_props(root, path):
 
     ret['uid'] = st.st_uid
     ret['gid'] = st.st_gid
-    try:
-        ret['owner'] = pwd.getpwuid(st.st_uid).pw_name
-    except KeyError:
-        ret['owner'] = st.st_uid
-    try:
-        ret['group'] = to_text(grp.getgrgid(st.st_gid).gr_name)
-    except KeyError:
-        ret['group'] = st.st_gid
+    ret['owner'] = user_name(st.st_uid)
+    ret['group'] = group_name(st.st_gid)
     ret['mode'] = '0%03o' % (stat.S_IMODE(st.st_mode))
     ret['size'] = st.st_size
     ret['mtime'] = st.st_mtime
     ret['ctime'] = st.st_ctime
 
-    if HAVE_SELINUX and selinux.is_selinux_enabled() == 1:
+    if with_selinux:
         context = selinux_context(abspath)
         ret['seuser'] = context[0]
         ret['serole'] = context[1]
@@ -200,28 +227,180 @@ def file_props(root, path):
     return ret
 
 
+def file_props(root, path):
+    ''' Returns dictionary with file properties, or return None on failure '''
+    abspath = os.path.join(root, path)
+
+    try:
+        st = os.lstat(abspath)
+    except OSError as e:
+        display.warning('filetree: Error using stat() on path %s (%s)' % (abspath, e))
+        return None
+
+    props = stat_props(abspath, st, HAVE_SELINUX and selinux.is_selinux_enabled() == 1)
+    if props is None:
+        return None
+    ret = dict(root=root, path=path)
+    ret.update(props)
+    return ret
+
+
+def scan_dir(dirpath, with_selinux):
+    ''' Returns the entries of a directory as a list of (name, walk, props), in the order os.walk() returns them.
+        walk tells whether the entry is a directory to descend into, props is None for entries which cannot be used.
+        Returns None if the directory cannot be read. '''
+    try:
+        with os.scandir(dirpath) as it:
+            entries = list(it)
+    except OSError:
+        return None
+
+    # like os.walk(), list the directories, including symlinks to directories, before the other entries
+    dirs = []
+    files = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        (dirs if is_dir else files).append((entry, is_dir))
+
+    listing = []
+    for entry, is_dir in dirs + files:
+        try:
+            # DirEntry caches the result, and only calls lstat() if the type of the entry was not known already
+            st = entry.stat(follow_symlinks=False)
+        except OSError as e:
+            display.warning('filetree: Error using stat() on path %s (%s)' % (entry.path, e))
+            listing.append((entry.name, False, None))
+            continue
+        props = stat_props(entry.path, st, with_selinux)
+        if props is not None and props['state'] == 'file':
+            # depends on the root the directory was reached from
+            del props['src']
+        listing.append((entry.name, is_dir and not stat.S_ISLNK(st.st_mode), props))
+    return listing
+
+
+def load_cache(cache_file):
+    try:
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('directories', {})
+
+
+def save_cache(cache_file, directories):
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.filetree.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(version=CACHE_VERSION, directories=directories), f)
+        os.rename(tmp_path, cache_file)
+    except (IOError, OSError) as e:
+        display.warning('filetree: Error writing cache file %s (%s)' % (cache_file, e))
+
+
 class LookupModule(LookupBase):
 
     def run(self, terms, variables=None, **kwargs):
         self.set_options(var_options=variables, direct=kwargs)
 
         basedir = self.get_basedir(variables)
+        workers = self.get_option('workers')
+        if workers < 1:
+            raise AnsibleLookupError('filetree: workers must be at least 1')
+        cache_file = self.get_option('cache_file')
+        self._with_selinux = HAVE_SELINUX and selinux.is_selinux_enabled() == 1
+        self._cache = load_cache(cache_file) if cache_file else {}
+        self._cache_changed = False
+        self._walked_tops = []
 
         ret = []
-        for term in terms:
-            term_file = os.path.basename(term)
-            dwimmed_path = self._loader.path_dwim_relative(basedir, 'files', os.path.dirname(term))
-            path = os.path.join(dwimmed_path, term_file)
-            display.debug("Walking '{0}'".format(path))
-            for root, dirs, files in os.walk(path, topdown=True):
-                for entry in dirs + files:
-                    relpath = os.path.relpath(os.path.join(root, entry), path)
-
+        seen = set()
+        walked = {}
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            for term in terms:
+                term_file = os.path.basename(term)
+                dwimmed_path = self._loader.path_dwim_relative(basedir, 'files', os.path.dirname(term))
+                path = os.path.join(dwimmed_path, term_file)
+                display.debug("Walking '{0}'".format(path))
+                for relpath, props in self._walk(path, pool, walked):
                     # Skip if relpath was already processed (from another root)
-                    if relpath not in [entry['path'] for entry in ret]:
-                        props = file_props(path, relpath)
-                        if props is not None:
-                            display.debug("  found '{0}'".format(os.path.join(path, relpath)))
-                            ret.append(props)
+                    if relpath in seen:
+                        continue
+                    seen.add(relpath)
+                    if props is not None:
+                        display.debug("  found '{0}'".format(os.path.join(path, relpath)))
+                        ret.append(props)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if cache_file:
+            # keep the directories of other trees, drop the ones which disappeared from the walked trees
+            tops = [os.path.abspath(top) for top in self._walked_tops]
+            prefixes = tuple(os.path.join(top, '') for top in tops)
+            directories = dict((key, value) for key, value in self._cache.items() if key not in tops and not key.startswith(prefixes))
+            directories.update(walked)
+            if self._cache_changed or set(directories) != set(self._cache):
+                save_cache(cache_file, directories)
 
         return ret
+
+    def _scan_dir(self, dirpath):
+        ''' Returns the cached entries of a directory if it did not change, or reads them '''
+        key = os.path.abspath(dirpath)
+        try:
+            st = os.stat(dirpath)
+        except OSError:
+            return key, None
+        cached = self._cache.get(key)
+        if cached is not None and cached['mtime'] == st.st_mtime_ns:
+            # the properties of the directory itself can change without changing its modification time
+            cached['props'] = stat_props(dirpath, st, self._with_selinux)
+            return key, cached
+        self._cache_changed = True
+        return key, dict(mtime=st.st_mtime_ns, props=stat_props(dirpath, st, self._with_selinux), entries=scan_dir(dirpath, self._with_selinux))
+
+    def _walk(self, top, pool, walked):
+        ''' Yields (relpath, props) for every entry below top, in the order of os.walk(top, topdown=True).
+            The directories of the same depth are read at the same time when a pool is given. '''
+        self._walked_tops.append(top)
+        listings = {}
+        level = ['']
+        while level:
+            dirpaths = [os.path.join(top, reldir) if reldir else top for reldir in level]
+            scanned = pool.map(self._scan_dir, dirpaths) if pool is not None else map(self._scan_dir, dirpaths)
+            next_level = []
+            for reldir, (key, listing) in zip(level, scanned):
+                if listing is None or listing['entries'] is None:
+                    continue
+                walked[key] = listing
+                listings[reldir] = listing
+                next_level.extend(os.path.join(reldir, name) if reldir else name for name, walk, props in listing['entries'] if walk)
+            level = next_level
+
+        # depth first, like os.walk()
+        stack = ['']
+        while stack:
+            reldir = stack.pop()
+            listing = listings.get(reldir)
+            if listing is None:
+                continue
+            entries = listing['entries']
+            for name, walk, props in entries:
+                relpath = os.path.join(reldir, name) if reldir else name
+                if walk and relpath in listings:
+                    # up to date even if the directory was taken from the cache
+                    props = listings[relpath]['props']
+                if props is not None:
+                    props = dict(dict(root=top, path=relpath), **props)
+                    if props['state'] == 'file':
+                        props['src'] = os.path.join(top, relpath)
+                yield relpath, props
+            stack.extend(reversed([os.path.join(reldir, name) if reldir else name for name, walk, props in entries if walk]))
@@ -0,0 +1,155 @@
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import gzip
+import threading
+import time
+
+from ansible.module_utils.common.text.converters import to_bytes
+from ansible.module_utils.six.moves import queue
+
+_STOP = object()
+
+QUEUE_FULL_POLICIES = ('block', 'drop')
+
+
+def join_lines(payloads):
+    return '\n'.join(payloads)
+
+
+class EventShipper(object):
+    """
+    Ships serialized events to a log backend from a background thread.
+
+    Callbacks hand over every event with ``put`` and return immediately. The
+    worker thread groups the events sharing the same ``key`` into batches,
+    and calls ``send(body, key)`` once a batch holds ``max_batch_events``
+    events or ``max_batch_size`` characters, or ``flush_interval`` seconds
+    after its first event arrived. ``encode`` turns the list of payloads of a
+    batch into the request body, which is gzipped first with ``compress``.
+
+    At most ``queue_size`` events wait for the thread, whatever their size;
+    beyond that ``put`` either blocks or drops the event, depending on
+    ``queue_full``.
+
+    A failing ``send`` is retried ``retries`` times with an exponential
+    backoff, after which the batch is dropped and ``warn`` is called.
+    ``close`` ships whatever is pending and stops the thread.
+    """
+
+    def __init__(self, send, encode=join_lines, queue_size=10000, max_batch_events=100,
+                 max_batch_size=524288, flush_interval=2.0, retries=3, backoff=0.5,
+                 compress=False, queue_full='block', warn=None):
+        if queue_full not in QUEUE_FULL_POLICIES:
+            raise ValueError('queue_full must be one of %s, got %r' % (', '.join(QUEUE_FULL_POLICIES), queue_full))
+
+        self._send = send
+        self._encode = encode
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.max_batch_events = max_batch_events
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.compress = compress
+        self.queue_full = queue_full
+        self._warn = warn
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.sent_events = 0
+        self.failed_events = 0
+        self.dropped_events = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-shipper')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def put(self, payload, key=None):
+        self.start()
+        if self.queue_full == 'block':
+            self._queue.put((key, payload))
+            return
+        try:
+            self._queue.put_nowait((key, payload))
+        except queue.Full:
+            self.dropped_events += 1
+
+    def close(self, timeout=None):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        if self.dropped_events and self._warn is not None:
+            self._warn('Dropped %d event(s) because the send queue was full' % self.dropped_events)
+            self.dropped_events = 0
+
+    def _run(self):
+        # key -> [payloads, size, deadline]; insertion order is also deadline order
+        pending = {}
+        while True:
+            try:
+                if not pending:
+                    item = self._queue.get()
+                else:
+                    deadline = next(iter(pending.values()))[2]
+                    item = self._queue.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                for key, batch in pending.items():
+                    self._ship(batch[0], key)
+                return
+
+            if item is not None:
+                key, payload = item
+                batch = pending.get(key)
+                if batch is None:
+                    batch = pending[key] = [[], 0, time.time() + self.flush_interval]
+                batch[0].append(payload)
+                batch[1] += len(payload)
+                if len(batch[0]) >= self.max_batch_events or batch[1] >= self.max_batch_size:
+                    del pending[key]
+                    self._ship(batch[0], key)
+
+            # ship the batches whose oldest event reached flush_interval
+            now = time.time()
+            while pending:
+                key, batch = next(iter(pending.items()))
+                if batch[2] > now:
+                    break
+                del pending[key]
+                self._ship(batch[0], key)
+
+    def _ship(self, batch, key):
+        if not batch:
+            return
+
+        body = self._encode(batch)
+        if self.compress:
+            body = gzip.compress(to_bytes(body, errors='surrogate_or_strict'))
+
+        for attempt in range(self.retries + 1):
+            try:
+                self._send(body, key)
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+            else:
+                self.sent_events += len(batch)
+                return
+
+        self.failed_events += len(batch)
+        if self._warn is not None:
+            self._warn('Dropping %d event(s) after %d failed attempt(s) to send them: %s'
+                       % (len(batch), self.retries + 1, error))
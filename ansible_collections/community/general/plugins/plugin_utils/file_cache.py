@@ -0,0 +1,311 @@
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import bz2
+import errno
+import gzip
+import lzma
+import os
+import re
+import tempfile
+import time
+import zlib
+
+from ansible.errors import AnsibleError
+from ansible.module_utils.common.text.converters import to_bytes, to_text
+from ansible.plugins.cache import BaseFileCacheModule
+from ansible.utils.display import Display
+
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    HAS_ZSTANDARD = False
+
+display = Display()
+
+COMPRESSIONS = ('none', 'gzip', 'bz2', 'lzma', 'zstd')
+
+# stream headers of every supported format, used to read files whatever they were written with;
+# they are matched in full, as a YAML file may well start with the bz2 magic ``BZh``
+_MAGIC = (
+    (re.compile(re.escape(b'\x1f\x8b\x08')), gzip.decompress),
+    (re.compile(b'BZh[1-9](?:1AY&SY|\x17rE8P\x90)'), bz2.decompress),
+    (re.compile(re.escape(b'\xfd7zXZ\x00')), lzma.decompress),
+    (re.compile(re.escape(b'\x28\xb5\x2f\xfd')), lambda data: zstandard.ZstdDecompressor().decompress(data)),
+)
+
+_DECOMPRESS_ERRORS = (EOFError, OSError, ValueError, lzma.LZMAError)
+if HAS_ZSTANDARD:
+    _DECOMPRESS_ERRORS += (zstandard.ZstdError,)
+
+
+def compress(data, compression):
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    if compression == 'bz2':
+        return bz2.compress(data)
+    if compression == 'lzma':
+        return lzma.compress(data)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def decompress(data):
+    for magic, decompressor in _MAGIC:
+        if magic.match(data):
+            try:
+                return decompressor(data)
+            except _DECOMPRESS_ERRORS:
+                # not a compressed file after all
+                return data
+    return data
+
+
+class IndexedFileCacheModule(BaseFileCacheModule):
+    """
+    A file cache which can spread the per host files over subdirectories,
+    compress them, and keep an index of the cached keys.
+
+    The index is an append-only file of ``<mtime>\\t<key>`` lines, with
+    ``-`` as mtime for a removed key. It is read once and then only from
+    where it was last read, so listing the keys and checking their expiry
+    costs a single ``stat`` instead of one per file.
+
+    Subclasses read and write the files with ``_read_file`` and
+    ``_write_file``, which take care of the compression.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(IndexedFileCacheModule, self).__init__(*args, **kwargs)
+        self._shards = max(int(self.get_option('_shards')), 0)
+        self._compression = self.get_option('_compression')
+        self._use_index = self.get_option('_index')
+
+        if self._compression not in COMPRESSIONS:
+            raise AnsibleError("error in '%s' cache plugin, unknown compression %r" % (self.plugin_name, self._compression))
+        if self._compression == 'zstd' and not HAS_ZSTANDARD:
+            raise AnsibleError("The 'zstandard' python library is required for zstd compression in the '%s' cache plugin" % self.plugin_name)
+
+        self._shard_dirs = set()
+        # key -> mtime, loaded on first use
+        self._index = None
+        # (device, inode, size) of the index file and the number of lines read from it
+        self._index_state = None
+        self._index_lines = 0
+
+    def _read_file(self, filepath):
+        with open(filepath, 'rb') as f:
+            return decompress(f.read())
+
+    def _write_file(self, filepath, data):
+        with open(filepath, 'wb') as f:
+            f.write(compress(data, self._compression))
+
+    def _get_prefix(self):
+        return self.get_option('_prefix') or ''
+
+    def _get_shard_dir(self, key):
+        shard = zlib.crc32(to_bytes(key, errors='surrogate_or_strict')) % self._shards
+        return "%s/%x" % (self._cache_dir, shard)
+
+    def _get_cache_file_name(self, key):
+        if not self._shards:
+            return super(IndexedFileCacheModule, self)._get_cache_file_name(key)
+        return "%s/%s%s" % (self._get_shard_dir(key), self._get_prefix(), key)
+
+    def _scan(self):
+        """
+        Yields the key and path of every file in the cache directory.
+        """
+        prefix = self._get_prefix()
+        if self._shards:
+            dirs = ["%s/%x" % (self._cache_dir, shard) for shard in range(self._shards)]
+        else:
+            dirs = [self._cache_dir]
+
+        for directory in dirs:
+            try:
+                entries = os.listdir(directory)
+            except (OSError, IOError) as e:
+                if e.errno != errno.ENOENT:
+                    display.warning("error in '%s' cache plugin while trying to list %s : %s" % (self.plugin_name, directory, to_text(e)))
+                continue
+            for name in entries:
+                if name.startswith('.') or not name.startswith(prefix):
+                    continue
+                yield name[len(prefix):], os.path.join(directory, name)
+
+    # index handling
+
+    def _get_index_path(self):
+        prefix = self._get_prefix()
+        return os.path.join(self._cache_dir, '.index-%s' % prefix if prefix else '.index')
+
+    def _refresh_index(self):
+        path = self._get_index_path()
+        try:
+            st = os.stat(path)
+        except (OSError, IOError) as e:
+            if e.errno != errno.ENOENT:
+                raise AnsibleError("error in '%s' cache plugin while trying to stat %s : %s" % (self.plugin_name, path, to_text(e)))
+            self._rebuild_index()
+            return
+
+        state = self._index_state
+        if state is not None and state[:2] == (st.st_dev, st.st_ino) and state[2] == st.st_size:
+            return
+        if state is None or state[:2] != (st.st_dev, st.st_ino) or state[2] > st.st_size:
+            # first read, or the index was compacted or rebuilt meanwhile
+            self._index = {}
+            self._index_lines = 0
+            offset = 0
+        else:
+            offset = state[2]
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # a concurrent writer may be midway through its line
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            stamp, dummy, key = to_text(line, errors='surrogate_or_strict').partition('\t')
+            if stamp == '-':
+                self._index.pop(key, None)
+                continue
+            try:
+                self._index[key] = float(stamp)
+            except ValueError:
+                continue
+        self._index_lines += data.count(b'\n', 0, end)
+        self._index_state = (st.st_dev, st.st_ino, offset + end)
+
+        if self._index_lines > 2 * len(self._index) + 1000:
+            self._write_index()
+
+    def _ensure_index(self):
+        if self._index is None:
+            self._refresh_index()
+
+    def _rebuild_index(self):
+        self._index = {}
+        for key, path in self._scan():
+            try:
+                self._index[key] = os.stat(path).st_mtime
+            except (OSError, IOError):
+                pass
+        self._write_index()
+
+    def _write_index(self):
+        path = self._get_index_path()
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, prefix='.index.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b''.join(self._format_index_line(key, mtime) for key, mtime in self._index.items()))
+            os.chmod(tmp_path, 0o644)
+            os.rename(tmp_path, path)
+        except (OSError, IOError) as e:
+            display.warning("error in '%s' cache plugin while trying to write %s : %s" % (self.plugin_name, path, to_text(e)))
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        st = os.stat(path)
+        self._index_state = (st.st_dev, st.st_ino, st.st_size)
+        self._index_lines = len(self._index)
+
+    @staticmethod
+    def _format_index_line(key, mtime):
+        stamp = '-' if mtime is None else '%.6f' % mtime
+        return to_bytes('%s\t%s\n' % (stamp, key), errors='surrogate_or_strict')
+
+    def _append_index(self, key, mtime):
+        self._ensure_index()
+        if mtime is None:
+            self._index.pop(key, None)
+        else:
+            self._index[key] = mtime
+        path = self._get_index_path()
+        try:
+            # a single write in append mode, so concurrent writers do not interleave
+            with open(path, 'ab') as f:
+                f.write(self._format_index_line(key, mtime))
+        except (OSError, IOError) as e:
+            display.warning("error in '%s' cache plugin while trying to write %s : %s" % (self.plugin_name, path, to_text(e)))
+
+    def _is_fresh(self, mtime, now):
+        return self._timeout == 0 or now - mtime <= self._timeout
+
+    # cache API
+
+    def has_expired(self, key):
+        if not self._use_index:
+            return super(IndexedFileCacheModule, self).has_expired(key)
+
+        self._ensure_index()
+        mtime = self._index.get(key)
+        if mtime is None or self._is_fresh(mtime, time.time()):
+            return False
+
+        self._cache.pop(key, None)
+        return True
+
+    def set(self, key, value):
+        if self._shards:
+            directory = self._get_shard_dir(key)
+            if directory not in self._shard_dirs:
+                try:
+                    os.makedirs(directory)
+                except (OSError, IOError) as e:
+                    if e.errno != errno.EEXIST:
+                        display.warning("error in '%s' cache plugin while trying to create %s : %s" % (self.plugin_name, directory, to_text(e)))
+                self._shard_dirs.add(directory)
+
+        super(IndexedFileCacheModule, self).set(key, value)
+        if self._use_index:
+            self._append_index(key, time.time())
+
+    def keys(self):
+        if not self._use_index:
+            return [key for key, path in self._scan() if not self.has_expired(key)]
+
+        self._refresh_index()
+        now = time.time()
+        return [key for key, mtime in self._index.items() if self._is_fresh(mtime, now)]
+
+    def contains(self, key):
+        if key in self._cache:
+            return True
+        if not self._use_index:
+            return super(IndexedFileCacheModule, self).contains(key)
+
+        self._ensure_index()
+        if key not in self._index:
+            # it may have been written by another process meanwhile
+            self._refresh_index()
+        return key in self._index and not self.has_expired(key)
+
+    def delete(self, key):
+        super(IndexedFileCacheModule, self).delete(key)
+        if self._use_index:
+            self._append_index(key, None)
+
+    def flush(self):
+        if not self._use_index:
+            return super(IndexedFileCacheModule, self).flush()
+
+        self._cache = {}
+        self._refresh_index()
+        for key in self._index:
+            try:
+                os.remove(self._get_cache_file_name(key))
+            except (OSError, IOError):
+                pass
+        self._index = {}
+        self._write_index()
@@ -0,0 +1,95 @@
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import time
+
+import pytest
+
+from ansible.plugins.loader import cache_loader
+
+
+def make_cache(plugin, path, **options):
+    return cache_loader.get('community.general.%s' % plugin, _uri=str(path), _prefix='', **options)
+
+
+@pytest.mark.parametrize('plugin', ['pickle', 'yaml'])
+@pytest.mark.parametrize('compression', ['none', 'gzip', 'bz2', 'lzma'])
+def test_file_cache_roundtrip(tmp_path, plugin, compression):
+    cache = make_cache(plugin, tmp_path, _shards=8, _compression=compression, _index=True)
+    for i in range(50):
+        cache.set('host%d' % i, {'i': i, 'name': u'höst'})
+
+    assert len([name for name in os.listdir(str(tmp_path)) if not name.startswith('.')]) == 8
+
+    # a fresh instance reads the index and the files back
+    cache = make_cache(plugin, tmp_path, _shards=8, _index=True)
+    assert sorted(cache.keys()) == sorted('host%d' % i for i in range(50))
+    assert cache.get('host7') == {'i': 7, 'name': u'höst'}
+
+    cache.delete('host7')
+    assert not cache.contains('host7')
+    assert len(make_cache(plugin, tmp_path, _shards=8, _index=True).keys()) == 49
+
+
+def test_file_cache_index_avoids_stat(tmp_path, monkeypatch):
+    cache = make_cache('pickle', tmp_path, _index=True)
+    for i in range(20):
+        cache.set('host%d' % i, {'i': i})
+
+    cache = make_cache('pickle', tmp_path, _index=True)
+    calls = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, 'stat', lambda path, *args, **kwargs: calls.append(path) or real_stat(path, *args, **kwargs))
+    assert len(cache.keys()) == 20
+    assert all(cache.contains('host%d' % i) for i in range(20))
+    assert len(calls) == 1
+
+
+def test_file_cache_index_is_rebuilt(tmp_path):
+    cache = make_cache('pickle', tmp_path)
+    cache.set('host1', {'a': 1})
+    cache.set('host2', {'a': 2})
+    os.utime(str(tmp_path / 'host2'), (time.time() - 1000, time.time() - 1000))
+
+    cache = make_cache('pickle', tmp_path, _index=True, _timeout=100)
+    assert cache.keys() == ['host1']
+    assert cache.contains('host1')
+    assert not cache.contains('host2')
+    assert os.path.exists(str(tmp_path / '.index'))
+
+
+def test_file_cache_sees_other_writers(tmp_path):
+    reader = make_cache('yaml', tmp_path, _index=True)
+    writer = make_cache('yaml', tmp_path, _index=True)
+    writer.set('host1', {'a': 1})
+    assert reader.keys() == ['host1']
+
+    writer.set('host2', {'a': 2})
+    assert reader.contains('host2')
+
+    writer.flush()
+    assert reader.keys() == []
+    assert os.listdir(str(tmp_path)) == ['.index']
+
+
+def test_file_cache_reads_any_compression(tmp_path):
+    make_cache('pickle', tmp_path, _compression='gzip').set('host1', {'a': 1})
+    cache = make_cache('pickle', tmp_path, _compression='lzma')
+    assert cache.get('host1') == {'a': 1}
+
+
+@pytest.mark.parametrize('plugin', ['pickle', 'yaml'])
+def test_file_cache_uncompressed_magic(tmp_path, plugin):
+    # uncompressed files starting like a compressed stream are read as they are
+    cache = make_cache(plugin, tmp_path)
+    cache.set('host1', {'BZhost': 'x'})
+    cache.set('host2', {'BZh91AY&SY': 'x'})
+
+    cache = make_cache(plugin, tmp_path)
+    assert cache.get('host1') == {'BZhost': 'x'}
+    assert cache.get('host2') == {'BZh91AY&SY': 'x'}
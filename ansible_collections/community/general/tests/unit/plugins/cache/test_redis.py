@@ -6,6 +6,9 @@
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import time
+import zlib
+
 import pytest
 
 pytest.importorskip('redis')
@@ -24,3 +27,141 @@ def test_redis_cachemodule():
     # The _uri option is required for the redis plugin
     connection = '[::1]:6379:1'
     assert isinstance(cache_loader.get('community.general.redis', **{'_uri': connection}), RedisCache)
+
+
+class FakeRedis(object):
+    """
+    In-memory stand-in for the parts of StrictRedis used by the cache plugin,
+    counting the round trips to the server.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.zset = {}
+        self.round_trips = 0
+
+    def _call(self, name, *args):
+        self.round_trips += 1
+        return getattr(self, '_' + name)(*args)
+
+    def __getattr__(self, name):
+        if hasattr(type(self), '_' + name):
+            return lambda *args: self._call(name, *args)
+        raise AttributeError(name)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def _get(self, key):
+        return self.values.get(key)
+
+    def _mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def _set(self, key, value):
+        self.values[key] = value.encode('utf-8') if isinstance(value, str) else value
+
+    def _setex(self, key, timeout, value):
+        self._set(key, value)
+
+    def _delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def _zadd(self, name, mapping):
+        self.zset.update(mapping)
+
+    def _zrange(self, name, start, end):
+        return [key.encode('utf-8') for key in sorted(self.zset, key=self.zset.get)]
+
+    def _zrank(self, name, key):
+        return 0 if key in self.zset else None
+
+    def _zrem(self, name, *keys):
+        for key in keys:
+            self.zset.pop(key, None)
+
+    def _zremrangebyscore(self, name, low, high):
+        for key in [k for k, score in self.zset.items() if low <= score <= high]:
+            del self.zset[key]
+
+
+class FakePipeline(object):
+
+    def __init__(self, db):
+        self.db = db
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        self.db.round_trips += 1
+        return [getattr(self.db, '_' + name)(*args) for name, args in self.commands]
+
+
+def make_cache(**options):
+    cache = cache_loader.get('community.general.redis', _uri='127.0.0.1:6379:1', **options)
+    cache._db = FakeRedis()
+    return cache
+
+
+def test_redis_set_is_one_round_trip():
+    cache = make_cache()
+    cache.set('host1', {'a': 1})
+
+    assert cache._db.round_trips == 1
+    assert cache._db.values['ansible_factshost1'] == b'{"a":1}'
+    assert 'host1' in cache._db.zset
+
+
+def test_redis_batched_writes():
+    cache = make_cache(_batch_size=10)
+    for i in range(25):
+        cache.set('host%d' % i, {'i': i})
+
+    assert cache._db.round_trips == 2
+    assert cache.contains('host24')
+    assert cache.get('host24') == {'i': 24}
+
+    # reading the keyset writes the pending records first
+    assert len(cache.keys()) == 25
+
+
+def test_redis_copy_uses_mget():
+    cache = make_cache(_batch_size=100)
+    for i in range(5):
+        cache.set('host%d' % i, {'i': i})
+    cache.keys()
+    cache._cache = {}
+    del cache._db.values['ansible_factshost3']
+    cache._db.round_trips = 0
+
+    assert cache.copy() == dict(('host%d' % i, {'i': i}) for i in (0, 1, 2, 4))
+    # zrange, mget and the removal of the stale key
+    assert cache._db.round_trips == 3
+    assert 'host3' not in cache._db.zset
+
+
+def test_redis_zlib_encoding():
+    cache = make_cache(_encoding='zlib')
+    cache.set('host1', {'a': 1})
+    stored = cache._db.values['ansible_factshost1']
+
+    assert zlib.decompress(stored) == b'{"a":1}'
+    cache._cache = {}
+    assert cache.get('host1') == {'a': 1}
+
+
+def test_redis_expire_interval():
+    cache = make_cache(_expire_interval=60)
+    cache.set('host1', {'a': 1})
+    cache.contains('host1')
+    cache.contains('host1')
+    cache._db.round_trips = 0
+
+    cache._last_expire = time.time() - 120
+    cache.contains('host1')
+    cache.contains('host1')
+    # one sweep and two zrank calls
+    assert cache._db.round_trips == 3
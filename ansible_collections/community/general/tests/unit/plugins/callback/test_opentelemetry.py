@@ -14,6 +14,12 @@ from ansible_collections.community.general.plugins.callback.opentelemetry import
 from collections import OrderedDict
 import sys
 
+try:
+    from opentelemetry.trace.status import Status, StatusCode
+    HAS_OPENTELEMETRY = True
+except ImportError:
+    HAS_OPENTELEMETRY = False
+
 OPENTELEMETRY_MINIMUM_PYTHON_VERSION = (3, 7)
 
 
@@ -112,6 +118,50 @@ class TestOpentelemetry(unittest.TestCase):
 
         self.assertEqual(self.opentelemetry.ansible_version, '1.2.3')
 
+    @unittest.skipIf(not HAS_OPENTELEMETRY, 'the OpenTelemetry SDK is needed to create spans')
+    def test_export_host_while_running(self):
+        self.opentelemetry.init_tracer('ansible', 'grpc', '/spans.json', max_queue_size=10, max_export_batch_size=2)
+        self.opentelemetry.start_trace('myplaybook', None)
+        tasks_data = OrderedDict()
+        self.opentelemetry.start_task(tasks_data, False, 'myplay', self.mock_task)
+
+        host_data = self.opentelemetry.finish_task(tasks_data, 'ok', self.my_task_result, "")
+        self.opentelemetry.export_host(tasks_data['myuuid'], host_data, False, False)
+        self.opentelemetry.tracer_provider.force_flush()
+
+        spans = self.opentelemetry.otel_exporter.get_finished_spans()
+        self.assertEqual([span.name for span in spans], ['mytask'])
+        self.assertEqual(spans[0].attributes['ansible.task.host.status'], 'ok')
+        self.assertEqual(spans[0].parent.span_id, self.opentelemetry.parent_span.get_span_context().span_id)
+        self.assertIsNone(host_data.result)
+
+        # a second result for the same host is ignored
+        self.assertIsNone(self.opentelemetry.finish_task(tasks_data, 'failed', self.my_task_result, ""))
+
+        self.opentelemetry.release_task(tasks_data, 'myuuid', False, False)
+        self.assertEqual(tasks_data, OrderedDict())
+
+        otel_exporter = self.opentelemetry.finish_trace(Status(status_code=StatusCode.OK))
+        spans = otel_exporter.get_finished_spans()
+        self.assertEqual([span.name for span in spans], ['mytask', 'myplaybook'])
+        self.assertEqual(spans[1].attributes['ansible.host.name'], 'my-host')
+
+    @unittest.skipIf(not HAS_OPENTELEMETRY, 'the OpenTelemetry SDK is needed to create spans')
+    def test_release_task_exports_includes(self):
+        self.opentelemetry.init_tracer('ansible', 'grpc', '/spans.json')
+        self.opentelemetry.start_trace('myplaybook', None)
+        tasks_data = OrderedDict()
+        tasks_data['myuuid'] = TaskData('myuuid', 'mytask', '/mypath', 'myplay', 'myaction', {})
+        include = TaskResult(host=None, task=self.mock_task, return_data={}, task_fields=self.task_fields)
+
+        for dummy in range(2):
+            self.opentelemetry.finish_task(tasks_data, 'included', include, "")
+        self.opentelemetry.release_task(tasks_data, 'myuuid', False, False)
+
+        spans = self.opentelemetry.finish_trace(Status(status_code=StatusCode.OK)).get_finished_spans()
+        self.assertEqual([(span.name, span.attributes.get('ansible.task.host.status')) for span in spans],
+                         [('mytask', 'included'), ('myplaybook', None)])
+
     def test_get_error_message(self):
         test_cases = (
             ('my-exception', 'my-msg', None, 'my-exception'),
@@ -9,6 +9,7 @@ from ansible.executor.task_result import TaskResult
 from ansible_collections.community.general.tests.unit.compat import unittest
 from ansible_collections.community.general.tests.unit.compat.mock import patch, Mock
 from ansible_collections.community.general.plugins.callback.splunk import SplunkHTTPCollectorSource
+from ansible_collections.community.general.plugins.plugin_utils.event_shipper import EventShipper
 from datetime import datetime
 
 import json
@@ -62,3 +63,27 @@ class TestSplunkClient(unittest.TestCase):
         self.assertEqual(sent_data['event']['timestamp'], '2020-12-01 00:00:00 +0000')
         self.assertEqual(sent_data['event']['host'], 'my-host')
         self.assertEqual(sent_data['event']['ip_address'], '1.2.3.4')
+
+    @patch('ansible_collections.community.general.plugins.callback.splunk.now')
+    @patch('ansible_collections.community.general.plugins.callback.splunk.open_url')
+    def test_background_batch(self, open_url_mock, mock_now):
+        mock_now.return_value = datetime(2020, 12, 1)
+        self.splunk.shipper = EventShipper(
+            lambda body, key: self.splunk.post('endpoint', 'token', False, body),
+            max_batch_events=10, flush_interval=60,
+        )
+
+        for state in ('OK', 'FAILED'):
+            result = TaskResult(host=self.mock_host, task=self.mock_task, return_data={}, task_fields={'args': {}})
+            self.splunk.send_event(
+                url='endpoint', authtoken='token', validate_certs=False, include_milliseconds=False,
+                batch=None, state=state, result=result, runtime=100
+            )
+        self.splunk.shipper.close()
+
+        self.assertEqual(open_url_mock.call_count, 1)
+        args, kwargs = open_url_mock.call_args
+        events = [json.loads(line) for line in args[1].splitlines()]
+
+        self.assertEqual([e['event']['status'] for e in events], ['OK', 'FAILED'])
+        self.assertEqual(kwargs['headers']['Authorization'], 'Splunk token')
@@ -0,0 +1,78 @@
+# Copyright (c) Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import gzip
+import json
+
+from ansible.executor.task_result import TaskResult
+from ansible.plugins.loader import callback_loader
+from ansible_collections.community.general.tests.unit.compat import unittest
+from ansible_collections.community.general.tests.unit.compat.mock import patch, Mock
+
+
+class TestSumologic(unittest.TestCase):
+    @patch('ansible_collections.community.general.plugins.callback.sumologic.socket')
+    def setUp(self, mock_socket):
+        mock_socket.gethostname.return_value = 'my-host'
+        mock_socket.gethostbyname.return_value = '1.2.3.4'
+        self.callback = callback_loader.get('community.general.sumologic')
+        self.mock_task = Mock('MockTask')
+        self.mock_task._role = 'myrole'
+        self.mock_task._uuid = 'myuuid'
+
+    def result(self, host_name):
+        host = Mock('MockHost')
+        host.name = host_name
+        return TaskResult(host=host, task=self.mock_task, return_data={}, task_fields={'args': {}})
+
+    def run_playbook(self, **options):
+        options.setdefault('url', 'https://collector.example.com/receiver')
+        self.callback.set_options(direct=options)
+        self.callback.v2_playbook_on_start(Mock(_file_name='/plays/site.yml'))
+        self.callback.v2_playbook_on_task_start(self.mock_task, False)
+        self.callback.v2_runner_on_ok(self.result('web1'))
+        self.callback.v2_runner_on_failed(self.result('web2'))
+        self.callback.v2_runner_on_skipped(self.result('web1'))
+        self.callback.v2_playbook_on_stats(Mock())
+
+    @patch('ansible_collections.community.general.plugins.callback.sumologic.open_url')
+    def test_background_batches_per_host(self, open_url_mock):
+        self.run_playbook(flush_interval=60.0)
+
+        self.assertEqual(open_url_mock.call_count, 2)
+        sent = {}
+        for args, kwargs in open_url_mock.call_args_list:
+            self.assertEqual(args[0], 'https://collector.example.com/receiver')
+            self.assertEqual(kwargs['method'], 'POST')
+            self.assertEqual(kwargs['headers']['Content-type'], 'application/json')
+            self.assertNotIn('Content-Encoding', kwargs['headers'])
+            events = [json.loads(line) for line in kwargs['data'].split('\n')]
+            sent[kwargs['headers']['X-Sumo-Host']] = events
+
+        self.assertEqual([event['status'] for event in sent['web1']], ['OK', 'SKIPPED'])
+        self.assertEqual([event['status'] for event in sent['web2']], ['FAILED'])
+        self.assertEqual(sent['web2'][0]['ansible_host'], 'web2')
+        self.assertEqual(sent['web2'][0]['ansible_playbook'], 'site.yml')
+        self.assertEqual(sent['web2'][0]['host'], 'my-host')
+
+    @patch('ansible_collections.community.general.plugins.callback.sumologic.open_url')
+    def test_compressed(self, open_url_mock):
+        self.run_playbook(flush_interval=60.0, compress=True)
+
+        self.assertEqual(open_url_mock.call_count, 2)
+        for args, kwargs in open_url_mock.call_args_list:
+            self.assertEqual(kwargs['headers']['Content-Encoding'], 'gzip')
+            for line in gzip.decompress(kwargs['data']).decode('utf-8').split('\n'):
+                self.assertEqual(json.loads(line)['ansible_host'], kwargs['headers']['X-Sumo-Host'])
+
+    @patch('ansible_collections.community.general.plugins.callback.sumologic.open_url')
+    def test_send_in_foreground(self, open_url_mock):
+        self.run_playbook(send_in_background=False)
+
+        self.assertIsNone(self.callback.sumologic.shipper)
+        self.assertEqual([json.loads(kwargs['data'])['status'] for args, kwargs in open_url_mock.call_args_list],
+                         ['OK', 'FAILED', 'SKIPPED'])
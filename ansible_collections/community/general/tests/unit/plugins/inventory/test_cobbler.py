@@ -8,6 +8,10 @@ __metaclass__ = type
 
 import pytest
 
+from ansible.inventory.data import InventoryData
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.loader import inventory_loader
+from ansible.module_utils.six.moves import xmlrpc_client
 from ansible_collections.community.general.plugins.inventory.cobbler import InventoryModule
 
 
@@ -29,3 +33,113 @@ def test_verify_file(tmp_path, inventory):
 
 def test_verify_file_bad_config(inventory):
     assert inventory.verify_file('foobar.cobbler.yml') is False
+
+
+class FakeCobbler(object):
+    """Cobbler XML-RPC API over in-memory profiles and systems, logging every call"""
+
+    def __init__(self, since=True):
+        self.mtime = 100.0
+        self.items = dict(profile={}, system={})
+        self.changed = dict(profile={}, system={})
+        self.calls = []
+        self.since = since
+
+    def set(self, what, item):
+        self.items[what][item['name']] = item
+        self.changed[what][item['name']] = self.mtime
+
+    def delete(self, what, name):
+        del self.items[what][name]
+        del self.changed[what][name]
+
+    def last_modified_time(self):
+        self.calls.append('last_modified_time')
+        return self.mtime
+
+    def get_profiles(self):
+        self.calls.append('get_profiles')
+        return list(self.items['profile'].values())
+
+    def get_systems(self):
+        self.calls.append('get_systems')
+        return list(self.items['system'].values())
+
+    def _since(self, what, mtime):
+        self.calls.append(('get_%ss_since' % what, mtime))
+        if not self.since:
+            raise xmlrpc_client.Fault(1, 'unknown remote method')
+        return [item for name, item in self.items[what].items() if self.changed[what][name] > mtime]
+
+    def get_profiles_since(self, mtime):
+        return self._since('profile', mtime)
+
+    def get_systems_since(self, mtime):
+        return self._since('system', mtime)
+
+    def get_item_names(self, what):
+        self.calls.append(('get_item_names', what))
+        return list(self.items[what])
+
+
+def system(name, hostname):
+    return dict(name=name, hostname=hostname, profile='web', mgmt_classes=[], owners=[], status='production',
+                interfaces={'eth0': dict(ip_address='', ipv6_address='', dns_name='', management=True, static=True)})
+
+
+def parse(tmp_path, server):
+    config = tmp_path / 'test.cobbler.yml'
+    config.write_text(u'\n'.join([
+        'plugin: community.general.cobbler',
+        'url: http://cobbler/cobbler_api',
+        'cache: true',
+        'cache_plugin: ansible.builtin.jsonfile',
+        'cache_connection: %s' % (tmp_path / 'cache'),
+        'cache_revalidate: true',
+    ]))
+    plugin = inventory_loader.get('community.general.cobbler')
+    plugin.connection = server
+    plugin.token = None
+    inventory = InventoryData()
+    plugin.parse(inventory, DataLoader(), str(config))
+    plugin.update_cache_if_changed()
+    return sorted(name for name in inventory.hosts)
+
+
+def test_revalidate_cache(tmp_path):
+    server = FakeCobbler()
+    server.set('profile', dict(name='web', parent=''))
+    server.set('system', system('h1', 'h1.example.com'))
+    server.set('system', system('h2', 'h2.example.com'))
+
+    assert parse(tmp_path, server) == ['h1.example.com', 'h2.example.com']
+    assert server.calls == ['last_modified_time', 'get_profiles', 'get_systems']
+
+    # nothing changed: only the modification time is asked for
+    server.calls = []
+    assert parse(tmp_path, server) == ['h1.example.com', 'h2.example.com']
+    assert server.calls == ['last_modified_time']
+
+    # only the changed systems are fetched, the deleted ones are dropped
+    server.mtime = 200.0
+    server.set('system', system('h2', 'h2-renamed.example.com'))
+    server.set('system', system('h3', 'h3.example.com'))
+    server.delete('system', 'h1')
+    server.calls = []
+    assert parse(tmp_path, server) == ['h2-renamed.example.com', 'h3.example.com']
+    assert server.calls == ['last_modified_time', ('get_profiles_since', 100.0), ('get_item_names', 'profile'),
+                            ('get_systems_since', 100.0), ('get_item_names', 'system')]
+
+
+def test_revalidate_without_since_calls(tmp_path):
+    server = FakeCobbler(since=False)
+    server.set('profile', dict(name='web', parent=''))
+    server.set('system', system('h1', 'h1.example.com'))
+    parse(tmp_path, server)
+
+    server.mtime = 200.0
+    server.set('system', system('h2', 'h2.example.com'))
+    server.calls = []
+    assert parse(tmp_path, server) == ['h1.example.com', 'h2.example.com']
+    assert server.calls == ['last_modified_time', ('get_profiles_since', 100.0), 'get_profiles',
+                            ('get_systems_since', 100.0), 'get_systems']
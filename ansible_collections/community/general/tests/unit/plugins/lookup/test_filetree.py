@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+
+import pytest
+
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.loader import lookup_loader
+
+from ansible_collections.community.general.plugins.lookup.filetree import file_props
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for directory in ('a/b/c', 'a/d', 'e'):
+        (tmp_path / 'root' / directory).mkdir(parents=True)
+    for filename in ('f1', 'a/f2', 'a/b/f3', 'a/b/c/f4', 'e/f5'):
+        (tmp_path / 'root' / filename).write_text(filename)
+    os.symlink('../f1', str(tmp_path / 'root' / 'a' / 'link'))
+    os.symlink('a', str(tmp_path / 'root' / 'dirlink'))
+    (tmp_path / 'other').mkdir()
+    (tmp_path / 'other' / 'f1').write_text('other')
+    (tmp_path / 'other' / 'f6').write_text('other')
+    return tmp_path
+
+
+def walk_expected(top):
+    # what the lookup always returned: os.walk() and file_props() for every entry
+    expected = []
+    for root, dirs, files in os.walk(top, topdown=True):
+        for entry in dirs + files:
+            expected.append(file_props(top, os.path.relpath(os.path.join(root, entry), top)))
+    return expected
+
+
+def run_filetree(terms, **kwargs):
+    lookup = lookup_loader.get('community.general.filetree', loader=DataLoader())
+    return lookup.run(terms, {}, **kwargs)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_filetree(tree, workers):
+    top = str(tree / 'root')
+    result = run_filetree([top], workers=workers)
+    assert result == walk_expected(top)
+    # symlinks to directories are returned, but not descended into
+    assert [props['path'] for props in result if props['path'].startswith('dirlink')] == ['dirlink']
+
+
+def test_filetree_first_found(tree):
+    result = run_filetree([str(tree / 'root'), str(tree / 'other')])
+    assert [props['path'] for props in result if props['root'] == str(tree / 'other')] == ['f6']
+
+
+def test_filetree_cache(tree):
+    top = str(tree / 'root')
+    cache_file = str(tree / 'cache.json')
+
+    assert run_filetree([top], cache_file=cache_file) == walk_expected(top)
+    assert os.path.exists(cache_file)
+    assert run_filetree([top], cache_file=cache_file, workers=2) == walk_expected(top)
+
+    # adding and removing entries changes the modification time of their directory
+    (tree / 'root' / 'a' / 'd' / 'f7').write_text('new')
+    (tree / 'root' / 'e' / 'f5').unlink()
+    (tree / 'root' / 'e').rmdir()
+    result = run_filetree([top], cache_file=cache_file)
+    assert result == walk_expected(top)
+    assert 'a/d/f7' in [props['path'] for props in result]
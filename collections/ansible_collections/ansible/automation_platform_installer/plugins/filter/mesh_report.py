@@ -7,6 +7,7 @@ __metaclass__ = type
 from ansible.errors import AnsibleFilterError
 
 _RECEPTORCTL_TASK_ATTRS = ['results', 'changed']
+_MESH_PING_TASK_ATTRS = ['mesh_successful_pings', 'mesh_failed_pings']
 _RECEPTORCTL_CMD_PARAMS = ['receptorctl', '--socket', 'ping']
 
 __ERROR_MSG = "Not a valid 'receptorctl ping' task. Cannot process value"
@@ -29,6 +30,12 @@ def _assert_receptorctl_task(task_output):
 
 def do_mesh_report(task_output):
 
+    # output of the receptor_mesh_ping module
+    if isinstance(task_output, dict) and all(item in task_output for item in _MESH_PING_TASK_ATTRS):
+        return dict(mesh_successful_pings=task_output['mesh_successful_pings'],
+                    mesh_failed_pings=task_output['mesh_failed_pings'],
+                    mesh_ping_latency=task_output.get('mesh_ping_latency', {}))
+
     # validate task format
     _assert_receptorctl_task(task_output)
 
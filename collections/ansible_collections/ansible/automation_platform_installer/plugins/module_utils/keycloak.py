@@ -30,13 +30,24 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import errno
+import gzip
+import hashlib
+import io
 import json
+import netrc
+import os
+import socket
+import tempfile
+import time
 import traceback
 
-from ansible.module_utils.urls import open_url
-from ansible.module_utils.six.moves.urllib.parse import urlencode, quote
-from ansible.module_utils.six.moves.urllib.error import HTTPError
-from ansible.module_utils.common.text.converters import to_native, to_text
+from ansible.module_utils import urls
+from ansible.module_utils.six.moves import http_client
+from ansible.module_utils.six.moves.urllib.parse import urlencode, quote, urlparse
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.six.moves.urllib.request import getproxies, proxy_bypass
+from ansible.module_utils.common.text.converters import to_bytes, to_native, to_text
 
 URL_REALMS = "{url}/admin/realms"
 URL_REALM = "{url}/admin/realms/{realm}"
@@ -78,6 +89,162 @@ URL_AUTHENTICATION_EXECUTION_RAISE_PRIORITY = "{url}/admin/realms/{realm}/authen
 URL_AUTHENTICATION_EXECUTION_LOWER_PRIORITY = "{url}/admin/realms/{realm}/authentication/executions/{id}/lower-priority"
 URL_AUTHENTICATION_CONFIG = "{url}/admin/realms/{realm}/authentication/config/{id}"
 
+# seconds before its expiry at which a cached token is not used anymore
+TOKEN_EXPIRY_MARGIN = 10
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# the helpers building the TLS context of open_url are only there in recent ansible-core
+# releases; HTTPS requests are handed over to open_url itself on older ones
+HAS_URLS_SSL_CONTEXT = hasattr(urls, 'get_ca_certs') and hasattr(urls, 'make_context')
+
+
+class PooledResponse(object):
+    """ Fully read response of a pooled connection, with the parts of the
+        urllib response interface used by KeycloakAPI
+    """
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = self.code = status
+        self.reason = reason
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def read(self, *args):
+        return self._body.read(*args)
+
+    def getcode(self):
+        return self.status
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+
+class ConnectionPool(object):
+    """ Keeps one keep-alive connection per server, certificate validation mode
+        and client certificate, so that all requests of a module share it
+        instead of each of them opening a new connection and doing a new TLS
+        handshake.
+
+        Requests are sent the way ansible.module_utils.urls.open_url sends them:
+        the server certificate is checked against the same CA certificates,
+        credentials from ~/.netrc are used unless an Authorization header is
+        given, and gzip response bodies are decompressed. Requests going through
+        a proxy, redirected ones, and HTTPS ones on ansible-core releases without
+        the TLS context helpers of open_url are handed over to open_url itself.
+    """
+    def __init__(self):
+        self._connections = {}
+
+    def _connect(self, scheme, netloc, validate_certs, client_cert, client_key, timeout):
+        if scheme == 'http':
+            return http_client.HTTPConnection(netloc, timeout=timeout)
+        cafile, cadata, dummy = urls.get_ca_certs()
+        context = urls.make_context(cafile=cafile, cadata=cadata, validate_certs=validate_certs,
+                                    client_cert=client_cert, client_key=client_key)
+        return http_client.HTTPSConnection(netloc, timeout=timeout, context=context)
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+    def open_url(self, url, method='GET', headers=None, data=None, validate_certs=True, timeout=10,
+                 client_cert=None, client_key=None):
+        parsed = urlparse(url)
+        proxied = parsed.scheme in getproxies() and not proxy_bypass(parsed.hostname)
+        pooled = parsed.scheme == 'http' or (parsed.scheme == 'https' and HAS_URLS_SSL_CONTEXT)
+        if not pooled or proxied:
+            return urls.open_url(url, method=method, headers=headers, data=data, validate_certs=validate_certs,
+                                 timeout=timeout, client_cert=client_cert, client_key=client_key)
+
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        request_headers = {'User-Agent': 'ansible-httpget'}
+        request_headers.update(_netrc_headers(parsed.hostname))
+        request_headers.update(headers or {})
+        if data is not None:
+            data = to_bytes(data, errors='surrogate_or_strict')
+            request_headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+
+        key = (parsed.scheme, parsed.netloc, validate_certs, client_cert, client_key)
+        while True:
+            connection = self._connections.get(key)
+            reused = connection is not None
+            if not reused:
+                connection = self._connections[key] = self._connect(parsed.scheme, parsed.netloc, validate_certs,
+                                                                    client_cert, client_key, timeout)
+            try:
+                connection.request(method, path, body=data, headers=request_headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http_client.HTTPException, socket.error) as e:
+                connection.close()
+                del self._connections[key]
+                # the server may have closed an idle keep-alive connection; the
+                # request never reached it, so it is safe to send it again
+                if reused and isinstance(e, (http_client.BadStatusLine, socket.error)) and \
+                        getattr(e, 'errno', None) in (None, errno.ECONNRESET, errno.EPIPE):
+                    continue
+                raise URLError(e)
+            break
+
+        if response.will_close:
+            connection.close()
+            del self._connections[key]
+        if response.status in REDIRECT_CODES:
+            return urls.open_url(url, method=method, headers=headers, data=data, validate_certs=validate_certs,
+                                 timeout=timeout, client_cert=client_cert, client_key=client_key)
+        if response.getheader('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response.msg, io.BytesIO(body))
+        return PooledResponse(url, response.status, response.reason, response.msg, body)
+
+
+def _netrc_headers(hostname):
+    """ Authorization header open_url would send from the credentials of
+        hostname in ~/.netrc, or $NETRC
+    """
+    try:
+        login = netrc.netrc(os.environ.get('NETRC')).authenticators(hostname)
+    except IOError:
+        login = None
+    if login:
+        username, dummy, password = login
+        if username and password:
+            return {'Authorization': urls.basic_auth_header(username, password)}
+    return {}
+
+
+# shared by get_token and all KeycloakAPI methods
+_pool = ConnectionPool()
+
+# module parameters and connection header of a token taken from the token cache
+_cached_token = None
+
+
+def open_url(url, method='GET', headers=None, data=None, validate_certs=True, timeout=10):
+    global _cached_token
+
+    try:
+        return _pool.open_url(url, method=method, headers=headers, data=data,
+                              validate_certs=validate_certs, timeout=timeout)
+    except HTTPError as e:
+        if e.code != 401 or _cached_token is None or headers is not _cached_token[1]:
+            raise
+    # the cached token was revoked before its expiry; log in again and update
+    # the header in place, it is the one shared by the KeycloakAPI object
+    module_params, connection_header = _cached_token
+    _cached_token = None
+    connection_header.update(get_token(module_params, refresh=True))
+    return _pool.open_url(url, method=method, headers=headers, data=data,
+                          validate_certs=validate_certs, timeout=timeout)
+
 
 def keycloak_argument_spec():
     """
@@ -94,6 +261,7 @@ def keycloak_argument_spec():
         auth_password=dict(type='str', aliases=['password'], no_log=True),
         validate_certs=dict(type='bool', default=True),
         token=dict(type='str', no_log=True),
+        token_cache_file=dict(type='path'),
     )
 
 
@@ -105,58 +273,123 @@ class KeycloakError(Exception):
     pass
 
 
-def get_token(module_params):
+def _token_cache_key(module_params):
+    """ Key of the cached token of a server, realm, client and user; the
+        secrets are left out of it, so that no hash of them is written to
+        disk. A token obtained with changed secrets is used until Keycloak
+        rejects it, and then replaced
+    """
+    fields = [module_params.get(name) or '' for name in (
+        'auth_keycloak_url', 'auth_realm', 'auth_client_id', 'auth_username')]
+    return hashlib.sha256(to_bytes(json.dumps(fields), errors='surrogate_or_strict')).hexdigest()
+
+
+def _read_token_cache(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _write_token_cache(path, cache):
+    """ Writes the token cache readable by its owner only, replacing the file
+        at once so that concurrent modules never read a partial one
+    """
+    directory = os.path.dirname(path) or '.'
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.keycloak-token-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        # the cache is only an optimization
+        pass
+
+
+def _request_token(module_params):
+    base_url = module_params.get('auth_keycloak_url')
+    validate_certs = module_params.get('validate_certs')
+    auth_realm = module_params.get('auth_realm')
+    client_id = module_params.get('auth_client_id')
+    auth_username = module_params.get('auth_username')
+    auth_password = module_params.get('auth_password')
+    client_secret = module_params.get('auth_client_secret')
+    auth_url = URL_TOKEN.format(url=base_url, realm=auth_realm)
+    temp_payload = {
+        'grant_type': 'password',
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'username': auth_username,
+        'password': auth_password,
+    }
+    # Remove empty items, for instance missing client_secret
+    payload = dict(
+        (k, v) for k, v in temp_payload.items() if v is not None)
+    try:
+        r = json.loads(to_native(open_url(auth_url, method='POST',
+                                          validate_certs=validate_certs,
+                                          data=urlencode(payload)).read()))
+    except ValueError as e:
+        raise KeycloakError(
+            'API returned invalid JSON when trying to obtain access token from %s: %s'
+            % (auth_url, str(e)))
+    except Exception as e:
+        raise KeycloakError('Could not obtain access token from %s: %s'
+                            % (auth_url, str(e)))
+
+    try:
+        return r['access_token'], r.get('expires_in')
+    except KeyError:
+        raise KeycloakError(
+            'Could not obtain access token from %s' % auth_url)
+
+
+def get_token(module_params, refresh=False):
     """ Obtains connection header with token for the authentication,
-        token already given or obtained from credentials
+        token already given, cached in token_cache_file or obtained from credentials
         :param module_params: parameters of the module
+        :param refresh: ignore the cached token and obtain a new one
         :return: connection header
     """
+    global _cached_token
+
     token = module_params.get('token')
     base_url = module_params.get('auth_keycloak_url')
 
     if not base_url.lower().startswith(('http', 'https')):
         raise KeycloakError("auth_url '%s' should either start with 'http' or 'https'." % base_url)
 
+    from_cache = False
     if token is None:
-        base_url = module_params.get('auth_keycloak_url')
-        validate_certs = module_params.get('validate_certs')
-        auth_realm = module_params.get('auth_realm')
-        client_id = module_params.get('auth_client_id')
-        auth_username = module_params.get('auth_username')
-        auth_password = module_params.get('auth_password')
-        client_secret = module_params.get('auth_client_secret')
-        auth_url = URL_TOKEN.format(url=base_url, realm=auth_realm)
-        temp_payload = {
-            'grant_type': 'password',
-            'client_id': client_id,
-            'client_secret': client_secret,
-            'username': auth_username,
-            'password': auth_password,
-        }
-        # Remove empty items, for instance missing client_secret
-        payload = dict(
-            (k, v) for k, v in temp_payload.items() if v is not None)
-        try:
-            r = json.loads(to_native(open_url(auth_url, method='POST',
-                                              validate_certs=validate_certs,
-                                              data=urlencode(payload)).read()))
-        except ValueError as e:
-            raise KeycloakError(
-                'API returned invalid JSON when trying to obtain access token from %s: %s'
-                % (auth_url, str(e)))
-        except Exception as e:
-            raise KeycloakError('Could not obtain access token from %s: %s'
-                                % (auth_url, str(e)))
-
-        try:
-            token = r['access_token']
-        except KeyError:
-            raise KeycloakError(
-                'Could not obtain access token from %s' % auth_url)
-    return {
+        cache_file = module_params.get('token_cache_file')
+        if cache_file:
+            cache = _read_token_cache(cache_file)
+            cache_key = _token_cache_key(module_params)
+            cached = cache.get(cache_key)
+            if not refresh and isinstance(cached, dict) and cached.get('expires_at', 0) > time.time():
+                token = cached.get('access_token')
+                from_cache = token is not None
+
+        if token is None:
+            token, expires_in = _request_token(module_params)
+            if cache_file and expires_in:
+                now = time.time()
+                # drop the expired tokens of other users along the way
+                cache = dict((k, v) for k, v in cache.items() if isinstance(v, dict) and v.get('expires_at', 0) > now)
+                cache[cache_key] = dict(access_token=token,
+                                        expires_at=now + max(int(expires_in) - TOKEN_EXPIRY_MARGIN, 0))
+                _write_token_cache(cache_file, cache)
+
+    connection_header = {
         'Authorization': 'Bearer ' + token,
         'Content-Type': 'application/json'
     }
+    if from_cache:
+        _cached_token = (module_params, connection_header)
+    return connection_header
 
 
 def is_struct_included(struct1, struct2, exclude=None):
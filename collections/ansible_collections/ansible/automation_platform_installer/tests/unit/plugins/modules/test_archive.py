@@ -0,0 +1,184 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import random
+import tarfile
+import zipfile
+
+import pytest
+
+from ansible_collections.ansible.automation_platform_installer.plugins.modules import archive
+from ansible_collections.ansible.automation_platform_installer.tests.unit.plugins.modules.utils import run_module
+
+
+DECOMPRESS = dict(
+    gz=gzip.decompress,
+    bz2=bz2.decompress,
+    xz=lzma.decompress,
+    tar=lambda data: data,
+)
+if archive.HAS_ZSTANDARD:
+    DECOMPRESS['zst'] = lambda data: archive.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+FORMATS = sorted(DECOMPRESS) + ['zip']
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # several blocks per file without writing megabytes of data
+    monkeypatch.setattr(archive, 'PARALLEL_BLOCK_SIZE', 16 * 1024)
+
+
+@pytest.fixture
+def source(tmp_path):
+    rand = random.Random(42)
+    root = tmp_path / 'src'
+    (root / 'sub' / 'empty').mkdir(parents=True)
+    (root / 'big.bin').write_bytes(bytes(rand.getrandbits(8) for dummy in range(100 * 1024)))
+    (root / 'text.txt').write_bytes(b'line of text\n' * 10000)
+    (root / 'sub' / 'small.txt').write_bytes(b'small')
+    (root / 'sub' / 'blank').write_bytes(b'')
+    return root
+
+
+def contents(root):
+    result = {}
+    for dirpath, dirnames, filenames in os.walk(str(root)):
+        for name in dirnames:
+            result[os.path.relpath(os.path.join(dirpath, name), str(root))] = None
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                result[os.path.relpath(path, str(root))] = f.read()
+    return result
+
+
+def extract(path, fmt, dest):
+    if fmt == 'zip':
+        with zipfile.ZipFile(str(path)) as z:
+            z.extractall(str(dest))
+    else:
+        with open(str(path), 'rb') as f:
+            data = DECOMPRESS[fmt](f.read())
+        with tarfile.open(fileobj=io.BytesIO(data)) as t:
+            t.extractall(str(dest))
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('workers', [1, 3])
+def test_archive_round_trip(mocker, tmp_path, source, fmt, workers):
+    dest = tmp_path / ('out.' + fmt)
+
+    result = run_module(mocker, archive.main, dict(path=str(source), dest=str(dest), format=fmt, compression_workers=workers))
+
+    assert result['changed']
+    assert result['state'] == 'archive'
+    extract(dest, fmt, tmp_path / 'extracted')
+    assert contents(tmp_path / 'extracted' / 'src') == contents(source)
+
+
+@pytest.mark.parametrize('fmt', sorted(set(FORMATS) - set(['tar', 'zip'])))
+def test_parallel_output_matches_single_stream(mocker, tmp_path, source, fmt):
+    decompressed = []
+    for workers in (1, 3):
+        dest = tmp_path / ('out%d.%s' % (workers, fmt))
+        run_module(mocker, archive.main, dict(path=str(source), dest=str(dest), format=fmt, compression_workers=workers))
+        with open(str(dest), 'rb') as f:
+            decompressed.append(DECOMPRESS[fmt](f.read()))
+
+    assert decompressed[0] == decompressed[1]
+
+
+@pytest.mark.parametrize('fmt', sorted(set(FORMATS) - set(['tar', 'zip'])))
+@pytest.mark.parametrize('workers', [1, 3])
+@pytest.mark.parametrize('name', ['big.bin', 'sub/blank'])
+def test_compress_round_trip(mocker, tmp_path, source, fmt, workers, name):
+    path = source / name
+    expected = path.read_bytes()
+
+    result = run_module(mocker, archive.main, dict(path=str(path), format=fmt, compression_workers=workers))
+
+    assert result['state'] == 'compress'
+    with open('%s.%s' % (path, fmt), 'rb') as f:
+        assert DECOMPRESS[fmt](f.read()) == expected
+
+
+def archive_with_manifest(mocker, tmp_path, paths, name, **args):
+    args = dict(path=paths, dest=str(tmp_path / (name + '.tar.gz')), manifest=str(tmp_path / (name + '.json')), **args)
+    return run_module(mocker, archive.main, args)
+
+
+def members(path):
+    with tarfile.open(str(path)) as t:
+        return sorted(t.getnames())
+
+
+def test_manifest_skips_unchanged_archive(mocker, tmp_path, source):
+    first = archive_with_manifest(mocker, tmp_path, [str(source)], 'full')
+    mtime = os.stat(str(tmp_path / 'full.tar.gz')).st_mtime_ns
+
+    second = archive_with_manifest(mocker, tmp_path, [str(source)], 'full')
+
+    assert first['changed']
+    assert not second['changed']
+    assert second['state'] == 'archive'
+    assert second['archived'] == []
+    assert os.stat(str(tmp_path / 'full.tar.gz')).st_mtime_ns == mtime
+
+    (source / 'sub' / 'small.txt').write_bytes(b'changed')
+    assert archive_with_manifest(mocker, tmp_path, [str(source)], 'full')['changed']
+
+
+def test_skipped_incomplete_archive_keeps_sources(mocker, tmp_path, source):
+    missing = str(tmp_path / 'missing')
+    paths = [str(source / 'text.txt'), str(source / 'sub'), missing]
+    archive_with_manifest(mocker, tmp_path, paths, 'partial')
+
+    result = archive_with_manifest(mocker, tmp_path, paths, 'partial', remove=True)
+
+    assert not result['changed']
+    assert result['state'] == 'incomplete'
+    assert result['missing'] == [missing]
+    assert result['archived'] == []
+    assert (source / 'text.txt').exists()
+    assert (source / 'sub' / 'small.txt').exists()
+
+
+def test_differential_archive(mocker, tmp_path, source):
+    archive_with_manifest(mocker, tmp_path, [str(source)], 'full')
+    os.utime(str(source / 'text.txt'), (0, 0))
+    (source / 'sub' / 'small.txt').write_bytes(b'larger than before')
+    (source / 'sub' / 'new.txt').write_bytes(b'new')
+    (source / 'big.bin').unlink()
+    (source / 'sub' / 'empty').rmdir()
+
+    result = archive_with_manifest(mocker, tmp_path, [str(source)], 'diff', reference_manifest=str(tmp_path / 'full.json'))
+
+    assert members(tmp_path / 'diff.tar.gz') == ['src/sub/new.txt', 'src/sub/small.txt', 'src/text.txt']
+    assert result['removed'] == ['src/big.bin', 'src/sub/empty']
+    assert result['unchanged'] == 2
+    with open(str(tmp_path / 'diff.json')) as f:
+        manifest = json.load(f)
+    assert manifest['removed'] == result['removed']
+    assert sorted(manifest['members']) == ['src/sub', 'src/sub/blank', 'src/sub/new.txt', 'src/sub/small.txt', 'src/text.txt']
+
+    # extracting the chain and deleting the removed members restores the tree
+    restored = tmp_path / 'restored'
+    for name in ('full', 'diff'):
+        extract(tmp_path / (name + '.tar.gz'), 'gz', restored)
+    assert contents(restored / 'src') != contents(source)
+    for name in manifest['removed']:
+        path = restored / name
+        if path.is_dir():
+            path.rmdir()
+        else:
+            path.unlink()
+    assert contents(restored / 'src') == contents(source)
@@ -0,0 +1,176 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import csv
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from ansible.plugins.loader import callback_loader
+from ansible.utils import display as display_module
+
+from ansible_collections.ansible.posix.tests.unit.compat.mock import MagicMock
+from ansible_collections.ansible.posix.plugins.callback import cgroup_perf_recap
+from ansible_collections.ansible.posix.plugins.callback.cgroup_perf_recap import RingBuffer, summarize
+
+
+def write(path, value):
+    # replaced at once, so that the sampling thread never reads a partial value
+    with open(path + '.tmp', 'w') as f:
+        f.write(value)
+    os.rename(path + '.tmp', path)
+
+
+class Cgroup(object):
+    """A cgroup v1 or v2 tree of the files read by the callback"""
+    def __init__(self, root, version):
+        self.version = version
+        if version == 'v2':
+            os.makedirs(os.path.join(root, 'ansible'))
+            write(os.path.join(root, 'cgroup.controllers'), 'cpu memory pids\n')
+            self.memory = os.path.join(root, 'ansible', 'memory.current')
+            self.cpu = os.path.join(root, 'ansible', 'cpu.stat')
+            self.pids = os.path.join(root, 'ansible', 'pids.current')
+        else:
+            for controller in ('memory', 'cpuacct', 'pids'):
+                os.makedirs(os.path.join(root, controller, 'ansible'))
+            write(os.path.join(root, 'memory', 'ansible', 'memory.max_usage_in_bytes'), '%d\n' % (512 * 1024**2))
+            self.memory = os.path.join(root, 'memory', 'ansible', 'memory.usage_in_bytes')
+            self.cpu = os.path.join(root, 'cpuacct', 'ansible', 'cpuacct.usage')
+            self.pids = os.path.join(root, 'pids', 'ansible', 'pids.current')
+        self.set(memory=100, cpu=0, pids=1)
+
+    def set(self, memory, cpu, pids):
+        write(self.memory, '%d\n' % (memory * 1024**2))
+        write(self.pids, '%d\n' % pids)
+        if self.version == 'v2':
+            write(self.cpu, 'usage_usec %d\nuser_usec 0\nsystem_usec 0\n' % cpu)
+        else:
+            write(self.cpu, '%d\n' % (cpu * 1000))
+
+
+@pytest.fixture(params=['v1', 'v2'])
+def cgroup(request, tmp_path, monkeypatch):
+    root = str(tmp_path / 'cgroup')
+    monkeypatch.setattr(cgroup_perf_recap, 'CGROUP_ROOT', root.encode())
+    return Cgroup(root, request.param)
+
+
+@pytest.fixture
+def perf_recap(tmp_path, monkeypatch):
+    monkeypatch.setattr(display_module, 'logger', None)
+
+    def load(**options):
+        callback = callback_loader.get('ansible.posix.cgroup_perf_recap')
+        callback._display = MagicMock()
+        direct = dict(
+            control_group='ansible',
+            cpu_poll_interval=0.01,
+            memory_poll_interval=0.01,
+            pid_poll_interval=0.01,
+            write_files=True,
+            output_dir=str(tmp_path / 'output'),
+        )
+        direct.update(options)
+        callback.set_options(direct=direct)
+        assert not callback.disabled
+        return callback
+    return load
+
+
+def make_task(name):
+    task = MagicMock(_uuid='%s-uuid' % name)
+    task.get_name.return_value = name
+    return task
+
+
+def read_rows(path):
+    with io.open(path) as f:
+        return [(float(timestamp), task_name, float(value)) for timestamp, task_name, dummy, value in csv.reader(f)]
+
+
+def test_ring_buffer():
+    buf = RingBuffer(4)
+    for i in range(6):
+        buf.append(float(i), i * 10.0)
+
+    assert buf.samples() == [(2.0, 20.0), (3.0, 30.0), (4.0, 40.0), (5.0, 50.0)]
+    assert buf.samples(4) == [(4.0, 40.0), (5.0, 50.0)]
+    assert buf.window(3.0, 5.0) == [30.0, 40.0]
+    # the overwritten samples are gone
+    assert buf.window(0.0, 3.0) == [20.0]
+
+
+def test_task_boundaries(cgroup, perf_recap, tmp_path):
+    callback = perf_recap()
+
+    starts = []
+    for i, name in enumerate(('first', 'second', 'third')):
+        cgroup.set(memory=100 * (i + 2), cpu=0, pids=10 * (i + 1))
+        callback.v2_playbook_on_task_start(make_task(name), False)
+        starts.append(callback._task_start)
+        time.sleep(0.2)
+    callback.v2_playbook_on_stats(MagicMock())
+    starts.append(time.time())
+
+    rows = read_rows(str(tmp_path / 'output' / 'pids.csv'))
+    results = dict((task.get_name(), stats) for task, stats in callback.task_results['pids'])
+    for i, name in enumerate(('first', 'second', 'third')):
+        task_rows = [row for row in rows if row[1] == name]
+        # every sample belongs to the task running when it was taken
+        assert task_rows
+        assert all(starts[i] <= timestamp < starts[i + 1] for timestamp, dummy, dummy in task_rows)
+        # away from the boundaries, the value is the one set for the task
+        assert set(value for timestamp, dummy, value in task_rows if starts[i] + 0.05 < timestamp < starts[i + 1] - 0.05) == set([10 * (i + 1)])
+        # the recap is computed from the same samples as the file
+        assert results[name] == summarize([value for dummy, dummy, value in task_rows])
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+
+    assert [task.get_name() for task, dummy in callback.task_results['memory']] == ['first', 'second', 'third']
+    callback._display.banner.assert_called_once_with('CGROUP PERF RECAP')
+
+
+def test_wraparound_flush(cgroup, perf_recap, tmp_path):
+    callback = perf_recap(sample_buffer_size=8)
+
+    callback.v2_playbook_on_task_start(make_task('long'), False)
+    sampler = callback._sampler
+    deadline = time.time() + 5
+    while sampler.buffers['pids'].count < 40 and time.time() < deadline:
+        time.sleep(0.01)
+
+    # the samples were written while the task runs, before the buffer overwrote them
+    with sampler.lock:
+        assert sampler.buffers['pids'].count >= 40
+        assert sampler._written['pids'] >= sampler.buffers['pids'].count - 8
+
+    callback.v2_playbook_on_stats(MagicMock())
+
+    rows = read_rows(str(tmp_path / 'output' / 'pids.csv'))
+    assert len(rows) == sampler.buffers['pids'].count
+    assert all(task_name == 'long' for dummy, task_name, dummy in rows)
+    # the recap only has the latest samples
+    assert len(sampler.buffers['pids'].window(callback._task_start, time.time())) == 8
+
+
+def test_sampler_stops(cgroup, perf_recap):
+    callback = perf_recap(write_files=False)
+    threads = threading.active_count()
+
+    for name in ('first', 'second'):
+        callback.v2_playbook_on_task_start(make_task(name), False)
+    sampler = callback._sampler
+    assert sampler.is_alive()
+    # a single thread samples every task
+    assert threading.active_count() == threads + 1
+
+    callback.v2_playbook_on_stats(MagicMock())
+
+    assert not sampler.is_alive()
+    assert threading.active_count() == threads
+    assert [task.get_name() for task, dummy in callback.task_results['cpu']] == ['first', 'second']
@@ -0,0 +1,120 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import io
+import json
+
+import pytest
+
+from ansible.plugins.loader import callback_loader
+from ansible.utils import display as display_module
+
+from ansible_collections.ansible.posix.tests.unit.compat.mock import MagicMock
+from ansible_collections.ansible.posix.plugins.callback import json as json_callback
+
+
+def make_play(name, strategy):
+    play = MagicMock(strategy=strategy, _uuid='%s-uuid' % name)
+    play.get_name.return_value = name
+    play.get_path.return_value = '/playbook.yml:1'
+    return play
+
+
+def make_task(name, action='command'):
+    task = MagicMock(_uuid='%s-uuid' % name, action=action)
+    task.get_name.return_value = name
+    task.get_path.return_value = '/playbook.yml:2'
+    return task
+
+
+def make_host(name):
+    host = MagicMock()
+    host.name = name
+    host.get_name.return_value = name
+    return host
+
+
+def result(host, task, **values):
+    return MagicMock(_host=host, _task=task, _result=values)
+
+
+def run_playbook(callback):
+    host1 = make_host('host1')
+    host2 = make_host('host2')
+
+    # a lockstep play, with a handler
+    callback.v2_playbook_on_play_start(make_play('linear play', 'linear'))
+    task = make_task('first task')
+    callback.v2_playbook_on_task_start(task, False)
+    callback.v2_runner_on_ok(result(host1, task, changed=True, rc=0))
+    callback.v2_runner_on_failed(result(host2, task, changed=False, rc=1, msg='failed'))
+    handler = make_task('handler')
+    callback.v2_playbook_on_handler_task_start(handler)
+    callback.v2_runner_on_skipped(result(host1, handler, changed=False))
+
+    # a play where hosts run at their own pace, and one never returns
+    callback.v2_playbook_on_play_start(make_play('free play', 'free'))
+    task = make_task('free task')
+    callback.v2_runner_on_start(host1, task)
+    callback.v2_runner_on_start(host2, task)
+    callback.v2_runner_on_ok(result(host2, task, changed=False))
+    callback.v2_runner_on_unreachable(result(host1, task, msg='unreachable'))
+    callback.v2_runner_on_start(host1, make_task('last task'))
+
+    stats = MagicMock(processed={'host2': 1, 'host1': 1}, custom={'host1': {'a': 1}, '_run': {'b': 2}})
+    stats.summarize.side_effect = lambda host: dict(ok=1, failures=int(host == 'host2'))
+    callback.v2_playbook_on_stats(stats)
+
+
+@pytest.fixture
+def output(monkeypatch):
+    monkeypatch.setattr(display_module, 'logger', None)
+    monkeypatch.setattr(json_callback, 'current_time', lambda: '2024-01-01T00:00:00.000000Z')
+    monkeypatch.setenv('ANSIBLE_SHOW_CUSTOM_STATS', 'true')
+
+    def run(stream, indent):
+        monkeypatch.setenv('ANSIBLE_JSON_STREAM', str(stream))
+        monkeypatch.setenv('ANSIBLE_JSON_INDENT', str(indent))
+        # a stdout without a file descriptor is written to directly
+        stdout = io.StringIO()
+        monkeypatch.setattr('sys.stdout', stdout)
+        callback = callback_loader.get('ansible.posix.json')
+        callback._display = MagicMock()
+
+        run_playbook(callback)
+
+        if stream:
+            assert not callback._display.display.called
+            return stdout.getvalue()
+        assert stdout.getvalue() == ''
+        return callback._display.display.call_args[0][0] + '\n'
+    return run
+
+
+def sort_tasks(document):
+    # the streamed tasks of a free play are in the order they finished
+    for play in document['plays']:
+        play['tasks'].sort(key=lambda task: (task['task']['id'], sorted(task['hosts'])))
+    return document
+
+
+@pytest.mark.parametrize('indent', [4, 0])
+def test_stream_same_document(output, indent):
+    expected = output(False, indent)
+    streamed = output(True, indent)
+
+    assert sort_tasks(json.loads(streamed)) == sort_tasks(json.loads(expected))
+    assert len(streamed.splitlines()) == len(expected.splitlines())
+
+    document = json.loads(streamed)
+    assert [play['play']['name'] for play in document['plays']] == ['linear play', 'free play']
+    assert [task['task']['name'] for task in document['plays'][0]['tasks']] == ['first task', 'handler']
+    assert document['plays'][0]['tasks'][0]['hosts']['host2']['failed']
+    assert document['plays'][0]['play']['duration']['end'] == '2024-01-01T00:00:00.000000Z'
+    assert [(task['task']['name'], sorted(task['hosts'])) for task in document['plays'][1]['tasks']] == [
+        ('free task', ['host2']), ('free task', ['host1']), ('last task', [])]
+    assert document['stats'] == dict(host1=dict(ok=1, failures=0), host2=dict(ok=1, failures=1))
+    assert document['custom_stats'] == dict(host1=dict(a=1))
+    assert document['global_custom_stats'] == dict(b=2)
@@ -13,6 +13,7 @@ DOCUMENTATION = '''
     short_description: Use memcached DB for cache
     description:
         - This cache uses JSON formatted, per host records saved in memcached.
+        - The index of cached hosts is split into shards, so that adding or removing a host only rewrites the shard holding it.
     requirements:
       - memcache (python lib)
     options:
@@ -46,16 +47,32 @@ DOCUMENTATION = '''
         ini:
           - key: fact_caching_timeout
             section: defaults
+      _batch_size:
+        description:
+          - Number of host records buffered before they are written to memcached with a single C(set_multi).
+          - Buffered records are written at the latest when the list of cached hosts is read, or when the controller exits.
+          - The default of V(1) writes every record immediately.
+        type: integer
+        default: 1
+        env:
+          - name: ANSIBLE_CACHE_MEMCACHED_BATCH_SIZE
+        ini:
+          - key: fact_caching_memcached_batch_size
+            section: defaults
+        version_added: 9.5.0
 '''
 
+import atexit
 import collections
 import os
 import time
+import zlib
 from multiprocessing import Lock
 from itertools import chain
 
 from ansible.errors import AnsibleError
 from ansible.module_utils.common._collections_compat import MutableSet
+from ansible.module_utils.common.text.converters import to_bytes
 from ansible.plugins.cache import BaseCacheModule
 from ansible.utils.display import Display
 
@@ -140,36 +157,100 @@ class CacheModuleKeys(MutableSet):
     """
     A set subclass that keeps track of insertion time and persists
     the set in memcached.
+
+    The set is stored as SHARDS dicts, a key always lands in the same
+    shard, and only the shards that changed are written back.
     """
     PREFIX = 'ansible_cache_keys'
+    SHARDS = 64
 
     def __init__(self, cache, *args, **kwargs):
         self._cache = cache
-        self._keyset = dict(*args, **kwargs)
+        self._shards = [dict() for i in range(self.SHARDS)]
+        # lowest insertion time in every shard, None for an empty one
+        self._oldest = [None] * self.SHARDS
+        self._dirty = set()
+
+        names = [self._shard_name(i) for i in range(self.SHARDS)]
+        stored = cache.get_multi(names + [self.PREFIX])
+        for i, name in enumerate(names):
+            self._shards[i] = stored.get(name) or {}
+            self._oldest[i] = min(self._shards[i].values()) if self._shards[i] else None
+
+        # keys given explicitly, or left behind by the former single-dict index
+        legacy = dict(*args, **kwargs)
+        legacy.update(stored.get(self.PREFIX) or {})
+        if legacy:
+            for key, t in legacy.items():
+                self._store(key, t)
+            self._save()
+            if self.PREFIX in stored:
+                cache.delete(self.PREFIX)
+
+    def _shard_name(self, index):
+        return '%s_%d' % (self.PREFIX, index)
+
+    def _shard_index(self, key):
+        # crc32 instead of hash(), it has to be stable across processes
+        return zlib.crc32(to_bytes(key, errors='surrogate_or_strict')) % self.SHARDS
+
+    def _store(self, key, t):
+        i = self._shard_index(key)
+        self._shards[i][key] = t
+        if self._oldest[i] is None or t < self._oldest[i]:
+            self._oldest[i] = t
+        self._dirty.add(i)
+
+    def _remove(self, key):
+        i = self._shard_index(key)
+        if self._shards[i].pop(key, None) is not None:
+            self._dirty.add(i)
+            if not self._shards[i]:
+                self._oldest[i] = None
+
+    def _save(self):
+        if self._dirty:
+            self._cache.set_multi(dict((self._shard_name(i), self._shards[i]) for i in self._dirty))
+            self._dirty = set()
 
     def __contains__(self, key):
-        return key in self._keyset
+        return key in self._shards[self._shard_index(key)]
 
     def __iter__(self):
-        return iter(self._keyset)
+        return chain.from_iterable(self._shards)
 
     def __len__(self):
-        return len(self._keyset)
+        return sum(len(shard) for shard in self._shards)
 
     def add(self, value):
-        self._keyset[value] = time.time()
-        self._cache.set(self.PREFIX, self._keyset)
+        self.update([value])
+
+    def update(self, values):
+        t = time.time()
+        for value in values:
+            self._store(value, t)
+        self._save()
 
     def discard(self, value):
-        del self._keyset[value]
-        self._cache.set(self.PREFIX, self._keyset)
+        self.discard_all([value])
+
+    def discard_all(self, values):
+        for value in values:
+            self._remove(value)
+        self._save()
 
     def remove_by_timerange(self, s_min, s_max):
-        for k in list(self._keyset.keys()):
-            t = self._keyset[k]
-            if s_min < t < s_max:
-                del self._keyset[k]
-        self._cache.set(self.PREFIX, self._keyset)
+        for i, oldest in enumerate(self._oldest):
+            # only the shards holding at least one key that old are scanned
+            if oldest is None or oldest >= s_max:
+                continue
+            shard = self._shards[i]
+            for k, t in list(shard.items()):
+                if s_min < t < s_max:
+                    del shard[k]
+                    self._dirty.add(i)
+            self._oldest[i] = min(shard.values()) if shard else None
+        self._save()
 
 
 class CacheModule(BaseCacheModule):
@@ -182,17 +263,30 @@ class CacheModule(BaseCacheModule):
             connection = self.get_option('_uri')
         self._timeout = self.get_option('_timeout')
         self._prefix = self.get_option('_prefix')
+        self._batch_size = max(int(self.get_option('_batch_size')), 1)
+        self._pending = {}
 
         if not HAS_MEMCACHE:
             raise AnsibleError("python-memcached is required for the memcached fact cache")
 
         self._cache = {}
         self._db = ProxyClientPool(connection, debug=0)
-        self._keys = CacheModuleKeys(self._db, self._db.get(CacheModuleKeys.PREFIX) or [])
+        self._keys = CacheModuleKeys(self._db)
+
+        if self._batch_size > 1:
+            atexit.register(self._write_pending)
 
     def _make_key(self, key):
         return "{0}{1}".format(self._prefix, key)
 
+    def _write_pending(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        self._db.set_multi(pending, time=self._timeout, key_prefix=self._prefix, min_compress_len=1)
+        self._keys.update(pending)
+
     def _expire_keys(self):
         if self._timeout > 0:
             expiry_age = time.time() - self._timeout
@@ -212,29 +306,43 @@ class CacheModule(BaseCacheModule):
         return self._cache.get(key)
 
     def set(self, key, value):
-        self._db.set(self._make_key(key), value, time=self._timeout, min_compress_len=1)
+        self._pending[key] = value
         self._cache[key] = value
-        self._keys.add(key)
+        if len(self._pending) >= self._batch_size:
+            self._write_pending()
 
     def keys(self):
+        self._write_pending()
         self._expire_keys()
         return list(iter(self._keys))
 
     def contains(self, key):
+        if key in self._pending:
+            return True
         self._expire_keys()
         return key in self._keys
 
     def delete(self, key):
-        del self._cache[key]
+        self._cache.pop(key, None)
+        self._pending.pop(key, None)
         self._db.delete(self._make_key(key))
         self._keys.discard(key)
 
     def flush(self):
-        for key in self.keys():
-            self.delete(key)
+        keys = self.keys()
+        self._cache = {}
+        self._db.delete_multi(keys, key_prefix=self._prefix)
+        self._keys.discard_all(keys)
 
     def copy(self):
-        return self._keys.copy()
+        keys = self.keys()
+        values = self._db.get_multi(keys, key_prefix=self._prefix)
+        # same guard as in get()
+        missing = [key for key in keys if key not in values]
+        if missing:
+            self._keys.discard_all(missing)
+        self._cache.update(values)
+        return values
 
     def __getstate__(self):
         return dict()
@@ -13,7 +13,10 @@ DOCUMENTATION = '''
     short_description: YAML formatted files.
     description:
         - This cache uses YAML formatted, per host, files saved to the filesystem.
+        - The files can be spread over subdirectories, compressed, and listed through an index, see O(_shards), O(_compression) and O(_index).
     author: Brian Coca (@bcoca)
+    extends_documentation_fragment:
+      - community.general.file_cache
     options:
       _uri:
         required: true
@@ -46,24 +49,23 @@ DOCUMENTATION = '''
 '''
 
 
-import codecs
-
 import yaml
 
+from ansible.module_utils.common.text.converters import to_bytes, to_text
 from ansible.parsing.yaml.loader import AnsibleLoader
 from ansible.parsing.yaml.dumper import AnsibleDumper
-from ansible.plugins.cache import BaseFileCacheModule
+
+from ansible_collections.community.general.plugins.plugin_utils.file_cache import IndexedFileCacheModule
 
 
-class CacheModule(BaseFileCacheModule):
+class CacheModule(IndexedFileCacheModule):
     """
     A caching module backed by yaml files.
     """
 
     def _load(self, filepath):
-        with codecs.open(filepath, 'r', encoding='utf-8') as f:
-            return AnsibleLoader(f).get_single_data()
+        return AnsibleLoader(to_text(self._read_file(filepath), encoding='utf-8')).get_single_data()
 
     def _dump(self, value, filepath):
-        with codecs.open(filepath, 'w', encoding='utf-8') as f:
-            yaml.dump(value, f, Dumper=AnsibleDumper, default_flow_style=False)
+        data = yaml.dump(value, Dumper=AnsibleDumper, default_flow_style=False)
+        self._write_file(filepath, to_bytes(data, encoding='utf-8'))
@@ -18,6 +18,9 @@ DOCUMENTATION = '''
     requirements:
       - Whitelisting this callback plugin.
       - An Azure log analytics work space has been established.
+    extends_documentation_fragment:
+      - community.general.event_shipper
+      - community.general.event_shipper.send_in_background
     options:
       workspace_id:
         description: Workspace ID of the Azure log analytics workspace.
@@ -37,6 +40,48 @@ DOCUMENTATION = '''
         ini:
           - section: callback_loganalytics
             key: shared_key
+      send_in_background:
+        env:
+          - name: LOGANALYTICS_SEND_IN_BACKGROUND
+        ini:
+          - section: callback_loganalytics
+            key: send_in_background
+      queue_size:
+        env:
+          - name: LOGANALYTICS_QUEUE_SIZE
+        ini:
+          - section: callback_loganalytics
+            key: queue_size
+      queue_full:
+        env:
+          - name: LOGANALYTICS_QUEUE_FULL
+        ini:
+          - section: callback_loganalytics
+            key: queue_full
+      max_batch_events:
+        env:
+          - name: LOGANALYTICS_MAX_BATCH_EVENTS
+        ini:
+          - section: callback_loganalytics
+            key: max_batch_events
+      max_batch_size:
+        env:
+          - name: LOGANALYTICS_MAX_BATCH_SIZE
+        ini:
+          - section: callback_loganalytics
+            key: max_batch_size
+      flush_interval:
+        env:
+          - name: LOGANALYTICS_FLUSH_INTERVAL
+        ini:
+          - section: callback_loganalytics
+            key: flush_interval
+      send_retries:
+        env:
+          - name: LOGANALYTICS_SEND_RETRIES
+        ini:
+          - section: callback_loganalytics
+            key: send_retries
 '''
 
 EXAMPLES = '''
@@ -70,6 +115,11 @@ from ansible.plugins.callback import CallbackBase
 from ansible_collections.community.general.plugins.module_utils.datetime import (
     now,
 )
+from ansible_collections.community.general.plugins.plugin_utils.event_shipper import EventShipper
+
+
+def json_array(payloads):
+    return '[' + ','.join(payloads) + ']'
 
 
 class AzureLogAnalyticsSource(object):
@@ -81,6 +131,7 @@ class AzureLogAnalyticsSource(object):
         self.host = socket.gethostname()
         self.user = getpass.getuser()
         self.extra_vars = ""
+        self.shipper = None
 
     def __build_signature(self, date, workspace_id, shared_key, content_length):
         # Build authorisation signature for Azure log analytics API call
@@ -138,7 +189,15 @@ class AzureLogAnalyticsSource(object):
         data['extra_vars'] = self.extra_vars
 
         # Preparing the playbook logs as JSON format and send to Azure log analytics
-        jsondata = json.dumps({'event': data}, cls=AnsibleJSONEncoder, sort_keys=True)
+        jsondata = json.dumps({'event': data}, cls=AnsibleJSONEncoder)
+
+        if self.shipper is not None:
+            # the Data Collector API takes a JSON array of records per request
+            self.shipper.put(jsondata)
+        else:
+            self.post(workspace_id, shared_key, jsondata)
+
+    def post(self, workspace_id, shared_key, jsondata):
         content_length = len(jsondata)
         rfc1123date = self.__rfc1123date()
         signature = self.__build_signature(rfc1123date, workspace_id, shared_key, content_length)
@@ -181,6 +240,25 @@ class CallbackModule(CallbackBase):
         self.workspace_id = self.get_option('workspace_id')
         self.shared_key = self.get_option('shared_key')
 
+        if not self.workspace_id or not self.shared_key:
+            self.disabled = True
+            self._display.warning('Azure Log Analytics requires a workspace ID and a shared key. '
+                                  'They can be provided using the `WORKSPACE_ID` and `WORKSPACE_SHARED_KEY` '
+                                  'environment variables or in the ansible.cfg file.')
+
+        if self.get_option('send_in_background') and not self.disabled:
+            self.loganalytics.shipper = EventShipper(
+                lambda body, key: self.loganalytics.post(self.workspace_id, self.shared_key, body),
+                encode=json_array,
+                queue_size=self.get_option('queue_size'),
+                max_batch_events=self.get_option('max_batch_events'),
+                max_batch_size=self.get_option('max_batch_size'),
+                flush_interval=self.get_option('flush_interval'),
+                retries=self.get_option('send_retries'),
+                queue_full=self.get_option('queue_full'),
+                warn=self._display.warning,
+            )
+
     def v2_playbook_on_play_start(self, play):
         vm = play.get_variable_manager()
         extra_vars = vm.extra_vars
@@ -239,3 +317,7 @@ class CallbackModule(CallbackBase):
             result,
             self._seconds_since_start(result)
         )
+
+    def v2_playbook_on_stats(self, stats):
+        if self.loganalytics.shipper is not None:
+            self.loganalytics.shipper.close()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+
+    # Options of the callback plugins sending their events with EventShipper;
+    # the plugins add the env and ini entries of every option
+    DOCUMENTATION = r'''
+options:
+  queue_size:
+    description:
+      - Maximum number of events waiting to be sent by the background thread.
+      - This limits the number of events, not their size; the size of a single request is limited by O(max_batch_size).
+      - What happens once it is reached is controlled by O(queue_full).
+    type: int
+    default: 10000
+    version_added: 9.5.0
+  queue_full:
+    description:
+      - What to do with a new event when O(queue_size) events are already waiting to be sent.
+      - V(block) makes the playbook wait for the queue to drain, V(drop) discards the event and warns at the end of the playbook.
+    type: str
+    choices: [block, drop]
+    default: block
+    version_added: 9.5.0
+  max_batch_events:
+    description:
+      - Maximum number of events sent in a single request by the background thread.
+    type: int
+    default: 100
+    version_added: 9.5.0
+  max_batch_size:
+    description:
+      - A request is sent as soon as the events waiting in the background thread reach this size, in characters.
+    type: int
+    default: 524288
+    version_added: 9.5.0
+  flush_interval:
+    description:
+      - Maximum time in seconds an event waits in the background thread before it is sent.
+    type: float
+    default: 2.0
+    version_added: 9.5.0
+  send_retries:
+    description:
+      - Number of times a failed request is retried by the background thread, with an exponential backoff.
+    type: int
+    default: 3
+    version_added: 9.5.0
+'''
+
+    # For the plugins which can also send every event before the playbook continues
+    SEND_IN_BACKGROUND = r'''
+options:
+  send_in_background:
+    description:
+      - Whether to send the events from a background thread, grouping several events in a single request.
+      - When V(false), every task result is sent before the playbook continues.
+    type: bool
+    default: true
+    version_added: 9.5.0
+'''
+
+    # For the plugins whose backend accepts gzipped requests
+    COMPRESS = r'''
+options:
+  compress:
+    description:
+      - Whether to gzip the request bodies sent by the background thread.
+    type: bool
+    default: false
+    version_added: 9.5.0
+'''
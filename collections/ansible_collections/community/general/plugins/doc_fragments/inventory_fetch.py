@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+
+    # Options of the inventory plugins fetching their objects concurrently with InventoryFetcher
+    DOCUMENTATION = r'''
+options:
+  fetch_workers:
+    description:
+      - Maximum number of requests sent to the API at the same time.
+    type: int
+    default: 4
+    version_added: 9.5.0
+'''
+
+    # Options of the inventory plugins which can revalidate their cache with InventoryFetcher
+    REVALIDATE = r'''
+options:
+  cache_revalidate:
+    description:
+      - Check with the API whether the cached objects changed, instead of using them as they are until
+        O(cache_timeout) expires.
+      - Only the objects which changed are fetched again, or nothing if the API tells that none changed,
+        so this is much cheaper than fetching the whole inventory.
+      - Requires O(cache=true). Set O(cache_timeout=0) so that the cached objects never expire,
+        otherwise everything is fetched again after O(cache_timeout).
+    type: bool
+    default: false
+    version_added: 9.5.0
+'''
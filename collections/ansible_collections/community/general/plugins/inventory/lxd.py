@@ -185,6 +185,8 @@ except ImportError as exc:
 else:
     IPADDRESS_IMPORT_ERROR = None
 
+GROUP_TYPES = ('location', 'pattern', 'network_range', 'os', 'release', 'profile', 'vlanid', 'type', 'project')
+
 
 class InventoryModule(BaseInventoryPlugin):
     DEBUG = 4
@@ -331,39 +333,6 @@ class InventoryModule(BaseInventoryPlugin):
         network_configs = self.socket.do('GET', '/1.0/networks')
         return [m.split('/')[3] for m in network_configs['metadata']]
 
-    def _get_instances(self):
-        """Get instancenames
-
-        Returns all instancenames
-
-        Args:
-            None
-        Kwargs:
-            None
-        Raises:
-            None
-        Returns:
-            list(names): names of all instances"""
-        # e.g. {
-        #        "metadata": [
-        #          "/1.0/instances/foo",
-        #          "/1.0/instances/bar"
-        #        ],
-        #        "status": "Success",
-        #        "status_code": 200,
-        #        "type": "sync"
-        #      }
-        url = '/1.0/instances'
-        if self.project:
-            url = url + '?{0}'.format(urlencode(dict(project=self.project)))
-
-        instances = self.socket.do('GET', url)
-
-        if self.project:
-            return [m.split('/')[3].split('?')[0] for m in instances['metadata']]
-
-        return [m.split('/')[3] for m in instances['metadata']]
-
     def _get_config(self, branch, name):
         """Get inventory of instance
 
@@ -389,27 +358,42 @@ class InventoryModule(BaseInventoryPlugin):
                 'GET', '/1.0/{0}/{1}?{2}'.format(to_native(branch), to_native(name), urlencode(dict(project=self.project))))}
         return config
 
-    def get_instance_data(self, names):
-        """Create Inventory of the instance
+    def get_instance_data_recursive(self):
+        """Create Inventory of all instances
 
-        Iterate through the different branches of the instances and collect Information.
+        Fetch all instances with their state in a single request, instead of two requests per instance.
 
         Args:
-            list(names): List of instance names
+            None
         Kwargs:
             None
+        Source:
+            https://documentation.ubuntu.com/lxd/en/latest/rest-api/#recursion
         Raises:
             None
         Returns:
             None"""
-        # tuple(('instances','metadata/templates')) to get section in branch
-        # e.g. /1.0/instances/<name>/metadata/templates
-        branches = ['instances', ('instances', 'state')]
-        instance_config = {}
-        for branch in branches:
-            for name in names:
-                instance_config['instances'] = self._get_config(branch, name)
-                self.data = dict_merge(instance_config, self.data)
+        # recursion=1 only returns the instance configs; the state, with the status and the
+        # network addresses the hosts are built from, is only included with recursion=2,
+        # which also brings the snapshots and backups along,
+        # e.g. {'metadata': [{'name': 'foo', 'config': {...}, 'state': {'status': 'Running', ...}, ...}], ...}
+        query = dict(recursion=2)
+        if self.project:
+            query['project'] = self.project
+        response = self.socket.do('GET', '/1.0/instances?{0}'.format(urlencode(query)))
+
+        # store every instance wrapped in the response of its own request, as in
+        # GET /1.0/instances/<name> and GET /1.0/instances/<name>/state
+        envelope = dict((key, value) for key, value in response.items() if key != 'metadata')
+        instances = self.data.setdefault('instances', {})
+        for instance in response['metadata']:
+            state = instance.pop('state', None)
+            instance.pop('snapshots', None)
+            instance.pop('backups', None)
+            instances[instance['name']] = {
+                'instances': dict(envelope, metadata=instance),
+                'state': dict(envelope, metadata=state),
+            }
 
     def get_network_data(self, names):
         """Create Inventory of the instance
@@ -427,14 +411,17 @@ class InventoryModule(BaseInventoryPlugin):
         # tuple(('instances','metadata/templates')) to get section in branch
         # e.g. /1.0/instances/<name>/metadata/templates
         branches = [('networks', 'state')]
-        network_config = {}
+        networks = self.data.setdefault('networks', {})
         for branch in branches:
             for name in names:
                 try:
-                    network_config['networks'] = self._get_config(branch, name)
+                    config = self._get_config(branch, name)[name]
                 except LXDClientException:
-                    network_config['networks'] = {name: None}
-                self.data = dict_merge(network_config, self.data)
+                    networks[name] = None
+                    continue
+                if networks.get(name) is None:
+                    networks[name] = {}
+                networks[name].update(config)
 
     def extract_network_information_from_instance_config(self, instance_name):
         """Returns the network interface configuration
@@ -491,7 +478,27 @@ class InventoryModule(BaseInventoryPlugin):
                 prefered_interface = sorted(selected_interfaces)[0]
         return prefered_interface
 
-    def get_instance_vlans(self, instance_name):
+    def get_network_vlans(self):
+        """Get VLAN(s) of the networks
+
+        Helper to get the VLAN_ID of every network
+
+        Args:
+            None
+        Kwargs:
+            None
+        Raises:
+            None
+        Returns:
+            dict(network_vlans): {network: vlan_id}"""
+        network_vlans = {}
+        for network in self._get_data_entry('networks'):
+            vlan_id = self._get_data_entry('state/metadata/vlan/vid', data=self.data['networks'].get(network))
+            if vlan_id:
+                network_vlans[network] = vlan_id
+        return network_vlans
+
+    def get_instance_vlans(self, instance_name, network_vlans=None):
         """Get VLAN(s) from instance
 
         Helper to get the VLAN_ID from the instance
@@ -499,16 +506,14 @@ class InventoryModule(BaseInventoryPlugin):
         Args:
             str(instance_name): name of instance
         Kwargs:
-            None
+            dict(network_vlans): {network: vlan_id} as returned by get_network_vlans()
         Raises:
             None
         Returns:
             None"""
         # get network device configuration and store {network: vlan_id}
-        network_vlans = {}
-        for network in self._get_data_entry('networks'):
-            if self._get_data_entry('state/metadata/vlan/vid', data=self.data['networks'].get(network)):
-                network_vlans[network] = self._get_data_entry('state/metadata/vlan/vid', data=self.data['networks'].get(network))
+        if network_vlans is None:
+            network_vlans = self.get_network_vlans()
 
         # get networkdevices of instance and return
         # e.g.
@@ -598,26 +603,23 @@ class InventoryModule(BaseInventoryPlugin):
         if 'inventory' not in self.data:
             self.data['inventory'] = {}
 
+        # the VLANs of the networks are the same for every instance
+        network_vlans = self.get_network_vlans()
+
         for instance_name in self.data['instances']:
-            self._set_data_entry(instance_name, 'os', self._get_data_entry(
-                'instances/{0}/instances/metadata/config/image.os'.format(instance_name)))
-            self._set_data_entry(instance_name, 'release', self._get_data_entry(
-                'instances/{0}/instances/metadata/config/image.release'.format(instance_name)))
-            self._set_data_entry(instance_name, 'version', self._get_data_entry(
-                'instances/{0}/instances/metadata/config/image.version'.format(instance_name)))
-            self._set_data_entry(instance_name, 'profile', self._get_data_entry(
-                'instances/{0}/instances/metadata/profiles'.format(instance_name)))
-            self._set_data_entry(instance_name, 'location', self._get_data_entry(
-                'instances/{0}/instances/metadata/location'.format(instance_name)))
-            self._set_data_entry(instance_name, 'state', self._get_data_entry(
-                'instances/{0}/instances/metadata/config/volatile.last_state.power'.format(instance_name)))
-            self._set_data_entry(instance_name, 'type', self._get_data_entry(
-                'instances/{0}/instances/metadata/type'.format(instance_name)))
+            metadata = self._get_data_entry('instances/{0}/instances/metadata'.format(instance_name)) or {}
+            config = metadata.get('config') or {}
+            self._set_data_entry(instance_name, 'os', config.get('image.os'))
+            self._set_data_entry(instance_name, 'release', config.get('image.release'))
+            self._set_data_entry(instance_name, 'version', config.get('image.version'))
+            self._set_data_entry(instance_name, 'profile', metadata.get('profiles'))
+            self._set_data_entry(instance_name, 'location', metadata.get('location'))
+            self._set_data_entry(instance_name, 'state', config.get('volatile.last_state.power'))
+            self._set_data_entry(instance_name, 'type', metadata.get('type'))
             self._set_data_entry(instance_name, 'network_interfaces', self.extract_network_information_from_instance_config(instance_name))
             self._set_data_entry(instance_name, 'preferred_interface', self.get_prefered_instance_network_interface(instance_name))
-            self._set_data_entry(instance_name, 'vlan_ids', self.get_instance_vlans(instance_name))
-            self._set_data_entry(instance_name, 'project', self._get_data_entry(
-                'instances/{0}/instances/metadata/project'.format(instance_name)))
+            self._set_data_entry(instance_name, 'vlan_ids', self.get_instance_vlans(instance_name, network_vlans))
+            self._set_data_entry(instance_name, 'project', metadata.get('project'))
 
     def build_inventory_network(self, instance_name):
         """Add the network interfaces of the instance to the inventory
@@ -732,7 +734,7 @@ class InventoryModule(BaseInventoryPlugin):
             self.inventory.set_variable(
                 instance_name, 'ansible_lxd_project', make_unsafe(self._get_data_entry('inventory/{0}/project'.format(instance_name))))
 
-    def build_inventory_groups_location(self, group_name):
+    def group_matcher_location(self, group_name):
         """create group by attribute: location
 
         Args:
@@ -742,16 +744,10 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        return lambda instance_name, host_vars: 'ansible_lxd_location' in host_vars
 
-        for instance_name in self.inventory.hosts:
-            if 'ansible_lxd_location' in self.inventory.get_host(instance_name).get_vars():
-                self.inventory.add_child(group_name, instance_name)
-
-    def build_inventory_groups_pattern(self, group_name):
+    def group_matcher_pattern(self, group_name):
         """create group by name pattern
 
         Args:
@@ -761,19 +757,11 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
-        regex_pattern = self.groupby[group_name].get('attribute')
-
-        for instance_name in self.inventory.hosts:
-            result = re.search(regex_pattern, instance_name)
-            if result:
-                self.inventory.add_child(group_name, instance_name)
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        regex_pattern = re.compile(self.groupby[group_name].get('attribute'))
+        return lambda instance_name, host_vars: regex_pattern.search(instance_name) is not None
 
-    def build_inventory_groups_network_range(self, group_name):
+    def group_matcher_network_range(self, group_name):
         """check if IP is in network-class
 
         Args:
@@ -781,32 +769,48 @@ class InventoryModule(BaseInventoryPlugin):
         Kwargs:
             None
         Raises:
-            None
+            AnsibleParserError
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
         try:
             network = ipaddress.ip_network(to_text(self.groupby[group_name].get('attribute')))
         except ValueError as err:
             raise AnsibleParserError(
                 'Error while parsing network range {0}: {1}'.format(self.groupby[group_name].get('attribute'), to_native(err)))
 
-        for instance_name in self.inventory.hosts:
-            if self.data['inventory'][instance_name].get('network_interfaces') is not None:
-                for interface in self.data['inventory'][instance_name].get('network_interfaces'):
-                    for interface_family in self.data['inventory'][instance_name].get('network_interfaces')[interface]:
-                        try:
-                            address = ipaddress.ip_address(to_text(interface_family['address']))
-                            if address.version == network.version and address in network:
-                                self.inventory.add_child(group_name, instance_name)
-                        except ValueError:
-                            # Ignore invalid IP addresses returned by lxd
-                            pass
-
-    def build_inventory_groups_project(self, group_name):
+        def matcher(instance_name, host_vars):
+            network_interfaces = self.data['inventory'][instance_name].get('network_interfaces')
+            if network_interfaces is None:
+                return False
+            for interface in network_interfaces.values():
+                for interface_family in interface:
+                    try:
+                        address = ipaddress.ip_address(to_text(interface_family['address']))
+                    except ValueError:
+                        # Ignore invalid IP addresses returned by lxd
+                        continue
+                    if address.version == network.version and address in network:
+                        return True
+            return False
+
+        return matcher
+
+    def _group_matcher_attribute(self, group_name, variable):
+        """create group by comparing a host variable to the attribute of the group
+
+        Args:
+            str(group_name): Group name
+            str(variable): name of the host variable
+        Kwargs:
+            None
+        Raises:
+            None
+        Returns:
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        attribute = self.groupby[group_name].get('attribute').lower()
+        return lambda instance_name, host_vars: variable in host_vars and attribute == host_vars[variable]
+
+    def group_matcher_project(self, group_name):
         """create group by attribute: project
 
         Args:
@@ -816,19 +820,10 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
-        gen_instances = [
-            instance_name for instance_name in self.inventory.hosts
-            if 'ansible_lxd_project' in self.inventory.get_host(instance_name).get_vars()]
-        for instance_name in gen_instances:
-            if self.groupby[group_name].get('attribute').lower() == self.inventory.get_host(instance_name).get_vars().get('ansible_lxd_project'):
-                self.inventory.add_child(group_name, instance_name)
-
-    def build_inventory_groups_os(self, group_name):
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        return self._group_matcher_attribute(group_name, 'ansible_lxd_project')
+
+    def group_matcher_os(self, group_name):
         """create group by attribute: os
 
         Args:
@@ -838,19 +833,10 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
-        gen_instances = [
-            instance_name for instance_name in self.inventory.hosts
-            if 'ansible_lxd_os' in self.inventory.get_host(instance_name).get_vars()]
-        for instance_name in gen_instances:
-            if self.groupby[group_name].get('attribute').lower() == self.inventory.get_host(instance_name).get_vars().get('ansible_lxd_os'):
-                self.inventory.add_child(group_name, instance_name)
-
-    def build_inventory_groups_release(self, group_name):
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        return self._group_matcher_attribute(group_name, 'ansible_lxd_os')
+
+    def group_matcher_release(self, group_name):
         """create group by attribute: release
 
         Args:
@@ -860,20 +846,11 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
-        gen_instances = [
-            instance_name for instance_name in self.inventory.hosts
-            if 'ansible_lxd_release' in self.inventory.get_host(instance_name).get_vars()]
-        for instance_name in gen_instances:
-            if self.groupby[group_name].get('attribute').lower() == self.inventory.get_host(instance_name).get_vars().get('ansible_lxd_release'):
-                self.inventory.add_child(group_name, instance_name)
-
-    def build_inventory_groups_profile(self, group_name):
-        """create group by attribute: profile
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        return self._group_matcher_attribute(group_name, 'ansible_lxd_release')
+
+    def group_matcher_type(self, group_name):
+        """create group by attribute: type
 
         Args:
             str(group_name): Group name
@@ -882,20 +859,11 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
-        gen_instances = [
-            instance_name for instance_name in self.inventory.hosts.keys()
-            if 'ansible_lxd_profile' in self.inventory.get_host(instance_name).get_vars().keys()]
-        for instance_name in gen_instances:
-            if self.groupby[group_name].get('attribute').lower() in self.inventory.get_host(instance_name).get_vars().get('ansible_lxd_profile'):
-                self.inventory.add_child(group_name, instance_name)
-
-    def build_inventory_groups_vlanid(self, group_name):
-        """create group by attribute: vlanid
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        return self._group_matcher_attribute(group_name, 'ansible_lxd_type')
+
+    def group_matcher_profile(self, group_name):
+        """create group by attribute: profile
 
         Args:
             str(group_name): Group name
@@ -904,20 +872,12 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
-        gen_instances = [
-            instance_name for instance_name in self.inventory.hosts.keys()
-            if 'ansible_lxd_vlan_ids' in self.inventory.get_host(instance_name).get_vars().keys()]
-        for instance_name in gen_instances:
-            if self.groupby[group_name].get('attribute') in self.inventory.get_host(instance_name).get_vars().get('ansible_lxd_vlan_ids').values():
-                self.inventory.add_child(group_name, instance_name)
-
-    def build_inventory_groups_type(self, group_name):
-        """create group by attribute: type
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        attribute = self.groupby[group_name].get('attribute').lower()
+        return lambda instance_name, host_vars: 'ansible_lxd_profile' in host_vars and attribute in host_vars['ansible_lxd_profile']
+
+    def group_matcher_vlanid(self, group_name):
+        """create group by attribute: vlanid
 
         Args:
             str(group_name): Group name
@@ -926,17 +886,9 @@ class InventoryModule(BaseInventoryPlugin):
         Raises:
             None
         Returns:
-            None"""
-        # maybe we just want to expand one group
-        if group_name not in self.inventory.groups:
-            self.inventory.add_group(group_name)
-
-        gen_instances = [
-            instance_name for instance_name in self.inventory.hosts
-            if 'ansible_lxd_type' in self.inventory.get_host(instance_name).get_vars()]
-        for instance_name in gen_instances:
-            if self.groupby[group_name].get('attribute').lower() == self.inventory.get_host(instance_name).get_vars().get('ansible_lxd_type'):
-                self.inventory.add_child(group_name, instance_name)
+            func(matcher): tells from the name and host_vars of an instance whether it belongs to the group"""
+        attribute = self.groupby[group_name].get('attribute')
+        return lambda instance_name, host_vars: 'ansible_lxd_vlan_ids' in host_vars and attribute in host_vars['ansible_lxd_vlan_ids'].values()
 
     def build_inventory_groups(self):
         """Build group-part dynamic inventory
@@ -944,66 +896,49 @@ class InventoryModule(BaseInventoryPlugin):
         Build the group-part of the dynamic inventory.
         Add groups to the inventory.
 
+        Supported group types:
+            * 'location'
+            * 'pattern'
+            * 'network_range'
+            * 'os'
+            * 'release'
+            * 'profile'
+            * 'vlanid'
+            * 'type'
+            * 'project'
+
+        Every group gets a matcher, then all groups are filled in a single pass over the hosts,
+        instead of going through all hosts, and their variables, once per group.
+
         Args:
             None
         Kwargs:
             None
         Raises:
-            None
+            AnsibleParserError
         Returns:
             None"""
-
-        def group_type(group_name):
-            """create groups defined by lxd.yml or defaultvalues
-
-            create groups defined by lxd.yml or defaultvalues
-            supportetd:
-                * 'location'
-                * 'pattern'
-                * 'network_range'
-                * 'os'
-                * 'release'
-                * 'profile'
-                * 'vlanid'
-                * 'type'
-                * 'project'
-
-            Args:
-                str(group_name): Group name
-            Kwargs:
-                None
-            Raises:
-                None
-            Returns:
-                None"""
-
-            # Due to the compatibility with python 2 no use of map
-            if self.groupby[group_name].get('type') == 'location':
-                self.build_inventory_groups_location(group_name)
-            elif self.groupby[group_name].get('type') == 'pattern':
-                self.build_inventory_groups_pattern(group_name)
-            elif self.groupby[group_name].get('type') == 'network_range':
-                self.build_inventory_groups_network_range(group_name)
-            elif self.groupby[group_name].get('type') == 'os':
-                self.build_inventory_groups_os(group_name)
-            elif self.groupby[group_name].get('type') == 'release':
-                self.build_inventory_groups_release(group_name)
-            elif self.groupby[group_name].get('type') == 'profile':
-                self.build_inventory_groups_profile(group_name)
-            elif self.groupby[group_name].get('type') == 'vlanid':
-                self.build_inventory_groups_vlanid(group_name)
-            elif self.groupby[group_name].get('type') == 'type':
-                self.build_inventory_groups_type(group_name)
-            elif self.groupby[group_name].get('type') == 'project':
-                self.build_inventory_groups_project(group_name)
-            else:
+        if not self.groupby:
+            return
+
+        group_matchers = []
+        for group_name in self.groupby:
+            if not group_name.isalnum():
+                raise AnsibleParserError('Invalid character(s) in groupname: {0}'.format(to_native(group_name)))
+            group_type = self.groupby[group_name].get('type')
+            if group_type not in GROUP_TYPES:
                 raise AnsibleParserError('Unknown group type: {0}'.format(to_native(group_name)))
+            group_name = make_unsafe(group_name)
+            # maybe we just want to expand one group
+            if group_name not in self.inventory.groups:
+                self.inventory.add_group(group_name)
+            group_matchers.append((group_name, getattr(self, 'group_matcher_{0}'.format(group_type))(group_name)))
 
-        if self.groupby:
-            for group_name in self.groupby:
-                if not group_name.isalnum():
-                    raise AnsibleParserError('Invalid character(s) in groupname: {0}'.format(to_native(group_name)))
-                group_type(make_unsafe(group_name))
+        for instance_name in self.inventory.hosts:
+            host_vars = self.inventory.get_host(instance_name).get_vars()
+            for group_name, matcher in group_matchers:
+                if matcher(instance_name, host_vars):
+                    self.inventory.add_child(group_name, instance_name)
 
     def build_inventory(self):
         """Build dynamic inventory
@@ -1058,7 +993,7 @@ class InventoryModule(BaseInventoryPlugin):
 
         if len(self.data) == 0:  # If no data is injected by unittests open socket
             self.socket = self._connect_to_socket()
-            self.get_instance_data(self._get_instances())
+            self.get_instance_data_recursive()
             self.get_network_data(self._get_networks())
 
         # The first version of the inventory only supported containers.
@@ -120,6 +120,7 @@ RETURN = """
     elements: raw
 """
 
+import copy
 import re
 
 from ansible.errors import AnsibleError
@@ -128,6 +129,19 @@ from ansible.utils.display import Display
 
 display = Display()
 
+# State shared by the lookups which see the same variables, that is the terms of one lookup and the lookups
+# of one task, for example in a loop: the raw variables of every host, the names of the variables matching
+# every pattern on every host, and the results of the cross-host merges. It is dropped as soon as a lookup
+# sees other variables, so variables changed by a later task are never missed.
+_run_cache = {}
+
+
+def _get_run_cache(variables):
+    if _run_cache.get('variables') is not variables:
+        _run_cache.clear()
+        _run_cache.update(variables=variables, host_variables={}, var_names={}, results={})
+    return _run_cache
+
 
 def _verify_and_get_type(variable):
     if isinstance(variable, list):
@@ -154,16 +168,62 @@ class LookupModule(LookupBase):
             if not self._groups:  # consider only own variables
                 ret.append(self._merge_vars(term, initial_value, variables))
             else:  # consider variables of hosts in given groups
-                cross_host_merge_result = initial_value
-                for host in variables["hostvars"]:
-                    if self._is_host_in_allowed_groups(variables["hostvars"][host]["group_names"]):
-                        host_variables = dict(variables["hostvars"].raw_get(host))
-                        host_variables["hostvars"] = variables["hostvars"]  # re-add hostvars
-                        cross_host_merge_result = self._merge_vars(term, cross_host_merge_result, host_variables)
-                ret.append(cross_host_merge_result)
+                ret.append(self._merge_cross_host_vars(term, initial_value, variables))
 
         return ret
 
+    def _merge_cross_host_vars(self, search_pattern, initial_value, variables):
+        hostvars = variables["hostvars"]
+        run_cache = _get_run_cache(variables)
+
+        # the result does not depend on the host the lookup runs for, so it can be reused for the other hosts
+        result_key = (search_pattern, self._pattern_type, tuple(self._groups), self._override)
+        if initial_value is None and result_key in run_cache['results']:
+            return copy.deepcopy(run_cache['results'][result_key])
+
+        matcher = self._get_matcher(search_pattern)
+        allowed_hosts = self._get_allowed_hosts(variables)
+        result = initial_value
+        for host in hostvars:
+            if allowed_hosts is not None and host not in allowed_hosts:
+                continue
+
+            raw_variables = run_cache['host_variables'].get(host)
+            if raw_variables is None:
+                raw_variables = run_cache['host_variables'][host] = hostvars.raw_get(host)
+            if allowed_hosts is None and not self._is_host_in_allowed_groups(raw_variables.get("group_names", [])):
+                continue
+
+            names_key = (host, self._pattern_type, search_pattern)
+            var_merge_names = run_cache['var_names'].get(names_key)
+            if var_merge_names is None:
+                var_merge_names = run_cache['var_names'][names_key] = sorted(key for key in raw_variables.keys() if matcher(key))
+            if not var_merge_names:
+                continue
+
+            host_variables = dict(raw_variables)
+            host_variables["hostvars"] = hostvars  # re-add hostvars
+            result = self._merge_vars(search_pattern, result, host_variables, var_merge_names)
+
+        if initial_value is None:
+            run_cache['results'][result_key] = copy.deepcopy(result)
+        return result
+
+    def _get_allowed_hosts(self, variables):
+        """
+        Returns the set of hosts in the given groups, or None if the groups of the inventory are not known.
+        """
+        groups = variables.get("groups")
+        if groups is None:
+            return None
+        if 'all' in self._groups:
+            return set(groups.get('all', ()))
+
+        allowed_hosts = set()
+        for group in self._groups:
+            allowed_hosts.update(groups.get(group, ()))
+        return allowed_hosts
+
     def _is_host_in_allowed_groups(self, host_groups):
         if 'all' in self._groups:
             return True
@@ -174,20 +234,21 @@ class LookupModule(LookupBase):
 
         return False
 
-    def _var_matches(self, key, search_pattern):
+    def _get_matcher(self, search_pattern):
         if self._pattern_type == "prefix":
-            return key.startswith(search_pattern)
+            return lambda key: key.startswith(search_pattern)
         elif self._pattern_type == "suffix":
-            return key.endswith(search_pattern)
+            return lambda key: key.endswith(search_pattern)
         elif self._pattern_type == "regex":
-            matcher = re.compile(search_pattern)
-            return matcher.search(key)
+            return re.compile(search_pattern).search
 
-        return False
+        return lambda key: False
 
-    def _merge_vars(self, search_pattern, initial_value, variables):
+    def _merge_vars(self, search_pattern, initial_value, variables, var_merge_names=None):
         display.vvv("Merge variables with {0}: {1}".format(self._pattern_type, search_pattern))
-        var_merge_names = sorted([key for key in variables.keys() if self._var_matches(key, search_pattern)])
+        if var_merge_names is None:
+            matcher = self._get_matcher(search_pattern)
+            var_merge_names = sorted([key for key in variables.keys() if matcher(key)])
         display.vvv("The following variables will be merged: {0}".format(var_merge_names))
         prev_var_type = None
         result = None
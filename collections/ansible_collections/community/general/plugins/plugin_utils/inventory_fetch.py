@@ -0,0 +1,137 @@
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.common.text.converters import to_text
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible.module_utils.urls import open_url
+
+
+class InventoryFetcher(object):
+    """
+    Fetches the objects of an inventory source for an inventory plugin.
+
+    ``map`` calls a function on several items, for example pages or
+    regions, with at most ``workers`` calls running at the same time.
+
+    ``state`` is a dictionary the plugin keeps in its inventory cache
+    between runs, so that the next run can revalidate what was fetched
+    instead of fetching it again:
+
+    * ``get_json`` sends the ``ETag`` and ``Last-Modified`` validators of
+      the previous response of a URL, and returns the data the plugin kept
+      from it when the server answers ``304 Not Modified``.
+    * ``refresh_collection`` only fetches the objects of a collection which
+      changed since the version of the collection the plugin cached, for
+      APIs which can list changed objects.
+
+    ``requests`` counts the requests sent, ``revalidated`` the responses and
+    collections taken from the state.
+    """
+
+    def __init__(self, state=None, workers=4):
+        self.state = state if state is not None else {}
+        self.workers = max(workers, 1)
+        self.requests = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+    def map(self, func, items):
+        items = list(items)
+        if self.workers == 1 or len(items) < 2:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def _count(self, requests=1, revalidated=0):
+        with self._lock:
+            self.requests += requests
+            self.revalidated += revalidated
+
+    def get_json(self, url, headers=None, keep_headers=(), cached=None, **kwargs):
+        """
+        GET a JSON document, conditionally if ``cached`` holds the document
+        the caller kept from the previous response of the URL.
+
+        Returns the decoded document and a dictionary of the response headers
+        named in ``keep_headers``, in lower case. Only the validators of the
+        response and these headers are remembered in the state; the document
+        itself is kept by the caller, and ``cached`` is returned as it is when
+        the server answers ``304 Not Modified``. Other keyword arguments go to
+        ``open_url``.
+        """
+        urls = self.state.setdefault('urls', {})
+        entry = urls.get(url) if cached is not None else None
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = open_url(url, headers=request_headers, **kwargs)
+        except HTTPError as e:
+            if e.code == 304 and entry is not None:
+                self._count(revalidated=1)
+                return cached, entry['headers']
+            raise
+        self._count()
+
+        data = json.loads(to_text(response.read()))
+        response_headers = dict((name.lower(), response.headers.get(name)) for name in keep_headers)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            urls[url] = dict(etag=etag, last_modified=last_modified, headers=response_headers)
+        else:
+            # nothing to revalidate with next time
+            urls.pop(url, None)
+        return data, response_headers
+
+    def refresh_collection(self, name, version, objects, fetch_all, fetch_changed=None, fetch_keys=None, key='name'):
+        """
+        Returns the objects of the collection ``name``.
+
+        ``objects`` are the objects of the collection the plugin cached, or
+        None. ``version`` identifies the state of the collection on the
+        server, for example its last modification time. If it is the version
+        remembered for ``objects``, they are returned as they are. Otherwise
+        ``fetch_changed(remembered_version)`` returns the objects changed
+        since then and ``fetch_keys()`` the keys of all objects, to drop the
+        removed ones. Without them, or without a remembered version,
+        ``fetch_all()`` fetches the whole collection.
+        """
+        versions = self.state.setdefault('versions', {})
+        remembered = versions.get(name) if objects is not None else None
+
+        if version is not None and remembered is not None and remembered == version:
+            self._count(requests=0, revalidated=1)
+            return objects
+
+        if version is not None and remembered is not None and fetch_changed is not None and fetch_keys is not None:
+            changed = dict((obj[key], obj) for obj in fetch_changed(remembered))
+            keys = set(fetch_keys())
+            self._count(requests=2)
+            refreshed = []
+            for obj in objects:
+                if obj[key] in keys:
+                    refreshed.append(changed.pop(obj[key], obj))
+            refreshed.extend(obj for obj_key, obj in changed.items() if obj_key in keys)
+        else:
+            refreshed = fetch_all()
+            self._count()
+
+        if version is None:
+            versions.pop(name, None)
+        else:
+            versions[name] = version
+        return refreshed
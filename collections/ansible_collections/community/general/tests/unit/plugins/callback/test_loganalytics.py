@@ -6,9 +6,11 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 from ansible.executor.task_result import TaskResult
+from ansible.plugins.loader import callback_loader
 from ansible_collections.community.general.tests.unit.compat import unittest
 from ansible_collections.community.general.tests.unit.compat.mock import patch, Mock
-from ansible_collections.community.general.plugins.callback.loganalytics import AzureLogAnalyticsSource
+from ansible_collections.community.general.plugins.callback.loganalytics import AzureLogAnalyticsSource, json_array
+from ansible_collections.community.general.plugins.plugin_utils.event_shipper import EventShipper
 
 from datetime import datetime
 import json
@@ -69,3 +71,35 @@ class TestAzureLogAnalytics(unittest.TestCase):
 
         self.assertRegex(headers['Authorization'], r'^SharedKey 01234567-0123-0123-0123-01234567890a:.*=$')
         self.assertEqual(headers['Log-Type'], 'ansible_playbook')
+
+    @patch('ansible_collections.community.general.plugins.callback.loganalytics.now')
+    @patch('ansible_collections.community.general.plugins.callback.loganalytics.open_url')
+    def test_background_batch(self, open_url_mock, mock_now):
+        mock_now.return_value = datetime(2020, 12, 1)
+        workspace_id = '01234567-0123-0123-0123-01234567890a'
+        shared_key = 'dZD0kCbKl3ehZG6LHFMuhtE0yHiFCmetzFMc2u+roXIUQuatqU924SsAAAAPemhjbGlAemhjbGktTUJQAQIDBA=='
+        self.loganalytics.shipper = EventShipper(
+            lambda body, key: self.loganalytics.post(workspace_id, shared_key, body),
+            encode=json_array, flush_interval=60,
+        )
+
+        for state in ('OK', 'SKIPPED'):
+            result = TaskResult(host=self.mock_host, task=self.mock_task, return_data={}, task_fields={'args': {}})
+            self.loganalytics.send_event(workspace_id=workspace_id, shared_key=shared_key,
+                                         state=state, result=result, runtime=100)
+        self.loganalytics.shipper.close()
+
+        self.assertEqual(open_url_mock.call_count, 1)
+        args, kwargs = open_url_mock.call_args
+        sent_data = json.loads(args[1])
+
+        self.assertEqual([record['event']['status'] for record in sent_data], ['OK', 'SKIPPED'])
+        self.assertRegex(kwargs['headers']['Authorization'], r'^SharedKey 01234567-0123-0123-0123-01234567890a:.*=$')
+
+    @patch('ansible_collections.community.general.plugins.callback.loganalytics.open_url')
+    def test_disabled_without_credentials(self, open_url_mock):
+        callback = callback_loader.get('community.general.loganalytics')
+        callback.set_options(direct={'workspace_id': '', 'shared_key': ''})
+
+        self.assertTrue(callback.disabled)
+        self.assertIsNone(callback.loganalytics.shipper)
@@ -0,0 +1,68 @@
+# Copyright (c) Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import gzip
+import json
+
+from ansible.plugins.loader import callback_loader
+from ansible.module_utils.six.moves.urllib.parse import parse_qs, urlparse
+from ansible_collections.community.general.tests.unit.compat import unittest
+from ansible_collections.community.general.tests.unit.compat.mock import patch, Mock
+
+
+class TestLogDNA(unittest.TestCase):
+    def setUp(self):
+        self.callback = callback_loader.get('community.general.logdna')
+        self.stats = Mock()
+        self.stats.processed = {'myhost': 1}
+        self.stats.summarize.return_value = {'ok': 1}
+
+    def run_playbook(self, **options):
+        options.setdefault('conf_key', 'my-key')
+        with patch('ansible_collections.community.general.plugins.callback.logdna.socket') as mock_socket:
+            mock_socket.gethostname.return_value = 'my-host'
+            mock_socket.gethostbyname.return_value = '1.2.3.4'
+            self.callback.set_options(direct=options)
+        self.callback.v2_playbook_on_start(Mock(_file_name='site.yml'))
+        self.callback.runner_on_ok('myhost', {'changed': True, 'invocation': {'module_args': {}}, 'warnings': ['careful']})
+        self.callback.runner_on_failed('myhost', {'msg': 'boom'})
+        self.callback.v2_playbook_on_stats(self.stats)
+
+    @patch('ansible_collections.community.general.plugins.callback.logdna.open_url')
+    def test_lines_are_sent_in_one_request(self, open_url_mock):
+        self.run_playbook(flush_interval=60.0)
+
+        self.assertEqual(open_url_mock.call_count, 1)
+        args, kwargs = open_url_mock.call_args
+        url = urlparse(args[0])
+        query = parse_qs(url.query)
+        self.assertEqual('%s://%s%s' % (url.scheme, url.netloc, url.path), 'https://logs.logdna.com/logs/ingest')
+        self.assertEqual(query['hostname'], ['my-host'])
+        self.assertEqual(query['ip'], ['1.2.3.4'])
+        self.assertEqual(query['tags'], ['ansible'])
+        self.assertEqual(kwargs['headers'], {'Content-Type': 'application/json; charset=UTF-8'})
+        self.assertEqual(kwargs['method'], 'POST')
+        self.assertEqual(kwargs['url_username'], 'my-key')
+        self.assertTrue(kwargs['force_basic_auth'])
+
+        lines = json.loads(args[1])['lines']
+        self.assertEqual([line['meta']['category'] for line in lines], ['OK', 'OK', 'FAILED', 'STATS'])
+        self.assertEqual(lines[0]['meta'], {'playbook': 'site.yml', 'host': 'myhost', 'category': 'OK'})
+        self.assertEqual(json.loads(lines[0]['line']), {'warn': ['careful']})
+        self.assertEqual(json.loads(lines[1]['line']), {'info': {'changed': True}})
+        self.assertEqual(json.loads(lines[3]['line']), {'info': {'myhost': {'ok': 1}}})
+
+    @patch('ansible_collections.community.general.plugins.callback.logdna.open_url')
+    def test_compressed_batches(self, open_url_mock):
+        self.run_playbook(flush_interval=60.0, max_batch_events=2, compress=True)
+
+        self.assertEqual(open_url_mock.call_count, 2)
+        categories = []
+        for args, kwargs in open_url_mock.call_args_list:
+            self.assertEqual(kwargs['headers']['Content-Encoding'], 'gzip')
+            categories.extend(line['meta']['category'] for line in json.loads(gzip.decompress(args[1]))['lines'])
+        self.assertEqual(categories, ['OK', 'OK', 'FAILED', 'STATS'])
@@ -8,6 +8,7 @@ __metaclass__ = type
 
 import pytest
 import sys
+import threading
 
 linode_apiv4 = pytest.importorskip('linode_api4')
 mandatory_py_version = pytest.mark.skipif(
@@ -17,9 +18,13 @@ mandatory_py_version = pytest.mark.skipif(
 
 
 from ansible.errors import AnsibleError
+from ansible.inventory.data import InventoryData
 from ansible.parsing.dataloader import DataLoader
 from ansible.template import Templar
+from ansible_collections.community.general.plugins.inventory import linode
 from ansible_collections.community.general.plugins.inventory.linode import InventoryModule
+from ansible_collections.community.general.plugins.plugin_utils.inventory_fetch import InventoryFetcher
+from ansible_collections.community.general.tests.unit.compat.mock import Mock
 
 
 @pytest.fixture(scope="module")
@@ -59,3 +64,77 @@ def test_verify_file_bad_config_yaml(inventory):
 
 def test_verify_file_bad_config(inventory):
     assert inventory.verify_file("foobar.wrongcloud.yml") is False
+
+
+class FakeIP(object):
+    def __init__(self, address, ip_type, public):
+        self.address = address
+        self.type = ip_type
+        self.public = public
+        self.subnet_mask = self.gateway = self.prefix = self.rdns = None
+
+
+class FakeClient(object):
+    """Answers the instance pages and IP addresses, the second and later requests
+    of each kind only once ``parties`` of them are running at the same time"""
+
+    def __init__(self, instances, parties):
+        self.instances = instances
+        self.barrier = threading.Barrier(parties, timeout=10)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get(self, url, model=None):
+        with self.lock:
+            self.requests.append(url)
+        if url.startswith('/linode/instances?'):
+            page = int(url.split('page=')[1].split('&')[0])
+            if page > 1:
+                self.barrier.wait()
+            data = [dict(id=i, label='linode%d' % i, group='web') for i in self.instances if i % 3 + 1 == page]
+            return dict(pages=3, data=data)
+
+        self.barrier.wait()
+        instance_id = int(url.split('/')[3])
+        return Mock(ipv4=Mock(public=[FakeIP('10.0.0.%d' % instance_id, 'ipv4', True)], private=[]),
+                    ipv6=Mock(slaac=FakeIP('fe80::%d' % instance_id, 'ipv6', True),
+                              link_local=FakeIP('fe80::1', 'ipv6', False), pools=[]))
+
+
+class FakeInstance(object):
+    def __init__(self, client, instance_id, json):
+        self._client = client
+        self.id = instance_id
+        self._raw_json = json
+        self.label = json['label']
+        self.group = json['group']
+        self._ips = None
+
+    @property
+    def ips(self):
+        if self._ips is None:
+            self._ips = self._client.get('/linode/instances/%d/ips' % self.id)
+        return self._ips
+
+
+def test_concurrent_pages_and_ips(monkeypatch):
+    monkeypatch.setattr(linode, 'Instance', FakeInstance)
+    plugin = InventoryModule()
+    plugin.inventory = InventoryData()
+    plugin._options = dict(ip_style='api')
+    # the requests only get an answer if fetch_workers of them run concurrently
+    plugin.fetcher = InventoryFetcher(workers=2)
+    plugin.client = FakeClient(range(3), parties=2)
+
+    plugin._get_instances_inventory()
+    assert sorted(instance.label for instance in plugin.instances) == ['linode0', 'linode1', 'linode2']
+
+    plugin.fetcher = InventoryFetcher(workers=3)
+    plugin.client.barrier = threading.Barrier(3, timeout=10)
+    plugin._add_groups()
+    plugin._add_instances_to_groups()
+    plugin._add_hostvars_for_instances()
+
+    host = plugin.inventory.get_host('linode2').get_vars()
+    assert host['ipv4'][0]['address'] == '10.0.0.2'
+    assert len([url for url in plugin.client.requests if url.endswith('/ips')]) == 3
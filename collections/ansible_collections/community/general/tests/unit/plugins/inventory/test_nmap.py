@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+from ansible.inventory.data import InventoryData
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.loader import inventory_loader
+from ansible_collections.community.general.plugins.inventory import nmap
+from ansible_collections.community.general.plugins.inventory.nmap import split_address
+
+
+# Reports the first two addresses of the network it scans as up, with SSH open,
+# and logs its arguments and the addresses it was told to exclude.
+FAKE_NMAP = '''#!%s
+import ipaddress, json, sys
+args = sys.argv[1:]
+excluded = []
+if '--excludefile' in args:
+    with open(args[args.index('--excludefile') + 1]) as f:
+        excluded = f.read().split()
+with open(%r, 'a') as log:
+    log.write(json.dumps({'args': args, 'excluded': excluded}) + '\\n')
+print('<?xml version="1.0"?><nmaprun scanner="nmap">')
+for address in list(ipaddress.ip_network(args[-1]).hosts())[:2]:
+    if str(address) in excluded:
+        continue
+    print('<host><status state="up"/><address addr="%%s" addrtype="ipv4"/><hostnames/>'
+          '<ports><port protocol="tcp" portid="22"><state state="open"/><service name="ssh"/></port></ports></host>' %% address)
+print('<runstats/></nmaprun>')
+'''
+
+
+@pytest.fixture
+def fake_nmap(tmp_path, mocker):
+    log = tmp_path / 'calls.log'
+    script = tmp_path / 'nmap'
+    script.write_text(FAKE_NMAP % (sys.executable, str(log)))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    mocker.patch.object(nmap, 'get_bin_path', return_value=str(script))
+
+    def calls():
+        if not log.exists():
+            return []
+        with open(str(log)) as f:
+            return [json.loads(line) for line in f]
+    return calls
+
+
+def parse(tmp_path, plugin, **options):
+    config = tmp_path / 'inventory.nmap.yml'
+    config.write_text(json.dumps(dict(plugin='community.general.nmap', **options)))
+    inventory = InventoryData()
+    plugin.parse(inventory, DataLoader(), str(config), cache=True)
+    # like the inventory manager does after parsing
+    plugin.update_cache_if_changed()
+    return inventory
+
+
+def test_split_address():
+    assert split_address('10.0.0.0/24', 3) == ['10.0.0.0/26', '10.0.0.64/26', '10.0.0.128/26', '10.0.0.192/26']
+    assert split_address('10.0.0.0/31', 8) == ['10.0.0.0/32', '10.0.0.1/32']
+    assert split_address('10.2.2.15-25', 4) == ['10.2.2.15-25']
+    assert split_address('10.0.0.0/24', 1) == ['10.0.0.0/24']
+
+
+def test_parallel_scans(tmp_path, fake_nmap):
+    inventory = parse(tmp_path, inventory_loader.get('community.general.nmap'), address='10.0.0.0/24', parallel_scans=4, exclude=['10.0.0.9'])
+
+    calls = fake_nmap()
+    assert sorted(call['args'][-1] for call in calls) == ['10.0.0.0/26', '10.0.0.128/26', '10.0.0.192/26', '10.0.0.64/26']
+    assert all(call['args'][-5:-1] == ['-oX', '-', '--exclude', '10.0.0.9'] for call in calls)
+    assert sorted(inventory.hosts) == sorted(['10.0.0.1', '10.0.0.2', '10.0.0.65', '10.0.0.66',
+                                              '10.0.0.129', '10.0.0.130', '10.0.0.193', '10.0.0.194'])
+    assert inventory.get_host('10.0.0.1').vars['ports'] == [{'port': '22', 'protocol': 'tcp', 'state': 'open', 'service': 'ssh'}]
+
+
+def test_host_cache(tmp_path, fake_nmap):
+    plugin = inventory_loader.get('community.general.nmap')
+    options = dict(address='10.0.0.0/29', exclude=['10.0.0.9'], cache=True, cache_plugin='ansible.builtin.jsonfile',
+                   cache_connection=str(tmp_path / 'cache'), cache_timeout=0, host_cache_timeout=3600)
+    first = parse(tmp_path, plugin, **options)
+    second = parse(tmp_path, plugin, **options)
+
+    calls = fake_nmap()
+    assert len(calls) == 2
+    assert calls[0]['excluded'] == []
+    assert sorted(calls[1]['excluded']) == ['10.0.0.1', '10.0.0.2', '10.0.0.9']
+    assert sorted(first.hosts) == sorted(second.hosts) == ['10.0.0.1', '10.0.0.2']
+    assert second.get_host('10.0.0.2').vars['ip'] == '10.0.0.2'
+
+
+def test_failed_scan(tmp_path, mocker):
+    mocker.patch.object(nmap, 'get_bin_path', return_value='/bin/false')
+    with pytest.raises(Exception, match='Failed to run nmap, rc=1'):
+        parse(tmp_path, inventory_loader.get('community.general.nmap'), address='10.0.0.0/30')
+    assert not os.path.exists(str(tmp_path / 'calls.log'))
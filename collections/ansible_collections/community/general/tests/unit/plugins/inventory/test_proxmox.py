@@ -8,9 +8,14 @@
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import json
+import threading
+
 import pytest
 
 from ansible.inventory.data import InventoryData
+from ansible.module_utils.six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from ansible.module_utils.six.moves.socketserver import ThreadingMixIn
 from ansible_collections.community.general.plugins.inventory.proxmox import InventoryModule
 
 
@@ -784,3 +789,86 @@ def test_populate_exclude_nodes(inventory, mocker):
     # make sure that nodes are not in the "ungrouped" group
     for node in ['testnode', 'testnode2']:
         assert node not in inventory.inventory.get_groups_dict()["ungrouped"]
+
+
+class FakeProxmoxServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_fake_proxmox_handler(requested):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, data):
+            body = json.dumps({'data': data}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._reply({'ticket': 'ticket', 'CSRFPreventionToken': 'token'})
+
+        def do_GET(self):
+            requested.append(self.path)
+            if self.path == '/api2/json/cluster/resources?type=vm':
+                resources = []
+                for vmtype in ('lxc', 'qemu'):
+                    for guest in get_json('https://localhost:8006/api2/json/nodes/testnode/%s' % vmtype):
+                        resources.append({'id': '%s/%s' % (vmtype, guest['vmid']), 'type': vmtype, 'node': 'testnode',
+                                          'vmid': int(guest['vmid']), 'name': guest['name'], 'status': guest['status']})
+                return self._reply(resources)
+            self._reply(get_json('https://localhost:8006' + self.path))
+
+    return Handler
+
+
+def test_populate_from_fake_server(mocker):
+    requested = []
+    server = FakeProxmoxServer(('127.0.0.1', 0), make_fake_proxmox_handler(requested))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        inventory = InventoryModule()
+        inventory.inventory = InventoryData()
+        inventory.proxmox_user = 'root@pam'
+        inventory.proxmox_password = 'password'
+        inventory.proxmox_url = 'http://127.0.0.1:%d' % server.server_address[1]
+        inventory.group_prefix = 'proxmox_'
+        inventory.facts_prefix = 'proxmox_'
+        inventory.strict = False
+        inventory.exclude_nodes = False
+        inventory.use_cache = False
+        inventory.host_filters = []
+
+        opts = {
+            'group_prefix': 'proxmox_',
+            'facts_prefix': 'proxmox_',
+            'want_facts': True,
+            'want_proxmox_nodes_ansible_host': True,
+            'qemu_extended_statuses': True,
+            'exclude_nodes': False,
+            'validate_certs': False,
+            'workers': 4,
+            'requests_per_second': 1000,
+        }
+        inventory.get_option = mocker.MagicMock(side_effect=get_option(opts))
+        inventory._populate()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    host_lxc = inventory.inventory.get_host('test-lxc')
+    assert host_lxc.get_vars()['proxmox_status'] == 'running'
+    assert inventory.inventory.groups['proxmox_all_prelaunch'].hosts == [inventory.inventory.get_host('test-qemu-windows')]
+    assert inventory.inventory.groups['proxmox_all_paused'].hosts == [inventory.inventory.get_host('test-qemu-multi-nic')]
+    assert 'eth0' in [d['name'] for d in inventory.inventory.get_host('test-qemu').get_vars()['proxmox_agent_interfaces']]
+
+    # the container status comes from /cluster/resources, the running VMs still need their qmpstatus
+    status_requests = sorted(path for path in requested if path.endswith('/status/current'))
+    assert status_requests == ['/api2/json/nodes/testnode/qemu/%d/status/current' % vmid for vmid in (101, 102, 103)]
@@ -300,3 +300,38 @@ class TestMergeVariablesLookup(unittest.TestCase):
         results = self.merge_vars_lookup.run(['__merge_var'], variables)
 
         self.assertEqual(results, [['item1', 'item5']])
+
+    @patch.object(AnsiblePlugin, 'set_options')
+    @patch.object(AnsiblePlugin, 'get_option', side_effect=[None, 'ignore', 'suffix', ['dummy1']] * 2)
+    @patch.object(Templar, 'template', side_effect=[
+        ['item1'],
+    ])
+    def test_merge_list_group_reuse(self, mock_set_options, mock_get_option, mock_template):
+        hostvars = self.HostVarsMock({
+            'host1': {
+                'group_names': ['dummy1'],
+                'inventory_hostname': 'host1',
+                '1testlist__merge_var': ['item1']
+            },
+            'host2': {
+                'group_names': ['dummy2'],
+                'inventory_hostname': 'host2',
+                '2otherlist__merge_var': ['item5']
+            }
+        })
+        variables = {
+            'inventory_hostname': 'host1',
+            'groups': {'all': ['host1', 'host2'], 'dummy1': ['host1'], 'dummy2': ['host2']},
+            'hostvars': hostvars
+        }
+
+        with patch.object(self.HostVarsMock, 'raw_get', side_effect=hostvars.get) as mock_raw_get:
+            results = self.merge_vars_lookup.run(['__merge_var'], variables)
+            results[0].append('changed')
+            # the second lookup with the same variables reuses the result, without templating again
+            results_again = self.merge_vars_lookup.run(['__merge_var'], variables)
+
+        self.assertEqual(results, [['item1', 'changed']])
+        self.assertEqual(results_again, [['item1']])
+        # host2 is not in the groups, so its variables are never read
+        mock_raw_get.assert_called_once_with('host1')
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Make coding more python3-ish
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+import io
+import json
+import threading
+
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+
+from ansible_collections.community.general.plugins.plugin_utils import inventory_fetch
+from ansible_collections.community.general.plugins.plugin_utils.inventory_fetch import (
+    InventoryFetcher,
+)
+
+
+class FakeResponse(object):
+    def __init__(self, data, headers):
+        self._body = json.dumps(data).encode('utf-8')
+        self.headers = headers
+
+    def read(self):
+        return self._body
+
+
+def test_map_keeps_order_and_limits_workers():
+    running = []
+    peak = []
+    lock = threading.Lock()
+    # the first three calls only return once all three of them run at the same time
+    barrier = threading.Barrier(3, timeout=10)
+
+    def work(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        if item < 3:
+            barrier.wait()
+        with lock:
+            running.remove(item)
+        return item * 2
+
+    fetcher = InventoryFetcher(workers=3)
+    assert fetcher.map(work, range(20)) == [item * 2 for item in range(20)]
+    assert max(peak) == 3
+
+
+def test_get_json_revalidates(monkeypatch):
+    sent = []
+
+    def fake_open_url(url, headers=None, **kwargs):
+        sent.append(dict(headers))
+        if headers.get('If-None-Match') == '"v1"':
+            raise HTTPError(url, 304, 'Not Modified', {}, io.BytesIO())
+        return FakeResponse({'servers': [1, 2]}, {'ETag': '"v1"', 'Link': '<next>; rel="next"'})
+
+    monkeypatch.setattr(inventory_fetch, 'open_url', fake_open_url)
+    state = {}
+    fetcher = InventoryFetcher(state=state)
+    first = fetcher.get_json('https://api/servers', headers={'X-Auth-Token': 't'}, keep_headers=('Link',))
+    # the state only keeps the validators, the data comes from the caller
+    assert state['urls']['https://api/servers'] == dict(etag='"v1"', last_modified=None, headers={'link': '<next>; rel="next"'})
+    second = InventoryFetcher(state=state).get_json('https://api/servers', headers={'X-Auth-Token': 't'}, keep_headers=('Link',),
+                                                    cached=first[0])
+    # without the previous data, the request cannot be conditional
+    third = InventoryFetcher(state=state).get_json('https://api/servers', headers={'X-Auth-Token': 't'}, keep_headers=('Link',))
+
+    assert first == second == third == ({'servers': [1, 2]}, {'link': '<next>; rel="next"'})
+    assert second[0] is first[0]
+    assert 'If-None-Match' not in sent[0]
+    assert sent[1] == {'X-Auth-Token': 't', 'If-None-Match': '"v1"'}
+    assert 'If-None-Match' not in sent[2]
+
+
+def test_refresh_collection():
+    calls = []
+
+    def fetch_all():
+        calls.append('all')
+        return [{'name': 'a', 'v': 1}, {'name': 'b', 'v': 1}]
+
+    def fetch_changed(version):
+        calls.append(('changed', version))
+        return [{'name': 'b', 'v': 2}, {'name': 'c', 'v': 2}]
+
+    def fetch_keys():
+        calls.append('keys')
+        return ['b', 'c']
+
+    state = {}
+    objects = InventoryFetcher(state).refresh_collection('systems', 1, None, fetch_all, fetch_changed, fetch_keys)
+    assert objects == fetch_all()
+    del calls[:]
+
+    fetcher = InventoryFetcher(state)
+    assert fetcher.refresh_collection('systems', 1, objects, fetch_all, fetch_changed, fetch_keys) is objects
+    assert calls == []
+    assert fetcher.revalidated == 1
+
+    objects = fetcher.refresh_collection('systems', 2, objects, fetch_all, fetch_changed, fetch_keys)
+    assert objects == [{'name': 'b', 'v': 2}, {'name': 'c', 'v': 2}]
+    assert calls == [('changed', 1), 'keys']
+    assert state['versions'] == {'systems': 2}
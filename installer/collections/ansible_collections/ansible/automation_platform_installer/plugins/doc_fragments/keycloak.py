@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2024, Ansible Automation Platform
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+
+    # Options of the keycloak_* modules of this collection on top of community.general.keycloak
+    DOCUMENTATION = r'''
+options:
+    token_cache_file:
+        description:
+            - File in which the access tokens obtained from O(auth_username) and O(auth_password) are cached until they expire.
+            - Tokens are kept per server, realm, client and user, so consecutive tasks skip the login.
+            - The file is only readable by the user running the module.
+            - A cached token rejected by Keycloak is replaced by a new one.
+        type: path
+        required: false
+'''
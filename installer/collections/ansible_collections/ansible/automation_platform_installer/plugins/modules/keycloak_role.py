@@ -74,6 +74,7 @@ options:
 
 extends_documentation_fragment:
 - community.general.keycloak
+- ansible.automation_platform_installer.keycloak
 
 
 author:
@@ -0,0 +1,258 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2024, Ansible Automation Platform
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: receptor_mesh_ping
+
+short_description: Pings receptor mesh nodes concurrently
+
+version_added: "2.4"
+
+description:
+    - Runs C(receptorctl ping) against every given node through a bounded pool of workers.
+    - Records the round-trip latency of every reply and reports per-node statistics
+      next to the list of nodes that answered and the ones that did not.
+
+options:
+    socket:
+        description: Path to the receptor control socket
+        required: true
+        type: str
+    nodes:
+        description: Receptor node IDs to ping
+        required: true
+        type: list
+        elements: str
+    names:
+        description:
+            - Names the nodes are reported under, in the same order as I(nodes), for example their inventory hostnames.
+            - Defaults to the node IDs.
+        required: false
+        type: list
+        elements: str
+    count:
+        description: Number of pings sent to every node, the latency statistics are computed over them
+        required: false
+        type: int
+        default: 1
+    workers:
+        description: Maximum number of nodes pinged at the same time
+        required: false
+        type: int
+        default: 16
+    retries:
+        description: Number of times an unreachable node is pinged again before it is reported as failed
+        required: false
+        type: int
+        default: 10
+    delay:
+        description: Seconds to wait between two attempts on the same node
+        required: false
+        type: float
+        default: 3
+    timeout:
+        description:
+            - Seconds a single C(receptorctl ping) call may take before it is killed and counted as a failed attempt.
+            - C(0) waits without a limit.
+        required: false
+        type: float
+        default: 30
+    receptorctl_path:
+        description: Path to the receptorctl executable
+        required: false
+        type: str
+        default: receptorctl
+
+author:
+    - Ansible Automation Platform Team
+'''
+
+EXAMPLES = r'''
+- name: Validate connectivity for Mesh peers
+  ansible.automation_platform_installer.receptor_mesh_ping:
+    socket: /var/run/awx-receptor/receptor.sock
+    nodes:
+      - node1
+      - node2
+    names:
+      - controller1.example.com
+      - execution1.example.com
+    workers: 32
+  register: mesh_ping
+'''
+
+RETURN = r'''
+mesh_successful_pings:
+    description: Names of the nodes that replied, in the order they were given
+    type: list
+    elements: str
+    returned: always
+mesh_failed_pings:
+    description: Names of the nodes that never replied, in the order they were given
+    type: list
+    elements: str
+    returned: always
+mesh_ping_latency:
+    description: Round-trip latency statistics in milliseconds of every node that replied, by name
+    type: dict
+    returned: always
+    sample:
+        node1:
+            samples: 3
+            min: 0.412
+            max: 0.951
+            mean: 0.603
+            p50: 0.446
+            p95: 0.951
+mesh_ping_errors:
+    description: Last output of receptorctl for every node that never replied, by name
+    type: dict
+    returned: always
+'''
+
+import re
+import subprocess
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+
+# receptorctl prints the round trip as a Go duration, e.g. "Reply from node1 in 612.348µs"
+_REPLY_RE = re.compile(r'^Reply from \S+ in ([0-9.]+)\s*(ns|us|µs|μs|ms|s)\s*$', re.MULTILINE)
+_UNIT_TO_MS = {
+    'ns': 1e-6,
+    'us': 1e-3,
+    'µs': 1e-3,
+    'μs': 1e-3,
+    'ms': 1.0,
+    's': 1e3,
+}
+
+
+def parse_latencies(stdout):
+    return [float(value) * _UNIT_TO_MS[unit] for value, unit in _REPLY_RE.findall(stdout)]
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    rank = max(int(-(-pct * len(samples) // 100)), 1)
+    return samples[rank - 1]
+
+
+def latency_stats(samples):
+    samples = sorted(samples)
+    return dict(
+        samples=len(samples),
+        min=round(samples[0], 3),
+        max=round(samples[-1], 3),
+        mean=round(sum(samples) / len(samples), 3),
+        p50=round(percentile(samples, 50), 3),
+        p95=round(percentile(samples, 95), 3),
+    )
+
+
+def run_command(cmd, timeout):
+    """
+    Runs cmd, killing it after timeout seconds. A killed command returns None as rc.
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        stdout, stderr = proc.communicate()
+        return None, stdout, '%s\ntimed out after %s seconds' % (stderr, timeout)
+    return proc.returncode, stdout, stderr
+
+
+def ping_node(module, node):
+    params = module.params
+    cmd = [params['receptorctl_path'], '--socket', params['socket'], 'ping', node, '--count', str(params['count'])]
+
+    output = ''
+    for attempt in range(params['retries'] + 1):
+        if attempt:
+            time.sleep(params['delay'])
+
+        started = time.monotonic()
+        rc, stdout, stderr = run_command(cmd, params['timeout'])
+        elapsed = (time.monotonic() - started) * 1e3
+
+        if rc == 0 and stdout.startswith('Reply'):
+            samples = parse_latencies(stdout)
+            # fall back to the wall clock if the durations cannot be parsed
+            return samples or [elapsed / params['count']], None
+        output = (stdout + stderr).strip()
+
+    return None, output
+
+
+def run_module():
+    module_args = dict(
+        socket=dict(type='str', required=True),
+        nodes=dict(type='list', elements='str', required=True),
+        names=dict(type='list', elements='str'),
+        count=dict(type='int', default=1),
+        workers=dict(type='int', default=16),
+        retries=dict(type='int', default=10),
+        delay=dict(type='float', default=3),
+        timeout=dict(type='float', default=30),
+        receptorctl_path=dict(type='str', default='receptorctl'),
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    result = dict(
+        changed=False,
+        mesh_successful_pings=[],
+        mesh_failed_pings=[],
+        mesh_ping_latency={},
+        mesh_ping_errors={},
+    )
+
+    if module.params['count'] < 1 or module.params['workers'] < 1 or module.params['retries'] < 0 or module.params['timeout'] < 0:
+        module.fail_json(msg='count and workers must be at least 1, retries and timeout cannot be negative', **result)
+
+    nodes = module.params['nodes']
+    names = module.params['names'] if module.params['names'] is not None else nodes
+    if len(names) != len(nodes):
+        module.fail_json(msg='names must have one entry per node', **result)
+    if not nodes:
+        module.exit_json(**result)
+
+    receptorctl = module.get_bin_path(module.params['receptorctl_path'], required=True)
+    module.params['receptorctl_path'] = receptorctl
+
+    with ThreadPoolExecutor(max_workers=min(module.params['workers'], len(nodes))) as pool:
+        outcomes = list(pool.map(lambda node: ping_node(module, node), nodes))
+
+    for name, (samples, error) in zip(names, outcomes):
+        if samples:
+            result['mesh_successful_pings'].append(name)
+            result['mesh_ping_latency'][name] = latency_stats(samples)
+        else:
+            result['mesh_failed_pings'].append(name)
+            result['mesh_ping_errors'][name] = error
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from ansible.module_utils.six.moves import BaseHTTPServer
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+
+from ansible_collections.ansible.automation_platform_installer.plugins.module_utils import keycloak
+
+
+class KeycloakHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """ Answers with a token on the token URL and with the request it got
+        anywhere else, over keep-alive connections
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.connections.append(self.connection)
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.headers.get('Authorization') in self.server.revoked:
+            self.reply(401, {'error': 'invalid token'})
+        else:
+            self.reply(200, {'path': self.path})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.path, dict(self.headers)))
+        self.server.tokens += 1
+        self.reply(200, {'access_token': 'token%d' % self.server.tokens, 'expires_in': 300})
+
+
+@pytest.fixture
+def server():
+    httpd = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), KeycloakHandler)
+    httpd.daemon_threads = True
+    httpd.connections = []
+    httpd.requests = []
+    httpd.revoked = set()
+    httpd.tokens = 0
+    httpd.url = 'http://127.0.0.1:%d/auth' % httpd.server_address[1]
+    thread = threading.Thread(target=httpd.serve_forever, kwargs=dict(poll_interval=0.05))
+    thread.daemon = True
+    thread.start()
+    yield httpd
+    keycloak._pool.close()
+    keycloak._cached_token = None
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_proxy(monkeypatch, tmp_path):
+    for name in ('http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('NETRC', str(tmp_path / 'netrc'))
+
+
+def params(server, **kwargs):
+    result = dict(auth_keycloak_url=server.url, auth_realm='master', auth_client_id='admin-cli',
+                  auth_username='admin', auth_password='secret', auth_client_secret=None,
+                  validate_certs=True, token=None, token_cache_file=None)
+    result.update(kwargs)
+    return result
+
+
+def get(server, path, headers=None):
+    return json.loads(keycloak.open_url(server.url + path, headers=headers).read())
+
+
+def test_requests_share_a_connection(server):
+    for path in ('/a', '/b', '/c'):
+        assert get(server, path) == {'path': '/auth' + path}
+    assert len(server.connections) == 1
+
+
+def test_stale_connection_is_reopened(server):
+    get(server, '/a')
+    # the server drops the idle keep-alive connection
+    server.connections[0].shutdown(socket.SHUT_RDWR)
+
+    assert get(server, '/b') == {'path': '/auth/b'}
+    assert len(server.connections) == 2
+
+
+def test_http_errors(server):
+    server.revoked.add('Bearer nope')
+    with pytest.raises(HTTPError) as e:
+        get(server, '/a', headers={'Authorization': 'Bearer nope'})
+    assert e.value.code == 401
+
+
+def test_netrc_credentials(server, tmp_path):
+    (tmp_path / 'netrc').write_text(u'machine 127.0.0.1 login user password pass\n')
+
+    get(server, '/a')
+    get(server, '/b', headers={'Authorization': 'Bearer token'})
+
+    assert server.requests[0][1]['Authorization'] == 'Basic dXNlcjpwYXNz'
+    assert server.requests[1][1]['Authorization'] == 'Bearer token'
+
+
+def test_token_cache(server, tmp_path):
+    cache_file = str(tmp_path / 'cache' / 'tokens.json')
+
+    assert keycloak.get_token(params(server, token_cache_file=cache_file))['Authorization'] == 'Bearer token1'
+    assert keycloak.get_token(params(server, token_cache_file=cache_file))['Authorization'] == 'Bearer token1'
+    assert server.tokens == 1
+    assert stat.S_IMODE(os.stat(cache_file).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(cache_file)).st_mode) == 0o700
+
+    # another user gets its own token
+    assert keycloak.get_token(params(server, token_cache_file=cache_file, auth_username='other'))['Authorization'] == 'Bearer token2'
+    with open(cache_file) as f:
+        assert len(json.load(f)) == 2
+
+    # the secrets are not part of the key, nor written anywhere
+    assert keycloak.get_token(params(server, token_cache_file=cache_file, auth_password='changed',
+                                     auth_client_secret='secret'))['Authorization'] == 'Bearer token1'
+    assert server.tokens == 2
+    with open(cache_file) as f:
+        assert 'secret' not in f.read()
+
+    # without the cache file, every call logs in
+    keycloak.get_token(params(server))
+    assert server.tokens == 3
+
+
+def test_revoked_cached_token_is_replaced(server, tmp_path):
+    cache_file = str(tmp_path / 'tokens.json')
+    keycloak.get_token(params(server, token_cache_file=cache_file))
+    keycloak._cached_token = None
+
+    header = keycloak.get_token(params(server, token_cache_file=cache_file))
+    server.revoked.add('Bearer token1')
+
+    assert get(server, '/a', headers=header) == {'path': '/auth/a'}
+    assert header['Authorization'] == 'Bearer token2'
+    assert server.tokens == 2
+    assert keycloak.get_token(params(server, token_cache_file=cache_file))['Authorization'] == 'Bearer token2'
+
+
+def test_https_without_context_helpers(monkeypatch):
+    # older ansible-core releases have no get_ca_certs and make_context
+    monkeypatch.setattr(keycloak, 'HAS_URLS_SSL_CONTEXT', False)
+    calls = []
+    monkeypatch.setattr(keycloak.urls, 'open_url', lambda url, **kwargs: calls.append((url, kwargs)) or 'response')
+
+    assert keycloak.open_url('https://keycloak.example.com/auth/a', validate_certs=False) == 'response'
+    assert calls[0][0] == 'https://keycloak.example.com/auth/a'
+    assert calls[0][1]['validate_certs'] is False
+    assert keycloak._pool._connections == {}
@@ -26,6 +26,12 @@ DOCUMENTATION = '''
         - This cgroup should only be used by ansible to get accurate results
         - To create the cgroup, first use a command such as
           C(sudo cgcreate -a ec2-user:ec2-user -t ec2-user:ec2-user -g cpuacct,memory,pids:ansible_profile)
+        - With cgroup v2, that is when C(/sys/fs/cgroup/cgroup.controllers) exists, the C(memory.current),
+          C(cpu.stat) and C(pids.current) files of C(/sys/fs/cgroup/<control_group>) are read instead, so the
+          cpu, memory and pids controllers must be enabled for the cgroup. The memory execution maximum is then
+          the highest sampled value, as the maximum kept by the kernel cannot be reset.
+        - A single thread samples the cgroup files during the whole run. The maximum, mean and 95th percentile
+          of a task are computed from the samples taken between the start of the task and the start of the next one.
     options:
       control_group:
         required: True
@@ -128,20 +134,31 @@ DOCUMENTATION = '''
             key: write_files
         type: bool
         default: false
+      sample_buffer_size:
+        description: Number of samples of each feature kept in memory. Statistics of a task running for longer than
+                     this number of poll intervals are computed from its latest samples. When C(write_files) is set,
+                     samples are written out when a task ends, or when half of this number is waiting to be written.
+        env:
+          - name: CGROUP_SAMPLE_BUFFER_SIZE
+        ini:
+          - section: callback_cgroup_perf_recap
+            key: sample_buffer_size
+        type: int
+        default: 4096
+        version_added: 1.6.0
 '''
 
 import csv
 import datetime
+import math
 import os
 import time
 import threading
 
-from abc import ABCMeta, abstractmethod
-
+from array import array
 from functools import partial
 
 from ansible.module_utils._text import to_bytes, to_text
-from ansible.module_utils.six import with_metaclass
 from ansible.parsing.ajson import AnsibleJSONEncoder, json
 from ansible.plugins.callback import CallbackBase
 
@@ -149,6 +166,8 @@ from ansible.plugins.callback import CallbackBase
 RS = '\x1e'  # RECORD SEPARATOR
 LF = '\x0a'  # LINE FEED
 
+CGROUP_ROOT = b'/sys/fs/cgroup'
+
 
 def dict_fromkeys(keys, default=None):
     d = {}
@@ -157,99 +176,174 @@ def dict_fromkeys(keys, default=None):
     return d
 
 
-class BaseProf(with_metaclass(ABCMeta, threading.Thread)):
-    def __init__(self, path, obj=None, writer=None):
-        threading.Thread.__init__(self)  # pylint: disable=non-parent-init-called
-        self.obj = obj
-        self.path = path
-        self.max = 0
+def read_int(path):
+    with open(path) as f:
+        return int(f.read().strip())
+
+
+def read_cpu_stat_usage(path):
+    """Returns the CPU usage in microseconds from a cgroup v2 cpu.stat file"""
+    with open(path) as f:
+        for line in f:
+            key, dummy, value = line.partition(' ')
+            if key == 'usage_usec':
+                return int(value)
+    raise ValueError('no usage_usec in %s' % to_text(path))
+
+
+class Gauge(object):
+    """Reads the current value of a cgroup file, such as the memory usage"""
+    def __init__(self, read, scale=1):
+        self._read = read
+        self._scale = scale
+
+    def sample(self, restart=False):
+        return self._read() / self._scale
+
+
+class CpuUsage(object):
+    """Computes the CPU usage in percent from a cumulative CPU time in microseconds"""
+    def __init__(self, read):
+        self._read = read
+        self._last = None
+
+    def sample(self, restart=False):
+        now = time.time() * 1000**2
+        usage = self._read()
+        last = None if restart else self._last
+        self._last = (now, usage)
+        if last is None or now <= last[0]:
+            return None
+        return (usage - last[1]) / (now - last[0]) * 100
+
+
+class RingBuffer(object):
+    """Fixed size buffer of (timestamp, value) samples, the oldest ones are overwritten once it is full"""
+    def __init__(self, size):
+        self.size = size
+        self.timestamps = array('d', [0.0]) * size
+        self.values = array('d', [0.0]) * size
+        self.count = 0
+
+    def append(self, timestamp, value):
+        index = self.count % self.size
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+        self.count += 1
+
+    def samples(self, first=0):
+        """Returns the samples from the first-th one appended, as far as they were not overwritten"""
+        return [
+            (self.timestamps[i % self.size], self.values[i % self.size])
+            for i in range(max(first, self.count - self.size), self.count)
+        ]
+
+    def window(self, start, end):
+        """Returns the values sampled from start until before end"""
+        values = []
+        for i in range(self.count - 1, max(self.count - self.size, 0) - 1, -1):
+            timestamp = self.timestamps[i % self.size]
+            if timestamp < start:
+                break
+            if timestamp < end:
+                values.append(self.values[i % self.size])
+        values.reverse()
+        return values
+
+
+def summarize(values):
+    """Returns the maximum, mean and 95th percentile of values"""
+    if not values:
+        return {'max': 0, 'mean': 0, 'p95': 0}
+    values = sorted(values)
+    return {
+        'max': values[-1],
+        'mean': sum(values) / len(values),
+        'p95': values[int(math.ceil(0.95 * len(values))) - 1],
+    }
+
+
+class CgroupSampler(threading.Thread):
+    """Python thread sampling the cgroup files of all features into ring buffers
+
+    Samples are written with the writers of the features, which take a list of
+    (timestamp, task name, task uuid, value) rows. ``lock`` must be held to
+    change the task the samples are written for, or the writers.
+    """
+    def __init__(self, readers, poll_intervals, buffer_size=4096):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.readers = readers
+        self.poll_intervals = poll_intervals
+        self.buffers = dict((name, RingBuffer(buffer_size)) for name in readers)
+        self.lock = threading.Lock()
+        self.task = None
+        self.writers = {}
+        self._written = dict.fromkeys(readers, 0)
+        self._wakeup = threading.Event()
         self.running = True
-        self.writer = writer
 
     def run(self):
+        due = dict.fromkeys(self.readers, 0)
         while self.running:
-            self.poll()
-
-    @abstractmethod
-    def poll(self):
-        pass
-
-
-class MemoryProf(BaseProf):
-    """Python thread for recording memory usage"""
-    def __init__(self, path, poll_interval=0.25, obj=None, writer=None):
-        super(MemoryProf, self).__init__(path, obj=obj, writer=writer)
-        self._poll_interval = poll_interval
-
-    def poll(self):
-        with open(self.path) as f:
-            val = int(f.read().strip()) / 1024**2
-        if val > self.max:
-            self.max = val
-        if self.writer:
-            try:
-                self.writer(time.time(), self.obj.get_name(), self.obj._uuid, val)
-            except ValueError:
-                # We may be profiling after the playbook has ended
-                self.running = False
-        time.sleep(self._poll_interval)
-
-
-class CpuProf(BaseProf):
-    def __init__(self, path, poll_interval=0.25, obj=None, writer=None):
-        super(CpuProf, self).__init__(path, obj=obj, writer=writer)
-        self._poll_interval = poll_interval
-
-    def poll(self):
-        with open(self.path) as f:
-            start_time = time.time() * 1000**2
-            start_usage = int(f.read().strip()) / 1000
-        time.sleep(self._poll_interval)
-        with open(self.path) as f:
-            end_time = time.time() * 1000**2
-            end_usage = int(f.read().strip()) / 1000
-        val = (end_usage - start_usage) / (end_time - start_time) * 100
-        if val > self.max:
-            self.max = val
-        if self.writer:
-            try:
-                self.writer(time.time(), self.obj.get_name(), self.obj._uuid, val)
-            except ValueError:
-                # We may be profiling after the playbook has ended
-                self.running = False
-
-
-class PidsProf(BaseProf):
-    def __init__(self, path, poll_interval=0.25, obj=None, writer=None):
-        super(PidsProf, self).__init__(path, obj=obj, writer=writer)
-        self._poll_interval = poll_interval
-
-    def poll(self):
-        with open(self.path) as f:
-            val = int(f.read().strip())
-        if val > self.max:
-            self.max = val
-        if self.writer:
-            try:
-                self.writer(time.time(), self.obj.get_name(), self.obj._uuid, val)
-            except ValueError:
-                # We may be profiling after the playbook has ended
-                self.running = False
-        time.sleep(self._poll_interval)
-
-
-def csv_writer(writer, timestamp, task_name, task_uuid, value):
-    writer.writerow([timestamp, task_name, task_uuid, value])
-
-
-def json_writer(writer, timestamp, task_name, task_uuid, value):
-    data = {
-        'timestamp': timestamp,
-        'task_name': task_name,
-        'task_uuid': task_uuid,
-        'value': value,
-    }
-    writer.write('%s%s%s' % (RS, json.dumps(data, cls=AnsibleJSONEncoder), LF))
+            restart = self._wakeup.is_set()
+            self._wakeup.clear()
+            now = time.time()
+            for name, reader in self.readers.items():
+                if not restart and due[name] > now:
+                    continue
+                due[name] = now + self.poll_intervals[name]
+                try:
+                    value = reader.sample(restart=restart)
+                except (IOError, OSError, ValueError):
+                    continue
+                if value is None:
+                    continue
+                with self.lock:
+                    buf = self.buffers[name]
+                    buf.append(time.time(), value)
+                    if buf.count - self._written[name] >= buf.size // 2:
+                        self.flush(name)
+            self._wakeup.wait(max(min(due.values()) - time.time(), 0))
+
+    def wakeup(self):
+        """Samples all features now, and restarts the CPU usage measurement"""
+        self._wakeup.set()
+
+    def stop(self):
+        self.running = False
+        self._wakeup.set()
+        self.join()
+
+    def flush(self, name, end=None):
+        """Writes the samples of a feature taken before end which were not written yet, must be called with lock held"""
+        buf = self.buffers[name]
+        task_name = self.task.get_name()
+        rows = []
+        count = self._written[name]
+        for timestamp, value in buf.samples(count):
+            if end is not None and timestamp >= end:
+                break
+            rows.append((timestamp, task_name, self.task._uuid, value))
+        self._written[name] = max(count, buf.count - buf.size) + len(rows)
+        if rows and self.writers.get(name):
+            self.writers[name](rows)
+
+
+def csv_writer(writer, rows):
+    writer.writerows(rows)
+
+
+def json_writer(writer, rows):
+    writer.write(''.join(
+        '%s%s%s' % (RS, json.dumps({
+            'timestamp': timestamp,
+            'task_name': task_name,
+            'task_uuid': task_uuid,
+            'value': value,
+        }, cls=AnsibleJSONEncoder), LF)
+        for timestamp, task_name, task_uuid, value in rows
+    ))
 
 
 class CallbackModule(CallbackBase):
@@ -270,7 +364,9 @@ class CallbackModule(CallbackBase):
         }
 
         self.task_results = dict_fromkeys(self._features, default=list)
-        self._profilers = dict.fromkeys(self._features)
+        self._sampler = None
+        self._task = None
+        self._task_start = None
         self._files = dict.fromkeys(self._features)
         self._writers = dict.fromkeys(self._features)
 
@@ -313,13 +409,24 @@ class CallbackModule(CallbackBase):
         pid_poll_interval = self.get_option('pid_poll_interval')
         self._display_recap = self.get_option('display_recap')
 
-        control_group = to_bytes(self.get_option('control_group'), errors='surrogate_or_strict')
-        self.mem_max_file = b'/sys/fs/cgroup/memory/%s/memory.max_usage_in_bytes' % control_group
-        mem_current_file = b'/sys/fs/cgroup/memory/%s/memory.usage_in_bytes' % control_group
-        cpu_usage_file = b'/sys/fs/cgroup/cpuacct/%s/cpuacct.usage' % control_group
-        pid_current_file = b'/sys/fs/cgroup/pids/%s/pids.current' % control_group
+        self._buffer_size = max(self.get_option('sample_buffer_size'), 2)
 
-        for path in (self.mem_max_file, mem_current_file, cpu_usage_file, pid_current_file):
+        control_group = to_bytes(self.get_option('control_group'), errors='surrogate_or_strict')
+        cgroup_v2 = os.path.exists(os.path.join(CGROUP_ROOT, b'cgroup.controllers'))
+        if cgroup_v2:
+            self.mem_max_file = None
+            mem_current_file = os.path.join(CGROUP_ROOT, control_group, b'memory.current')
+            cpu_usage_file = os.path.join(CGROUP_ROOT, control_group, b'cpu.stat')
+            pid_current_file = os.path.join(CGROUP_ROOT, control_group, b'pids.current')
+            paths = (mem_current_file, cpu_usage_file, pid_current_file)
+        else:
+            self.mem_max_file = os.path.join(CGROUP_ROOT, b'memory', control_group, b'memory.max_usage_in_bytes')
+            mem_current_file = os.path.join(CGROUP_ROOT, b'memory', control_group, b'memory.usage_in_bytes')
+            cpu_usage_file = os.path.join(CGROUP_ROOT, b'cpuacct', control_group, b'cpuacct.usage')
+            pid_current_file = os.path.join(CGROUP_ROOT, b'pids', control_group, b'pids.current')
+            paths = (self.mem_max_file, mem_current_file, cpu_usage_file, pid_current_file)
+
+        for path in paths:
             try:
                 with open(path) as f:
                     pass
@@ -330,30 +437,42 @@ class CallbackModule(CallbackBase):
                 self.disabled = True
                 return
 
-        try:
-            with open(self.mem_max_file, 'w+') as f:
-                f.write('0')
-        except Exception as e:
-            self._display.warning(
-                u'Unable to reset max memory value in %s: %s' % (to_text(self.mem_max_file), to_text(e))
-            )
-            self.disabled = True
-            return
+        if not cgroup_v2:
+            try:
+                with open(self.mem_max_file, 'w+') as f:
+                    f.write('0')
+            except Exception as e:
+                self._display.warning(
+                    u'Unable to reset max memory value in %s: %s' % (to_text(self.mem_max_file), to_text(e))
+                )
+                self.disabled = True
+                return
 
-        try:
-            with open(cpu_usage_file, 'w+') as f:
-                f.write('0')
-        except Exception as e:
-            self._display.warning(
-                u'Unable to reset CPU usage value in %s: %s' % (to_text(cpu_usage_file), to_text(e))
-            )
-            self.disabled = True
-            return
+            try:
+                with open(cpu_usage_file, 'w+') as f:
+                    f.write('0')
+            except Exception as e:
+                self._display.warning(
+                    u'Unable to reset CPU usage value in %s: %s' % (to_text(cpu_usage_file), to_text(e))
+                )
+                self.disabled = True
+                return
+
+        if cgroup_v2:
+            cpu_usage = CpuUsage(partial(read_cpu_stat_usage, cpu_usage_file))
+        else:
+            # cpuacct.usage is in nanoseconds
+            cpu_usage = CpuUsage(lambda: read_int(cpu_usage_file) / 1000)
 
-        self._profiler_map = {
-            'memory': partial(MemoryProf, mem_current_file, poll_interval=memory_poll_interval),
-            'cpu': partial(CpuProf, cpu_usage_file, poll_interval=cpu_poll_interval),
-            'pids': partial(PidsProf, pid_current_file, poll_interval=pid_poll_interval),
+        self._readers = {
+            'memory': Gauge(partial(read_int, mem_current_file), scale=1024**2),
+            'cpu': cpu_usage,
+            'pids': Gauge(partial(read_int, pid_current_file)),
+        }
+        self._poll_intervals = {
+            'memory': memory_poll_interval,
+            'cpu': cpu_poll_interval,
+            'pids': pid_poll_interval,
         }
 
         self.write_files = self.get_option('write_files')
@@ -393,43 +512,49 @@ class CallbackModule(CallbackBase):
                 self._open_files()
 
     def _profile(self, obj=None):
-        prev_task = None
-        results = dict.fromkeys(self._features)
-        if not obj or self._file_per_task:
-            for dummy, f in self._files.items():
-                if f is None:
-                    continue
-                try:
-                    f.close()
-                except Exception:
-                    pass
-
-        try:
-            for name, prof in self._profilers.items():
-                prof.running = False
-
-            for name, prof in self._profilers.items():
-                results[name] = prof.max
-            prev_task = prof.obj
-        except AttributeError:
-            pass
-
-        for name, result in results.items():
-            if result is not None:
-                try:
-                    self.task_results[name].append((prev_task, result))
-                except ValueError:
-                    pass
-
-        if obj is not None:
-            if self._file_per_task or self._counter == 0:
-                self._open_files(task_uuid=obj._uuid)
-
-            for feature in self._features:
-                self._profilers[feature] = self._profiler_map[feature](obj=obj, writer=self._writers[feature])
-                self._profilers[feature].start()
+        now = time.time()
+        sampler = self._sampler
+
+        if sampler is None and obj is not None:
+            sampler = self._sampler = CgroupSampler(self._readers, self._poll_intervals, buffer_size=self._buffer_size)
+        elif obj is None and sampler is not None and sampler.is_alive():
+            # the playbook ended, write out what is left once sampling stopped
+            sampler.stop()
+
+        if sampler is not None:
+            with sampler.lock:
+                if self._task is not None:
+                    for name in self._features:
+                        sampler.flush(name, end=now)
+                        self.task_results[name].append(
+                            (self._task, summarize(sampler.buffers[name].window(self._task_start, now)))
+                        )
+
+                if not obj or self._file_per_task:
+                    for dummy, f in self._files.items():
+                        if f is None:
+                            continue
+                        try:
+                            f.close()
+                        except Exception:
+                            pass
+
+                if obj is not None:
+                    if self._file_per_task or self._counter == 0:
+                        self._open_files(task_uuid=obj._uuid)
+                    sampler.writers = self._writers
+                    sampler.task = obj
+
+        if obj is None:
+            return
 
-            self._counter += 1
+        self._task = obj
+        self._task_start = now
+        self._counter += 1
+        if sampler.is_alive():
+            sampler.wakeup()
+        else:
+            sampler.start()
 
     def v2_playbook_on_task_start(self, task, is_conditional):
         self._profile(task)
@@ -440,8 +565,11 @@ class CallbackModule(CallbackBase):
         if not self._display_recap:
             return
 
-        with open(self.mem_max_file) as f:
-            max_results = int(f.read().strip()) / 1024 / 1024
+        if self.mem_max_file:
+            with open(self.mem_max_file) as f:
+                max_results = int(f.read().strip()) / 1024 / 1024
+        else:
+            max_results = max([0] + [t[1]['max'] for t in self.task_results['memory']])
 
         self._display.banner('CGROUP PERF RECAP')
         self._display.display('Memory Execution Maximum: %0.2fMB\n' % max_results)
@@ -450,7 +578,7 @@ class CallbackModule(CallbackBase):
                 continue
             try:
                 self._display.display(
-                    '%s Execution Maximum: %0.2f%s\n' % (name, max((t[1] for t in data)), self._units[name])
+                    '%s Execution Maximum: %0.2f%s\n' % (name, max((t[1]['max'] for t in data)), self._units[name])
                 )
             except Exception as e:
                 self._display.display('%s profiling error: no results collected: %s\n' % (name, e))
@@ -460,6 +588,8 @@ class CallbackModule(CallbackBase):
         for name, data in self.task_results.items():
             if data:
                 self._display.display('%s:\n' % name)
-            for task, value in data:
-                self._display.display('%s (%s): %0.2f%s' % (task.get_name(), task._uuid, value, self._units[name]))
+            unit = self._units[name]
+            for task, stats in data:
+                self._display.display('%s (%s): %0.2f%s (mean %0.2f%s, p95 %0.2f%s)' % (
+                    task.get_name(), task._uuid, stats['max'], unit, stats['mean'], unit, stats['p95'], unit))
             self._display.display('\n')
@@ -35,15 +35,37 @@ DOCUMENTATION = '''
           - key: json_indent
             section: defaults
         type: integer
+      json_stream:
+        name: Stream the JSON output
+        description:
+          - If enabled, write the JSON document while the playbook runs, instead of keeping every result in memory
+            and writing the whole document at the end. Every host result is written as soon as it arrives, and forgotten.
+          - The document holds the same data, but the keys whose values are only known once a play or task ends come
+            after the others, that is C(.plays[].play) after C(.plays[].tasks), C(.plays[].tasks[].task) after
+            C(.plays[].tasks[].hosts), and C(.stats) and the custom stats after C(.plays).
+          - If the run is interrupted, the document is left unfinished.
+        default: False
+        env:
+          - name: ANSIBLE_JSON_STREAM
+        ini:
+          - key: json_stream
+            section: defaults
+        type: bool
+        version_added: 1.6.0
     notes:
       - When using a strategy such as free, host_pinned, or a custom strategy, host results will
         be added to new task results in ``.plays[].tasks[]``. As such, there will exist duplicate
         task objects indicated by duplicate task IDs at ``.plays[].tasks[].task.id``, each with an
         individual host result for the task.
+      - With O(json_stream) and such a strategy, a task object is written once its host result arrived, so the tasks
+        are in the order they finished rather than the order they started.
 '''
 
 import datetime
+import io
 import json
+import os
+import sys
 
 from functools import partial
 
@@ -55,11 +77,66 @@ from ansible.plugins.callback import CallbackBase
 
 LOCKSTEP_CALLBACKS = frozenset(('linear', 'debug'))
 
+# size of the buffer of the streamed output
+STREAM_BUFFER_SIZE = 65536
+
 
 def current_time():
     return '%sZ' % datetime.datetime.utcnow().isoformat()
 
 
+class JSONStreamWriter(object):
+    """
+    Writes a JSON document piece by piece, formatted like ``json.dumps``
+    formats it with the same ``indent``.
+
+    ``open`` starts an object or array, ``close`` ends the innermost one, and
+    ``value`` encodes a whole value with an incremental encoder. ``key`` is
+    required inside objects.
+    """
+
+    def __init__(self, stream, indent=None):
+        self._stream = stream
+        self._indent = indent
+        self._encoder = AnsibleJSONEncoder(indent=indent, sort_keys=True)
+        self._item_separator = ',' if indent is not None else ', '
+        # whether each open object or array already has items
+        self._has_items = []
+
+    def _newline(self):
+        if self._indent is not None:
+            self._stream.write('\n' + ' ' * (self._indent * len(self._has_items)))
+
+    def _start_item(self, key):
+        if self._has_items:
+            if self._has_items[-1]:
+                self._stream.write(self._item_separator)
+            self._has_items[-1] = True
+            self._newline()
+        if key is not None:
+            self._stream.write(json.dumps(key) + ': ')
+
+    def open(self, bracket, key=None):
+        self._start_item(key)
+        self._stream.write(bracket)
+        self._has_items.append(False)
+
+    def close(self, bracket):
+        if self._has_items.pop():
+            self._newline()
+        self._stream.write(bracket)
+
+    def value(self, value, key=None):
+        self._start_item(key)
+        if self._indent is None or not self._has_items:
+            for chunk in self._encoder.iterencode(value):
+                self._stream.write(chunk)
+            return
+        newline = '\n' + ' ' * (self._indent * len(self._has_items))
+        for chunk in self._encoder.iterencode(value):
+            self._stream.write(chunk.replace('\n', newline))
+
+
 class CallbackModule(CallbackBase):
     CALLBACK_VERSION = 2.0
     CALLBACK_TYPE = 'stdout'
@@ -77,6 +154,13 @@ class CallbackModule(CallbackBase):
         if self._json_indent <= 0:
             self._json_indent = None
 
+        # with json_stream, only the play and task being written are kept
+        self._stream = self.get_option('json_stream')
+        self._output = None
+        self._writer = None
+        self._play = None
+        self._task = None
+
     def _new_play(self, play):
         self._is_lockstep = play.strategy in LOCKSTEP_CALLBACKS
         return {
@@ -111,7 +195,63 @@ class CallbackModule(CallbackBase):
             self.results[-1]['tasks'][-1]
         )
 
+    def _start_output(self):
+        if self._writer is not None:
+            return
+        # write to a buffered duplicate of the stdout file descriptor, or to
+        # sys.stdout itself if it has none
+        sys.stdout.flush()
+        try:
+            self._output = io.open(os.dup(sys.stdout.fileno()), 'w', buffering=STREAM_BUFFER_SIZE, encoding='utf-8')
+        except (AttributeError, ValueError, OSError, io.UnsupportedOperation):
+            self._output = None
+        self._writer = JSONStreamWriter(self._output or sys.stdout, self._json_indent)
+        self._writer.open('{')
+        self._writer.open('[', key='plays')
+
+    def _flush_output(self):
+        (self._output or sys.stdout).flush()
+
+    def _start_stream_task(self, task):
+        self._end_stream_task()
+        self._task = self._new_task(task)['task']
+        self._writer.open('{')
+        self._writer.open('{', key='hosts')
+
+    def _end_stream_task(self):
+        if self._task is None:
+            return
+        self._writer.close('}')
+        self._writer.value(self._task, key='task')
+        self._writer.close('}')
+        self._task = None
+        self._flush_output()
+
+    def _start_stream_play(self, play):
+        self._end_stream_play()
+        self._play = self._new_play(play)['play']
+        self._writer.open('{')
+        self._writer.open('[', key='tasks')
+
+    def _end_stream_play(self):
+        if self._play is None:
+            return
+        self._end_stream_task()
+        # tasks started on a host which never returned a result
+        for task_result in self._task_map.values():
+            self._writer.value(task_result)
+        self._task_map = {}
+        self._writer.close(']')
+        self._writer.value(self._play, key='play')
+        self._writer.close('}')
+        self._play = None
+        self._flush_output()
+
     def v2_playbook_on_play_start(self, play):
+        if self._stream:
+            self._start_output()
+            self._start_stream_play(play)
+            return
         self.results.append(self._new_play(play))
 
     def v2_runner_on_start(self, host, task):
@@ -120,16 +260,23 @@ class CallbackModule(CallbackBase):
         key = (host.get_name(), task._uuid)
         task_result = self._new_task(task)
         self._task_map[key] = task_result
-        self.results[-1]['tasks'].append(task_result)
+        if not self._stream:
+            self.results[-1]['tasks'].append(task_result)
 
     def v2_playbook_on_task_start(self, task, is_conditional):
         if not self._is_lockstep:
             return
+        if self._stream:
+            self._start_stream_task(task)
+            return
         self.results[-1]['tasks'].append(self._new_task(task))
 
     def v2_playbook_on_handler_task_start(self, task):
         if not self._is_lockstep:
             return
+        if self._stream:
+            self._start_stream_task(task)
+            return
         self.results[-1]['tasks'].append(self._new_task(task))
 
     def _convert_host_to_name(self, key):
@@ -154,6 +301,22 @@ class CallbackModule(CallbackBase):
             custom_stats.update(dict((self._convert_host_to_name(k), v) for k, v in stats.custom.items()))
             global_custom_stats.update(custom_stats.pop('_run', {}))
 
+        if self._stream:
+            self._start_output()
+            self._end_stream_play()
+            self._writer.close(']')
+            self._writer.value(summary, key='stats')
+            self._writer.value(custom_stats, key='custom_stats')
+            self._writer.value(global_custom_stats, key='global_custom_stats')
+            self._writer.close('}')
+            output = self._output or sys.stdout
+            output.write('\n')
+            output.flush()
+            if self._output is not None:
+                self._output.close()
+            self._output = self._writer = None
+            return
+
         output = {
             'plays': self.results,
             'stats': summary,
@@ -172,6 +335,10 @@ class CallbackModule(CallbackBase):
         result_copy.update(on_info)
         result_copy['action'] = task.action
 
+        if self._stream:
+            self._write_task_result(host, task, result_copy)
+            return
+
         task_result = self._find_result_task(host, task)
 
         task_result['hosts'][host.name] = result_copy
@@ -183,6 +350,24 @@ class CallbackModule(CallbackBase):
             key = (host.get_name(), task._uuid)
             del self._task_map[key]
 
+    def _write_task_result(self, host, task, result_copy):
+        end_time = current_time()
+        self._play['duration']['end'] = end_time
+
+        if self._is_lockstep:
+            if self._task is None:
+                self._start_stream_task(task)
+            self._writer.value(result_copy, key=host.name)
+            self._task['duration']['end'] = end_time
+            return
+
+        # every host result of a task is a task object of its own, written once complete
+        task_result = self._task_map.pop((host.get_name(), task._uuid), None) or self._new_task(task)
+        task_result['hosts'][host.name] = result_copy
+        task_result['task']['duration']['end'] = end_time
+        self._writer.value(task_result)
+        self._flush_output()
+
     def __getattribute__(self, name):
         """Return ``_record_task_result`` partial with a dict containing skipped/failed if necessary"""
         if name not in ('v2_runner_on_ok', 'v2_runner_on_failed', 'v2_runner_on_unreachable', 'v2_runner_on_skipped'):
@@ -36,6 +36,49 @@ DOCUMENTATION = '''
           - key: json_indent
             section: defaults
         type: integer
+      output_file:
+        name: Output file
+        description:
+          - Write the events to this file instead of stdout. It is created if missing, and appended to.
+          - A file descriptor inherited from the parent process can be used with its C(/dev/fd/N) path.
+          - The events are written straight to the file, or to stdout, through a buffer, and not through the Ansible display.
+            If O(output_file) is not set and a C(log_path) is configured, the events are written through the display so that
+            they are logged as before.
+        env:
+          - name: ANSIBLE_JSONL_OUTPUT_FILE
+        ini:
+          - key: output_file
+            section: callback_jsonl
+        type: path
+        version_added: 1.6.0
+      flush_interval:
+        name: Flush interval
+        description:
+          - If V(0), every event is flushed as soon as it is written.
+          - Otherwise the events are flushed by a background thread every that many seconds, and when the buffer is full.
+        default: 0
+        env:
+          - name: ANSIBLE_JSONL_FLUSH_INTERVAL
+        ini:
+          - key: flush_interval
+            section: callback_jsonl
+        type: float
+        version_added: 1.6.0
+      max_event_size:
+        name: Maximum event size
+        description:
+          - Maximum length of an event in characters. V(0) means no limit.
+          - The host results of a longer event are replaced by their C(action), C(changed), C(failed), C(skipped), C(unreachable),
+            C(rc) and the start of C(msg). If it is still too long, only the event name, timestamp and task or play are kept.
+          - Truncated events and host results have C(_truncated=true), and the events C(_original_size), their length before truncation.
+        default: 0
+        env:
+          - name: ANSIBLE_JSONL_MAX_EVENT_SIZE
+        ini:
+          - key: max_event_size
+            section: callback_jsonl
+        type: integer
+        version_added: 1.6.0
     notes:
       - When using a strategy such as free, host_pinned, or a custom strategy, host results will
         be added to new task results in ``.plays[].tasks[]``. As such, there will exist duplicate
@@ -43,25 +86,109 @@ DOCUMENTATION = '''
         individual host result for the task.
 '''
 
+import atexit
 import datetime
-import json
-import copy
-
-from functools import partial
+import io
+import os
+import sys
+import threading
 
 from ansible.inventory.host import Host
 from ansible.module_utils._text import to_text
+from ansible.module_utils.six import string_types
 from ansible.parsing.ajson import AnsibleJSONEncoder
 from ansible.plugins.callback import CallbackBase
+from ansible.utils import display as display_module
 
 
 LOCKSTEP_CALLBACKS = frozenset(('linear', 'debug'))
 
+# size of the buffer of the output file
+BUFFER_SIZE = 65536
+
+# keys of a host result kept when an event is truncated, and the length kept of its message
+TRUNCATED_RESULT_KEYS = ('action', 'changed', 'failed', 'skipped', 'unreachable', 'rc', 'msg')
+TRUNCATED_MSG_LENGTH = 1024
+
 
 def current_time():
     return '%sZ' % datetime.datetime.utcnow().isoformat()
 
 
+def truncate_result(result):
+    truncated = dict((key, result[key]) for key in TRUNCATED_RESULT_KEYS if key in result)
+    msg = truncated.get('msg')
+    if isinstance(msg, string_types) and len(msg) > TRUNCATED_MSG_LENGTH:
+        truncated['msg'] = msg[:TRUNCATED_MSG_LENGTH] + '...'
+    truncated['_truncated'] = True
+    return truncated
+
+
+class DisplaySink(object):
+    """
+    Writes lines through the Ansible display.
+    """
+
+    def __init__(self, display):
+        self._display = display
+
+    def write(self, line):
+        self._display.display(line)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BufferedSink(object):
+    """
+    Writes lines to a buffered text file, flushing it after every line or,
+    with a ``flush_interval``, from a background thread every that many
+    seconds.
+    """
+
+    def __init__(self, stream, flush_interval=0, close_stream=True):
+        self._stream = stream
+        self._close_stream = close_stream
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flush_interval = flush_interval
+        self._thread = None
+        if flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='jsonl-flush')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def write(self, line):
+        with self._lock:
+            self._stream.write(line + '\n')
+            if self._thread is None:
+                self._stream.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self._flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._stream.closed:
+                self._stream.flush()
+
+    def close(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._stream.closed:
+                return
+            self._stream.flush()
+            if self._close_stream:
+                self._stream.close()
+
+
 class CallbackModule(CallbackBase):
     CALLBACK_VERSION = 2.0
     CALLBACK_TYPE = 'stdout'
@@ -69,15 +196,39 @@ class CallbackModule(CallbackBase):
 
     def __init__(self, display=None):
         super(CallbackModule, self).__init__(display)
-        self.results = []
         self._task_map = {}
         self._is_lockstep = False
+        # only the current play and the last task of a lockstep play are kept
+        self._play_result = None
+        self._last_task_result = None
 
         self.set_options()
 
         self._json_indent = self.get_option('json_indent')
         if self._json_indent <= 0:
             self._json_indent = None
+        self._encoder = AnsibleJSONEncoder(indent=self._json_indent, separators=(',', ':'), sort_keys=True)
+        self._max_event_size = self.get_option('max_event_size')
+
+        self._sink = self._open_sink()
+        atexit.register(self._sink.close)
+
+    def _open_sink(self):
+        output_file = self.get_option('output_file')
+        if output_file:
+            stream = io.open(output_file, 'a', buffering=BUFFER_SIZE, encoding='utf-8')
+            return BufferedSink(stream, self.get_option('flush_interval'))
+
+        if getattr(display_module, 'logger', None) is not None:
+            # keep logging the events to log_path
+            return DisplaySink(self._display)
+
+        sys.stdout.flush()
+        try:
+            stream = io.open(os.dup(sys.stdout.fileno()), 'w', buffering=BUFFER_SIZE, encoding='utf-8')
+        except (AttributeError, ValueError, OSError, io.UnsupportedOperation):
+            return BufferedSink(sys.stdout, self.get_option('flush_interval'), close_stream=False)
+        return BufferedSink(stream, self.get_option('flush_interval'))
 
     def _new_play(self, play):
         self._is_lockstep = play.strategy in LOCKSTEP_CALLBACKS
@@ -108,14 +259,12 @@ class CallbackModule(CallbackBase):
 
     def _find_result_task(self, host, task):
         key = (host.get_name(), task._uuid)
-        return self._task_map.get(
-            key,
-            self.results[-1]['tasks'][-1]
-        )
+        return self._task_map.pop(key, None) or self._last_task_result
 
     def v2_playbook_on_play_start(self, play):
         play_result = self._new_play(play)
-        self.results.append(play_result)
+        self._play_result = play_result
+        self._last_task_result = None
         self._write_event('v2_playbook_on_play_start', play_result)
 
     def v2_runner_on_start(self, host, task):
@@ -124,21 +273,21 @@ class CallbackModule(CallbackBase):
         key = (host.get_name(), task._uuid)
         task_result = self._new_task(task)
         self._task_map[key] = task_result
-        self.results[-1]['tasks'].append(task_result)
+        self._last_task_result = task_result
         self._write_event('v2_runner_on_start', task_result)
 
     def v2_playbook_on_task_start(self, task, is_conditional):
         if not self._is_lockstep:
             return
         task_result = self._new_task(task)
-        self.results[-1]['tasks'].append(task_result)
+        self._last_task_result = task_result
         self._write_event('v2_playbook_on_task_start', task_result)
 
     def v2_playbook_on_handler_task_start(self, task):
         if not self._is_lockstep:
             return
         task_result = self._new_task(task)
-        self.results[-1]['tasks'].append(task_result)
+        self._last_task_result = task_result
         self._write_event('v2_playbook_on_handler_task_start', task_result)
 
     def _convert_host_to_name(self, key):
@@ -170,14 +319,35 @@ class CallbackModule(CallbackBase):
         }
 
         self._write_event('v2_playbook_on_stats', output)
+        # the sink is closed when the process exits
+        self._sink.flush()
 
     def _write_event(self, event_name, output):
         output['_event'] = event_name
         output['_timestamp'] = current_time()
-        self._display.display(json.dumps(output, cls=AnsibleJSONEncoder, indent=self._json_indent, separators=',:', sort_keys=True))
-
-    def _record_task_result(self, event_name, on_info, result, **kwargs):
-        """This function is used as a partial to add failed/skipped info in a single method"""
+        line = self._encoder.encode(output)
+        if self._max_event_size > 0 and len(line) > self._max_event_size:
+            line = self._truncate_event(output, len(line))
+        self._sink.write(line)
+
+    def _truncate_event(self, output, size):
+        truncated = dict(output, _truncated=True, _original_size=size)
+        if output.get('hosts'):
+            truncated['hosts'] = dict((name, truncate_result(result)) for name, result in output['hosts'].items())
+            line = self._encoder.encode(truncated)
+            if len(line) <= self._max_event_size:
+                return line
+
+        # keep what identifies the event, and the task or play name if it fits
+        minimal = dict((key, truncated[key]) for key in ('_event', '_timestamp', '_truncated', '_original_size'))
+        for key in ('task', 'play'):
+            if key in truncated:
+                line = self._encoder.encode(dict(minimal, **{key: truncated[key]}))
+                if len(line) <= self._max_event_size:
+                    return line
+        return self._encoder.encode(minimal)
+
+    def _record_task_result(self, event_name, on_info, result):
         host = result._host
         task = result._task
 
@@ -189,26 +359,21 @@ class CallbackModule(CallbackBase):
 
         end_time = current_time()
         task_result['task']['duration']['end'] = end_time
-        self.results[-1]['play']['duration']['end'] = end_time
-
-        task_result_copy = copy.deepcopy(task_result)
-        task_result_copy['hosts'][host.name] = result_copy
-
-        if not self._is_lockstep:
-            key = (host.get_name(), task._uuid)
-            del self._task_map[key]
+        self._play_result['play']['duration']['end'] = end_time
 
-        self._write_event(event_name, task_result_copy)
+        # the task and its host result are only referenced, the event is written right away
+        event = dict(task_result)
+        event['hosts'] = {host.name: result_copy}
+        self._write_event(event_name, event)
 
-    def __getattribute__(self, name):
-        """Return ``_record_task_result`` partial with a dict containing skipped/failed if necessary"""
-        if name not in ('v2_runner_on_ok', 'v2_runner_on_failed', 'v2_runner_on_unreachable', 'v2_runner_on_skipped'):
-            return object.__getattribute__(self, name)
+    def v2_runner_on_ok(self, result, **kwargs):
+        self._record_task_result('v2_runner_on_ok', {}, result)
 
-        on = name.rsplit('_', 1)[1]
+    def v2_runner_on_failed(self, result, **kwargs):
+        self._record_task_result('v2_runner_on_failed', {'failed': True}, result)
 
-        on_info = {}
-        if on in ('failed', 'skipped'):
-            on_info[on] = True
+    def v2_runner_on_unreachable(self, result, **kwargs):
+        self._record_task_result('v2_runner_on_unreachable', {}, result)
 
-        return partial(self._record_task_result, name, on_info)
+    def v2_runner_on_skipped(self, result, **kwargs):
+        self._record_task_result('v2_runner_on_skipped', {'skipped': True}, result)
@@ -12,6 +12,7 @@ DOCUMENTATION = '''
     short_description: Use Redis DB for cache
     description:
         - This cache uses JSON formatted, per host records saved in Redis.
+        - Each record and its entry in the keyset are written in a single transaction.
     requirements:
       - redis>=2.4.5 (python lib)
     options:
@@ -66,14 +67,55 @@ DOCUMENTATION = '''
         ini:
           - key: fact_caching_timeout
             section: defaults
+      _encoding:
+        description:
+          - How the records are encoded.
+          - V(json) stores compact JSON, V(zlib) stores zlib compressed JSON.
+          - Records written with either encoding, or by older versions of this plugin, can always be read.
+        type: string
+        choices: [json, zlib]
+        default: json
+        env:
+          - name: ANSIBLE_CACHE_REDIS_ENCODING
+        ini:
+          - key: fact_caching_redis_encoding
+            section: defaults
+        version_added: 9.5.0
+      _batch_size:
+        description:
+          - Number of host records buffered before they are written to Redis in a single round trip.
+          - Buffered records are written at the latest when the keyset is read, or when the controller exits.
+          - The default of V(1) writes every record immediately.
+        type: integer
+        default: 1
+        env:
+          - name: ANSIBLE_CACHE_REDIS_BATCH_SIZE
+        ini:
+          - key: fact_caching_redis_batch_size
+            section: defaults
+        version_added: 9.5.0
+      _expire_interval:
+        description:
+          - Minimum number of seconds between two removals of the expired keys from the keyset.
+          - Set to V(0) to check for expired keys on every lookup.
+        type: float
+        default: 1.0
+        env:
+          - name: ANSIBLE_CACHE_REDIS_EXPIRE_INTERVAL
+        ini:
+          - key: fact_caching_redis_expire_interval
+            section: defaults
+        version_added: 9.5.0
 '''
 
+import atexit
 import re
 import time
 import json
+import zlib
 
 from ansible.errors import AnsibleError
-from ansible.module_utils.common.text.converters import to_native
+from ansible.module_utils.common.text.converters import to_bytes, to_native
 from ansible.parsing.ajson import AnsibleJSONEncoder, AnsibleJSONDecoder
 from ansible.plugins.cache import BaseCacheModule
 from ansible.utils.display import Display
@@ -95,10 +137,15 @@ class CacheModule(BaseCacheModule):
     when they are inserted. This allows for the usage of 'zremrangebyscore'
     to expire keys. This mechanism is used or a pattern matched 'scan' for
     performance.
+
+    Writes can be buffered and sent in one pipeline, and bulk reads use
+    'mget', so the number of round trips does not grow with the hosts.
     """
     _sentinel_service_name = None
     re_url_conn = re.compile(r'^([^:]+|\[[^]]+\]):(\d+):(\d+)(?::(.*))?$')
     re_sent_conn = re.compile(r'^(.*):(\d+)$')
+    # number of keys handled by a single command in copy() and flush()
+    mget_chunk_size = 1000
 
     def __init__(self, *args, **kwargs):
         uri = ''
@@ -110,6 +157,11 @@ class CacheModule(BaseCacheModule):
         self._prefix = self.get_option('_prefix')
         self._keys_set = self.get_option('_keyset_name')
         self._sentinel_service_name = self.get_option('_sentinel_service_name')
+        self._encoding = self.get_option('_encoding')
+        self._batch_size = max(int(self.get_option('_batch_size')), 1)
+        self._expire_interval = float(self.get_option('_expire_interval'))
+        self._last_expire = None
+        self._pending = {}
 
         if not HAS_REDIS:
             raise AnsibleError("The 'redis' python module (version 2.4.5 or newer) is required for the redis fact cache, 'pip install redis'")
@@ -133,6 +185,9 @@ class CacheModule(BaseCacheModule):
 
         display.vv('Redis connection: %s' % self._db)
 
+        if self._batch_size > 1:
+            atexit.register(self._write_pending)
+
     @staticmethod
     def _parse_connection(re_patt, uri):
         match = re_patt.match(uri)
@@ -174,6 +229,42 @@ class CacheModule(BaseCacheModule):
     def _make_key(self, key):
         return self._prefix + key
 
+    def _encode(self, value):
+        data = json.dumps(value, cls=AnsibleJSONEncoder, separators=(',', ':'))
+        if self._encoding == 'zlib':
+            return zlib.compress(to_bytes(data, errors='surrogate_or_strict'))
+        return data
+
+    @staticmethod
+    def _decode(value):
+        # JSON records always start with '{', zlib streams with 0x78
+        if value[:1] == b'\x78':
+            value = zlib.decompress(value)
+        return json.loads(value, cls=AnsibleJSONDecoder)
+
+    def _zadd(self, pipe, keys, score):
+        if VERSION[0] == 2:
+            args = []
+            for key in keys:
+                args.extend((score, key))
+            pipe.zadd(self._keys_set, *args)
+        else:
+            pipe.zadd(self._keys_set, dict((key, score) for key in keys))
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        pipe = self._db.pipeline(transaction=True)
+        for key, value in pending.items():
+            if self._timeout > 0:  # a timeout of 0 is handled as meaning 'never expire'
+                pipe.setex(self._make_key(key), int(self._timeout), value)
+            else:
+                pipe.set(self._make_key(key), value)
+        self._zadd(pipe, pending, time.time())
+        pipe.execute()
+
     def get(self, key):
 
         if key not in self._cache:
@@ -184,50 +275,73 @@ class CacheModule(BaseCacheModule):
             if value is None:
                 self.delete(key)
                 raise KeyError
-            self._cache[key] = json.loads(value, cls=AnsibleJSONDecoder)
+            self._cache[key] = self._decode(value)
 
         return self._cache.get(key)
 
     def set(self, key, value):
 
-        value2 = json.dumps(value, cls=AnsibleJSONEncoder, sort_keys=True, indent=4)
-        if self._timeout > 0:  # a timeout of 0 is handled as meaning 'never expire'
-            self._db.setex(self._make_key(key), int(self._timeout), value2)
-        else:
-            self._db.set(self._make_key(key), value2)
-
-        if VERSION[0] == 2:
-            self._db.zadd(self._keys_set, time.time(), key)
-        else:
-            self._db.zadd(self._keys_set, {key: time.time()})
+        self._pending[key] = self._encode(value)
         self._cache[key] = value
+        if len(self._pending) >= self._batch_size:
+            self._write_pending()
 
     def _expire_keys(self):
         if self._timeout > 0:
-            expiry_age = time.time() - self._timeout
+            now = time.time()
+            if self._last_expire is not None and now - self._last_expire < self._expire_interval:
+                return
+            self._last_expire = now
+            expiry_age = now - self._timeout
             self._db.zremrangebyscore(self._keys_set, 0, expiry_age)
 
     def keys(self):
+        self._write_pending()
         self._expire_keys()
         return self._db.zrange(self._keys_set, 0, -1)
 
     def contains(self, key):
+        if key in self._pending:
+            return True
         self._expire_keys()
         return (self._db.zrank(self._keys_set, key) is not None)
 
     def delete(self, key):
         if key in self._cache:
             del self._cache[key]
-        self._db.delete(self._make_key(key))
-        self._db.zrem(self._keys_set, key)
+        self._pending.pop(key, None)
+        pipe = self._db.pipeline(transaction=True)
+        pipe.delete(self._make_key(key))
+        pipe.zrem(self._keys_set, key)
+        pipe.execute()
 
     def flush(self):
-        for key in list(self.keys()):
-            self.delete(key)
+        keys = list(self.keys())
+        self._cache = {}
+        for start in range(0, len(keys), self.mget_chunk_size):
+            chunk = keys[start:start + self.mget_chunk_size]
+            pipe = self._db.pipeline(transaction=True)
+            pipe.delete(*[self._make_key(to_native(key)) for key in chunk])
+            pipe.zrem(self._keys_set, *chunk)
+            pipe.execute()
 
     def copy(self):
-        # TODO: there is probably a better way to do this in redis
-        ret = {k: self.get(k) for k in self.keys()}
+        ret = {}
+        missing = []
+        keys = [to_native(key) for key in self.keys()]
+        for start in range(0, len(keys), self.mget_chunk_size):
+            chunk = keys[start:start + self.mget_chunk_size]
+            values = self._db.mget([self._make_key(key) for key in chunk])
+            for key, value in zip(chunk, values):
+                if value is None:
+                    missing.append(key)
+                    continue
+                ret[key] = self._cache[key] = self._decode(value)
+        # same guard as in get()
+        if missing:
+            pipe = self._db.pipeline(transaction=True)
+            pipe.zrem(self._keys_set, *missing)
+            pipe.execute()
         return ret
 
     def __getstate__(self):
@@ -13,6 +13,8 @@ DOCUMENTATION = '''
     version_added: 3.8.0
     description:
       - This callback creates distributed traces for each Ansible task in Elastic APM.
+      - The span of a task for a host is sent by the background transport of the APM client as soon as
+        the host finished the task, the transaction of the playbook when the playbook ends.
       - You can configure the plugin with environment variables.
       - See U(https://www.elastic.co/guide/en/apm/agent/python/current/configuration.html).
     options:
@@ -61,6 +63,28 @@ DOCUMENTATION = '''
           - The L(W3C Trace Context header traceparent,https://www.w3.org/TR/trace-context-1/#traceparent-header).
         env:
           - name: TRACEPARENT
+      max_retained_tasks:
+        type: int
+        default: 100
+        description:
+          - The number of tasks whose data is kept in memory while the playbook runs.
+          - The span of a task and host is created as soon as the host finished the task, so a task is only
+            kept to recognize further results for it. When more tasks were started, the data of the oldest one is dropped.
+          - A result received for a task that was dropped already, for example with the V(free) strategy,
+            creates a span which starts when the result was received.
+        env:
+          - name: ANSIBLE_ELASTIC_MAX_RETAINED_TASKS
+        version_added: 9.5.0
+      max_message_size:
+        type: int
+        default: 10000
+        description:
+          - The maximum number of characters of the task arguments, the task message and the error message
+            taken from a task result and attached to its span. Longer values are truncated.
+          - V(0) disables truncating.
+        env:
+          - name: ANSIBLE_ELASTIC_MAX_MESSAGE_SIZE
+        version_added: 9.5.0
     requirements:
       - elastic-apm (Python library)
 '''
@@ -120,9 +144,10 @@ class TaskData:
                 # concatenate task include output from multiple items
                 host.result = '%s\n%s' % (self.host_data[host.uuid].result, host.result)
             else:
-                return
+                return False
 
         self.host_data[host.uuid] = host
+        return True
 
 
 class HostData:
@@ -139,9 +164,11 @@ class HostData:
 
 
 class ElasticSource(object):
-    def __init__(self, display):
+    def __init__(self, display, max_message_size=0):
         self.ansible_playbook = ""
         self.ansible_version = None
+        self.max_message_size = max_message_size
+        self.start_time = None
         self.session = str(uuid.uuid4())
         self.host = socket.gethostname()
         try:
@@ -187,40 +214,49 @@ class ElasticSource(object):
         if self.ansible_version is None and result._task_fields['args'].get('_ansible_version'):
             self.ansible_version = result._task_fields['args'].get('_ansible_version')
 
-        task.add_host(HostData(host_uuid, host_name, status, result))
+        host = HostData(host_uuid, host_name, status, result)
+        if task.add_host(host):
+            return host
+        return None
+
+    def begin_transaction(self, apm_cli, traceparent, start_time=None):
+        """ begin the transaction of the playbook, the parent of the task spans """
 
-    def generate_distributed_traces(self, tasks_data, status, end_time, traceparent, apm_service_name,
-                                    apm_server_url, apm_verify_server_cert, apm_secret_token, apm_api_key):
-        """ generate distributed traces from the collected TaskData and HostData """
+        self.start_time = start_time if start_time is not None else time.time()
+        if traceparent:
+            parent = trace_parent_from_string(traceparent)
+            apm_cli.begin_transaction("Session", trace_parent=parent, start=self.start_time)
+        else:
+            apm_cli.begin_transaction("Session", start=self.start_time)
+
+    def end_transaction(self, apm_cli, status, end_time):
+        """ end the transaction of the playbook, and send the events not sent yet """
+
+        with closing(apm_cli):
+            # Populate trace metadata attributes
+            if self.ansible_version is not None:
+                label(ansible_version=self.ansible_version)
+            label(ansible_session=self.session, ansible_host_name=self.host, ansible_host_user=self.user)
+            if self.ip_address is not None:
+                label(ansible_host_ip=self.ip_address)
 
-        tasks = []
-        parent_start_time = None
-        for task_uuid, task in tasks_data.items():
-            if parent_start_time is None:
-                parent_start_time = task.start
-            tasks.append(task)
+            apm_cli.end_transaction(name=__name__, result=status, duration=end_time - self.start_time)
+
+    def send_host(self, apm_cli, task_data, host_data):
+        """ create the span of a task for a host, then drop the host result """
 
-        apm_cli = self.init_apm_client(apm_server_url, apm_service_name, apm_verify_server_cert, apm_secret_token, apm_api_key)
         if apm_cli:
-            with closing(apm_cli):
-                instrument()  # Only call this once, as early as possible.
-                if traceparent:
-                    parent = trace_parent_from_string(traceparent)
-                    apm_cli.begin_transaction("Session", trace_parent=parent, start=parent_start_time)
-                else:
-                    apm_cli.begin_transaction("Session", start=parent_start_time)
-                # Populate trace metadata attributes
-                if self.ansible_version is not None:
-                    label(ansible_version=self.ansible_version)
-                label(ansible_session=self.session, ansible_host_name=self.host, ansible_host_user=self.user)
-                if self.ip_address is not None:
-                    label(ansible_host_ip=self.ip_address)
+            self.create_span_data(apm_cli, task_data, host_data)
+        # the host is kept to ignore further results for it
+        host_data.result = None
 
-                for task_data in tasks:
-                    for host_uuid, host_data in task_data.host_data.items():
-                        self.create_span_data(apm_cli, task_data, host_data)
+    def release_task(self, apm_cli, tasks_data, task_uuid):
+        """ send the task include spans of a task, which can only be known to be complete now, and forget the task """
 
-                apm_cli.end_transaction(name=__name__, result=status, duration=end_time - parent_start_time)
+        task = tasks_data.pop(task_uuid)
+        for host_data in task.host_data.values():
+            if host_data.status == 'included':
+                self.send_host(apm_cli, task, host_data)
 
     def create_span_data(self, apm_cli, task_data, host_data):
         """ create the span with the given TaskData and HostData """
@@ -236,8 +272,8 @@ class ElasticSource(object):
             res = host_data.result._result
             rc = res.get('rc', 0)
             if host_data.status == 'failed':
-                message = self.get_error_message(res)
-                enriched_error_message = self.enrich_error_message(res)
+                message = self.truncate(self.get_error_message(res))
+                enriched_error_message = self.truncate(self.enrich_error_message(res))
                 status = "failure"
             elif host_data.status == 'skipped':
                 if 'skip_reason' in res:
@@ -250,7 +286,7 @@ class ElasticSource(object):
                           start=task_data.start,
                           span_type="ansible.task.run",
                           duration=host_data.finish - task_data.start,
-                          labels={"ansible.task.args": task_data.args,
+                          labels={"ansible.task.args": self.truncate(task_data.args),
                                   "ansible.task.message": message,
                                   "ansible.task.module": task_data.action,
                                   "ansible.task.name": name,
@@ -272,6 +308,13 @@ class ElasticSource(object):
                           use_elastic_traceparent_header=True,
                           debug=True)
 
+    def truncate(self, text):
+        """ shorten a text taken from a task to max_message_size characters """
+
+        if not self.max_message_size or text is None or len(text) <= self.max_message_size:
+            return text
+        return text[:max(self.max_message_size - 3, 0)] + '...'
+
     @staticmethod
     def get_error_message(result):
         if result.get('exception') is not None:
@@ -311,6 +354,8 @@ class CallbackModule(CallbackBase):
         self.tasks_data = None
         self.errors = 0
         self.disabled = False
+        self.apm_cli = None
+        self.max_retained_tasks = None
 
         if ELASTIC_LIBRARY_IMPORT_ERROR:
             raise_from(
@@ -337,14 +382,10 @@ class CallbackModule(CallbackBase):
         self.apm_api_key = self.get_option('apm_api_key')
         self.apm_verify_server_cert = self.get_option('apm_verify_server_cert')
         self.traceparent = self.get_option('traceparent')
+        self.max_retained_tasks = max(self.get_option('max_retained_tasks'), 1)
+        self.elastic.max_message_size = self.get_option('max_message_size')
 
-    def v2_playbook_on_start(self, playbook):
-        self.ansible_playbook = basename(playbook._file_name)
-
-    def v2_playbook_on_play_start(self, play):
-        self.play_name = play.get_name()
-
-    def v2_runner_on_no_hosts(self, task):
+    def _start_task(self, task):
         self.elastic.start_task(
             self.tasks_data,
             self.hide_task_arguments,
@@ -352,75 +393,80 @@ class CallbackModule(CallbackBase):
             task
         )
 
-    def v2_playbook_on_task_start(self, task, is_conditional):
-        self.elastic.start_task(
+        if self.apm_cli and self.elastic.start_time is None:
+            self.elastic.begin_transaction(self.apm_cli, self.traceparent, self.tasks_data[task._uuid].start)
+
+        while len(self.tasks_data) > self.max_retained_tasks:
+            self.elastic.release_task(self.apm_cli, self.tasks_data, next(iter(self.tasks_data)))
+
+    def _finish_task(self, status, result):
+        if result._task._uuid not in self.tasks_data:
+            # a late result of a task which was released already
+            self._start_task(result._task)
+
+        host_data = self.elastic.finish_task(
             self.tasks_data,
-            self.hide_task_arguments,
-            self.play_name,
-            task
+            status,
+            result
         )
 
-    def v2_playbook_on_cleanup_task_start(self, task):
-        self.elastic.start_task(
-            self.tasks_data,
-            self.hide_task_arguments,
-            self.play_name,
-            task
+        # task include results are concatenated until the task is released
+        if host_data is not None and status != 'included':
+            self.elastic.send_host(self.apm_cli, self.tasks_data[result._task._uuid], host_data)
+
+    def v2_playbook_on_start(self, playbook):
+        self.ansible_playbook = basename(playbook._file_name)
+        self.apm_cli = self.elastic.init_apm_client(
+            self.apm_server_url,
+            self.apm_service_name,
+            self.apm_verify_server_cert,
+            self.apm_secret_token,
+            self.apm_api_key
         )
+        if self.apm_cli:
+            instrument()  # Only call this once, as early as possible.
+
+    def v2_playbook_on_play_start(self, play):
+        self.play_name = play.get_name()
+
+    def v2_runner_on_no_hosts(self, task):
+        self._start_task(task)
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._start_task(task)
+
+    def v2_playbook_on_cleanup_task_start(self, task):
+        self._start_task(task)
 
     def v2_playbook_on_handler_task_start(self, task):
-        self.elastic.start_task(
-            self.tasks_data,
-            self.hide_task_arguments,
-            self.play_name,
-            task
-        )
+        self._start_task(task)
 
     def v2_runner_on_failed(self, result, ignore_errors=False):
         self.errors += 1
-        self.elastic.finish_task(
-            self.tasks_data,
-            'failed',
-            result
-        )
+        self._finish_task('failed', result)
 
     def v2_runner_on_ok(self, result):
-        self.elastic.finish_task(
-            self.tasks_data,
-            'ok',
-            result
-        )
+        self._finish_task('ok', result)
 
     def v2_runner_on_skipped(self, result):
-        self.elastic.finish_task(
-            self.tasks_data,
-            'skipped',
-            result
-        )
+        self._finish_task('skipped', result)
 
     def v2_playbook_on_include(self, included_file):
-        self.elastic.finish_task(
-            self.tasks_data,
-            'included',
-            included_file
-        )
+        self._finish_task('included', included_file)
 
     def v2_playbook_on_stats(self, stats):
         if self.errors == 0:
             status = "success"
         else:
             status = "failure"
-        self.elastic.generate_distributed_traces(
-            self.tasks_data,
-            status,
-            time.time(),
-            self.traceparent,
-            self.apm_service_name,
-            self.apm_server_url,
-            self.apm_verify_server_cert,
-            self.apm_secret_token,
-            self.apm_api_key
-        )
+
+        for task_uuid in list(self.tasks_data):
+            self.elastic.release_task(self.apm_cli, self.tasks_data, task_uuid)
+
+        if self.apm_cli:
+            if self.elastic.start_time is None:
+                self.elastic.begin_transaction(self.apm_cli, self.traceparent)
+            self.elastic.end_transaction(self.apm_cli, status, time.time())
 
     def v2_runner_on_async_failed(self, result, **kwargs):
         self.errors += 1
@@ -14,8 +14,10 @@ DOCUMENTATION = '''
     description:
       - This callback will report logs from playbook actions, tasks, and events to LogDNA (U(https://app.logdna.com)).
     requirements:
-      - LogDNA Python Library (U(https://github.com/logdna/python))
       - whitelisting in configuration
+    extends_documentation_fragment:
+      - community.general.event_shipper
+      - community.general.event_shipper.compress
     options:
       conf_key:
         required: true
@@ -55,20 +57,75 @@ DOCUMENTATION = '''
           - section: callback_logdna
             key: conf_tags
         default: ansible
+      ingest_url:
+        required: false
+        description: URL of the LogDNA ingestion API the logs are sent to.
+        type: string
+        env:
+          - name: LOGDNA_INGEST_URL
+        ini:
+          - section: callback_logdna
+            key: ingest_url
+        default: https://logs.logdna.com/logs/ingest
+        version_added: 9.5.0
+      queue_size:
+        env:
+          - name: LOGDNA_QUEUE_SIZE
+        ini:
+          - section: callback_logdna
+            key: queue_size
+      queue_full:
+        env:
+          - name: LOGDNA_QUEUE_FULL
+        ini:
+          - section: callback_logdna
+            key: queue_full
+      max_batch_events:
+        env:
+          - name: LOGDNA_MAX_BATCH_EVENTS
+        ini:
+          - section: callback_logdna
+            key: max_batch_events
+      max_batch_size:
+        env:
+          - name: LOGDNA_MAX_BATCH_SIZE
+        ini:
+          - section: callback_logdna
+            key: max_batch_size
+      flush_interval:
+        env:
+          - name: LOGDNA_FLUSH_INTERVAL
+        ini:
+          - section: callback_logdna
+            key: flush_interval
+      send_retries:
+        env:
+          - name: LOGDNA_SEND_RETRIES
+        ini:
+          - section: callback_logdna
+            key: send_retries
+      compress:
+        env:
+          - name: LOGDNA_COMPRESS
+        ini:
+          - section: callback_logdna
+            key: compress
 '''
 
-import logging
 import json
 import socket
+import time
 from uuid import getnode
+from ansible.module_utils.six.moves.urllib.parse import urlencode
+from ansible.module_utils.urls import open_url
 from ansible.plugins.callback import CallbackBase
 from ansible.parsing.ajson import AnsibleJSONEncoder
 
-try:
-    from logdna import LogDNAHandler
-    HAS_LOGDNA = True
-except ImportError:
-    HAS_LOGDNA = False
+from ansible_collections.community.general.plugins.plugin_utils.event_shipper import EventShipper
+
+
+def ingest_lines(payloads):
+    return '{"lines":[' + ','.join(payloads) + ']}'
 
 
 # Getting MAC Address of system:
@@ -125,6 +182,7 @@ class CallbackModule(CallbackBase):
         self.plugin_ignore_errors = None
         self.conf_hostname = None
         self.conf_tags = None
+        self.shipper = None
 
     def set_options(self, task_keys=None, var_options=None, direct=None):
         super(CallbackModule, self).set_options(task_keys=task_keys, var_options=var_options, direct=direct)
@@ -141,15 +199,42 @@ class CallbackModule(CallbackBase):
 
         self.conf_tags = self.conf_tags.split(',')
 
-        if HAS_LOGDNA:
-            self.log = logging.getLogger('logdna')
-            self.log.setLevel(logging.INFO)
-            self.options = {'hostname': self.conf_hostname, 'mac': self.mac, 'index_meta': True}
-            self.log.addHandler(LogDNAHandler(self.conf_key, self.options))
-            self.disabled = False
-        else:
-            self.disabled = True
-            self._display.warning('WARNING:\nPlease, install LogDNA Python Package: `pip install logdna`')
+        self.compress = self.get_option('compress')
+        self.shipper = EventShipper(
+            self.post,
+            encode=ingest_lines,
+            queue_size=self.get_option('queue_size'),
+            max_batch_events=self.get_option('max_batch_events'),
+            max_batch_size=self.get_option('max_batch_size'),
+            flush_interval=self.get_option('flush_interval'),
+            retries=self.get_option('send_retries'),
+            compress=self.compress,
+            queue_full=self.get_option('queue_full'),
+            warn=self._display.warning,
+        )
+        self.disabled = False
+
+    def post(self, body, key=None):
+        query = {
+            'hostname': self.conf_hostname,
+            'mac': self.mac,
+            'ip': self.ip,
+            'tags': ','.join(self.conf_tags),
+            'now': int(time.time() * 1000),
+        }
+        headers = {'Content-Type': 'application/json; charset=UTF-8'}
+        if self.compress:
+            headers['Content-Encoding'] = 'gzip'
+
+        open_url(
+            self.get_option('ingest_url') + '?' + urlencode(query),
+            body,
+            headers=headers,
+            method='POST',
+            url_username=self.conf_key,
+            url_password='',
+            force_basic_auth=True
+        )
 
     def metaIndexing(self, meta):
         invalidKeys = []
@@ -164,18 +249,23 @@ class CallbackModule(CallbackBase):
             meta['__errors'] = 'These keys have been sanitized: ' + ', '.join(invalidKeys)
         return meta
 
-    def sanitizeJSON(self, data):
+    def flush(self, log, options):
         try:
-            return json.loads(json.dumps(data, sort_keys=True, cls=AnsibleJSONEncoder))
+            line = json.dumps(log, sort_keys=True, cls=AnsibleJSONEncoder)
         except Exception:
-            return {'warnings': ['JSON Formatting Issue', json.dumps(data, sort_keys=True, cls=AnsibleJSONEncoder)]}
-
-    def flush(self, log, options):
-        if HAS_LOGDNA:
-            self.log.info(json.dumps(log), options)
+            line = json.dumps({'warnings': ['JSON Formatting Issue', repr(log)]})
+        self.shipper.put(json.dumps({
+            'line': line,
+            'app': options['app'],
+            'level': 'INFO',
+            'timestamp': int(time.time() * 1000),
+            'meta': options['meta'],
+        }))
 
     def sendLog(self, host, category, logdata):
         options = {'app': 'ansible', 'meta': {'playbook': self.playbook_name, 'host': host, 'category': category}}
+        # work on a copy, the result is still used by the other callbacks
+        logdata['info'] = dict(logdata['info'])
         logdata['info'].pop('invocation', None)
         warnings = logdata['info'].pop('warnings', None)
         if warnings is not None:
@@ -190,21 +280,22 @@ class CallbackModule(CallbackBase):
         result = dict()
         for host in stats.processed.keys():
             result[host] = stats.summarize(host)
-        self.sendLog(self.conf_hostname, 'STATS', {'info': self.sanitizeJSON(result)})
+        self.sendLog(self.conf_hostname, 'STATS', {'info': result})
+        self.shipper.close()
 
     def runner_on_failed(self, host, res, ignore_errors=False):
         if self.plugin_ignore_errors:
             ignore_errors = self.plugin_ignore_errors
-        self.sendLog(host, 'FAILED', {'info': self.sanitizeJSON(res), 'ignore_errors': ignore_errors})
+        self.sendLog(host, 'FAILED', {'info': res, 'ignore_errors': ignore_errors})
 
     def runner_on_ok(self, host, res):
-        self.sendLog(host, 'OK', {'info': self.sanitizeJSON(res)})
+        self.sendLog(host, 'OK', {'info': res})
 
     def runner_on_unreachable(self, host, res):
-        self.sendLog(host, 'UNREACHABLE', {'info': self.sanitizeJSON(res)})
+        self.sendLog(host, 'UNREACHABLE', {'info': res})
 
     def runner_on_async_failed(self, host, res, jid):
-        self.sendLog(host, 'ASYNC_FAILED', {'info': self.sanitizeJSON(res), 'job_id': jid})
+        self.sendLog(host, 'ASYNC_FAILED', {'info': res, 'job_id': jid})
 
     def runner_on_async_ok(self, host, res, jid):
-        self.sendLog(host, 'ASYNC_OK', {'info': self.sanitizeJSON(res), 'job_id': jid})
+        self.sendLog(host, 'ASYNC_OK', {'info': res, 'job_id': jid})
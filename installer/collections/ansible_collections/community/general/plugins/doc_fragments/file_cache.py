@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+
+    # Options of the file based cache plugins built on IndexedFileCacheModule
+    DOCUMENTATION = r'''
+options:
+  _shards:
+    description:
+      - Number of subdirectories the per host files are spread over, so that no single directory holds all of them.
+      - A host always lands in the same subdirectory, named after the hexadecimal shard number.
+      - The default of V(0) saves all files directly in O(_uri).
+      - Files saved with a different number of shards are not found anymore, so O(_index) should be rebuilt
+        by removing the index file after changing this.
+    type: integer
+    default: 0
+    env:
+      - name: ANSIBLE_CACHE_FILE_SHARDS
+    ini:
+      - key: fact_caching_file_shards
+        section: defaults
+    version_added: 9.5.0
+  _compression:
+    description:
+      - Compression applied to the per host files.
+      - V(zstd) requires the C(zstandard) Python library.
+      - Files are read whatever compression they were written with, so this can be changed on an existing cache.
+    type: string
+    default: none
+    choices: [none, gzip, bz2, lzma, zstd]
+    env:
+      - name: ANSIBLE_CACHE_FILE_COMPRESSION
+    ini:
+      - key: fact_caching_file_compression
+        section: defaults
+    version_added: 9.5.0
+  _index:
+    description:
+      - Keep an index of the cached hosts and the time they were written in a hidden file in O(_uri).
+      - Listing the cached hosts and checking whether they expired then reads the index,
+        instead of listing the directory and calling C(stat) on every file.
+      - The index is only appended to, and is compacted when it is read and holds many stale entries.
+      - Only enable this if the cache directory is not written to by other tools, or by older versions of this plugin.
+        If the index file is missing, it is rebuilt from the files in O(_uri).
+    type: boolean
+    default: false
+    env:
+      - name: ANSIBLE_CACHE_FILE_INDEX
+    ini:
+      - key: fact_caching_file_index
+        section: defaults
+    version_added: 9.5.0
+'''
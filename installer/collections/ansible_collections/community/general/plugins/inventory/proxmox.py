@@ -121,6 +121,22 @@ DOCUMENTATION = '''
         type: bool
         default: false
         version_added: 8.1.0
+      workers:
+        description:
+          - Number of threads fetching the guests of the nodes, and their facts when O(want_facts=true), at the same time.
+          - All threads share the same HTTP session and its pool of connections.
+          - The status of all guests is read at once from the C(/cluster/resources) endpoint, only running QEMU VMs
+            need a request of their own for their C(qmpstatus).
+        type: int
+        default: 1
+        version_added: 9.5.0
+      requests_per_second:
+        description:
+          - Maximum number of API requests per second about the guests of a single Proxmox node.
+          - The default of V(0) does not limit the rate.
+        type: float
+        default: 0
+        version_added: 9.5.0
       filters:
         version_added: 4.6.0
         description: A list of Jinja templates that allow filtering hosts.
@@ -217,6 +233,10 @@ want_proxmox_nodes_ansible_host: true
 
 import itertools
 import re
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
 
 from ansible.module_utils.common._collections_compat import MutableMapping
 
@@ -241,6 +261,27 @@ except ImportError:
 
 display = Display()
 
+_NODE_URL_RE = re.compile(r'/api2/json/nodes/([^/]+)')
+
+
+class RateLimiter(object):
+    ''' Spaces the requests made for the same key by at least 1 / rate seconds. '''
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, key):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            at = max(now, self._next.get(key, now))
+            self._next[key] = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
 
 class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
     ''' Host inventory parser for ansible using Proxmox as source. '''
@@ -257,6 +298,10 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.session = None
         self.cache_key = None
         self.use_cache = None
+        self.rate_limiter = RateLimiter(0)
+        self._cache_lock = threading.Lock()
+        # (vmtype, vmid) -> entry of /cluster/resources
+        self._cluster_resources = {}
 
     def verify_file(self, path):
 
@@ -272,6 +317,11 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         if not self.session:
             self.session = requests.session()
             self.session.verify = self.get_option('validate_certs')
+            # one pooled connection for every worker thread
+            workers = max(self.get_option('workers') or 1, 1)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
         return self.session
 
     def _get_auth(self):
@@ -305,8 +355,12 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         if not self.use_cache or url not in self._cache.get(self.cache_key, {}):
 
-            if self.cache_key not in self._cache:
-                self._cache[self.cache_key] = {'url': ''}
+            with self._cache_lock:
+                if self.cache_key not in self._cache:
+                    self._cache[self.cache_key] = {'url': ''}
+
+            node = _NODE_URL_RE.search(url)
+            self.rate_limiter.wait(node.group(1) if node else None)
 
             data = []
             s = self._get_session()
@@ -350,6 +404,9 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
     def _get_qemu_per_node(self, node):
         return self._get_json("%s/api2/json/nodes/%s/qemu" % (self.proxmox_url, node))
 
+    def _get_cluster_resources(self):
+        return self._get_json("%s/api2/json/cluster/resources?type=vm" % self.proxmox_url)
+
     def _get_members_per_pool(self, pool):
         ret = self._get_json("%s/api2/json/pools/%s" % (self.proxmox_url, pool))
         return ret['members']
@@ -487,10 +544,14 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 return None
 
     def _get_vm_status(self, properties, node, vmid, vmtype, name):
-        ret = self._get_json("%s/api2/json/nodes/%s/%s/%s/status/current" % (self.proxmox_url, node, vmtype, vmid))
+        # the cluster-wide listing already has the status; only a running QEMU VM
+        # may be paused or prelaunched, which status/current tells
+        ret = self._cluster_resources.get((vmtype, str(vmid)))
+        if ret is None or ret.get('node') != node or (vmtype == 'qemu' and ret.get('status') == 'running'):
+            ret = self._get_json("%s/api2/json/nodes/%s/%s/%s/status/current" % (self.proxmox_url, node, vmtype, vmid))
         properties[self._fact('status')] = ret['status']
         if vmtype == 'qemu':
-            properties[self._fact('qmpstatus')] = ret['qmpstatus']
+            properties[self._fact('qmpstatus')] = ret.get('qmpstatus', ret['status'])
 
     def _get_vm_snapshots(self, properties, node, vmid, vmtype, name):
         ret = self._get_json("%s/api2/json/nodes/%s/%s/%s/snapshot" % (self.proxmox_url, node, vmtype, vmid))
@@ -538,25 +599,34 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self._add_host_to_composed_groups(self.get_option('groups'), variables, name, strict=self.strict)
         self._add_host_to_keyed_groups(self.get_option('keyed_groups'), variables, name, strict=self.strict)
 
-    def _handle_item(self, node, ittype, item):
+    def _get_vm_facts(self, node, ittype, item):
+        '''Fetch the status, config and snapshots of an LXC container or Qemu VM.
+        Only touches the returned dict, so it can run on the worker threads.'''
+        properties = dict()
+        name, vmid = item['name'], item['vmid']
+
+        self._get_vm_status(properties, node, vmid, ittype, name)
+        self._get_vm_config(properties, node, vmid, ittype, name)
+        self._get_vm_snapshots(properties, node, vmid, ittype, name)
+
+        if ittype == 'lxc':
+            self._get_lxc_interfaces(properties, node, vmid)
+
+        return properties
+
+    def _handle_item(self, node, ittype, item, properties=None):
         '''Handle an item from the list of LXC containers and Qemu VM. The
         return value will be either None if the item was skipped or the name of
         the item if it was added to the inventory.'''
         if item.get('template'):
             return None
 
-        properties = dict()
-        name, vmid = item['name'], item['vmid']
+        name = item['name']
 
         # get status, config and snapshots if want_facts == True
         want_facts = self.get_option('want_facts')
-        if want_facts:
-            self._get_vm_status(properties, node, vmid, ittype, name)
-            self._get_vm_config(properties, node, vmid, ittype, name)
-            self._get_vm_snapshots(properties, node, vmid, ittype, name)
-
-            if ittype == 'lxc':
-                self._get_lxc_interfaces(properties, node, vmid)
+        if properties is None:
+            properties = self._get_vm_facts(node, ittype, item) if want_facts else dict()
 
         # ensure the host satisfies filters
         if not self._can_add_host(name, properties):
@@ -608,9 +678,13 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         want_proxmox_nodes_ansible_host = self.get_option("want_proxmox_nodes_ansible_host")
 
+        want_facts = self.get_option('want_facts')
+        workers = max(self.get_option('workers') or 1, 1)
+        self.rate_limiter = RateLimiter(self.get_option('requests_per_second'))
+
         # gather vm's on nodes
         self._get_auth()
-        hosts = []
+        online_nodes = []
         for node in self._get_nodes():
             if not node.get('node'):
                 continue
@@ -637,11 +711,36 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 node_type_group = self._group('%s_%s' % (node['node'], ittype))
                 self.inventory.add_group(node_type_group)
 
-            # get LXC containers and Qemu VMs for this node
-            lxc_objects = zip(itertools.repeat('lxc'), self._get_lxc_per_node(node['node']))
-            qemu_objects = zip(itertools.repeat('qemu'), self._get_qemu_per_node(node['node']))
-            for ittype, item in itertools.chain(lxc_objects, qemu_objects):
-                name = self._handle_item(node['node'], ittype, item)
+            online_nodes.append(node['node'])
+
+        def list_guests(node):
+            lxc_objects = zip(itertools.repeat('lxc'), self._get_lxc_per_node(node))
+            qemu_objects = zip(itertools.repeat('qemu'), self._get_qemu_per_node(node))
+            return [(node, ittype, item) for ittype, item in itertools.chain(lxc_objects, qemu_objects)]
+
+        def get_facts(guest):
+            node, ittype, item = guest
+            if not want_facts or item.get('template'):
+                return None
+            return self._get_vm_facts(node, ittype, item)
+
+        # The API requests run on the pool, the inventory itself is only
+        # updated from this thread, in the same order as without workers
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # get LXC containers and Qemu VMs for all nodes
+            guests = list(itertools.chain.from_iterable(pool.map(list_guests, online_nodes)))
+
+            if want_facts:
+                self._cluster_resources = dict(
+                    ((resource.get('type'), str(resource.get('vmid'))), resource)
+                    for resource in self._get_cluster_resources() or []
+                    if isinstance(resource, MutableMapping)
+                )
+            facts = pool.map(get_facts, guests)
+
+            hosts = []
+            for (node, ittype, item), properties in zip(guests, facts):
+                name = self._handle_item(node, ittype, item, properties if want_facts else dict())
                 if name is not None:
                     hosts.append(name)
 
@@ -6,13 +6,120 @@
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import time
+
 import pytest
 
 pytest.importorskip('memcache')
 
 from ansible.plugins.loader import cache_loader
-from ansible_collections.community.general.plugins.cache.memcached import CacheModule as MemcachedCache
+from ansible_collections.community.general.plugins.cache.memcached import CacheModule as MemcachedCache, CacheModuleKeys
 
 
 def test_memcached_cachemodule():
     assert isinstance(cache_loader.get('community.general.memcached'), MemcachedCache)
+
+
+class FakeClient(object):
+    """
+    In-memory stand-in for memcache.Client, recording the calls made to it.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append('get')
+        return self.values.get(key)
+
+    def get_multi(self, keys, key_prefix=''):
+        self.calls.append('get_multi')
+        return dict((key, self.values[key_prefix + key]) for key in keys if key_prefix + key in self.values)
+
+    def set(self, key, value, time=0, min_compress_len=0):
+        self.calls.append('set')
+        self.values[key] = value
+
+    def set_multi(self, mapping, time=0, key_prefix='', min_compress_len=0):
+        self.calls.append('set_multi')
+        for key, value in mapping.items():
+            self.values[key_prefix + key] = dict(value)
+        return []
+
+    def delete(self, key):
+        self.calls.append('delete')
+        self.values.pop(key, None)
+
+    def delete_multi(self, keys, key_prefix=''):
+        self.calls.append('delete_multi')
+        for key in keys:
+            self.values.pop(key_prefix + key, None)
+
+
+def make_cache(client, **options):
+    cache = cache_loader.get('community.general.memcached', **options)
+    cache._db = client
+    cache._keys = CacheModuleKeys(client)
+    return cache
+
+
+def test_memcached_set_writes_one_shard():
+    client = FakeClient()
+    cache = make_cache(client)
+    for i in range(200):
+        cache.set('host%d' % i, {'i': i})
+
+    shards = [key for key in client.values if key.startswith(CacheModuleKeys.PREFIX)]
+    assert 1 < len(shards) <= CacheModuleKeys.SHARDS
+    assert sum(len(client.values[key]) for key in shards) == 200
+
+    # the shards are read back by a new process with a single get_multi
+    client.calls = []
+    keys = CacheModuleKeys(client)
+    assert client.calls == ['get_multi']
+    assert sorted(keys) == sorted('host%d' % i for i in range(200))
+
+
+def test_memcached_batched_writes_and_copy():
+    client = FakeClient()
+    cache = make_cache(client, _batch_size=50)
+    for i in range(100):
+        cache.set('host%d' % i, {'i': i})
+    assert client.calls.count('set_multi') == 4
+    assert 'set' not in client.calls
+
+    del client.values['ansible_factshost7']
+    cache._cache = {}
+    client.calls = []
+    copied = cache.copy()
+    assert len(copied) == 99 and copied['host8'] == {'i': 8}
+    assert 'host7' not in cache._keys
+    assert client.calls == ['get_multi', 'set_multi']
+
+    cache.flush()
+    assert cache.keys() == []
+    assert not [key for key in client.values if key.startswith('ansible_facts')]
+
+
+def test_memcached_legacy_index_is_migrated():
+    client = FakeClient()
+    client.values[CacheModuleKeys.PREFIX] = {'host1': 1.0, 'host2': 2.0}
+    keys = CacheModuleKeys(client)
+
+    assert sorted(keys) == ['host1', 'host2']
+    assert CacheModuleKeys.PREFIX not in client.values
+
+
+def test_memcached_remove_by_timerange_skips_recent_shards():
+    client = FakeClient()
+    keys = CacheModuleKeys(client)
+    keys.update(['host%d' % i for i in range(100)])
+    client.calls = []
+
+    keys.remove_by_timerange(0, 1.0)
+    assert len(keys) == 100
+    assert client.calls == []
+
+    keys.remove_by_timerange(0, time.time() + 1)
+    assert len(keys) == 0
@@ -91,6 +91,48 @@ class TestOpentelemetry(unittest.TestCase):
         self.assertEqual(host_data.name, 'include')
         self.assertEqual(host_data.status, 'ok')
 
+    @patch('ansible_collections.community.general.plugins.callback.elastic.capture_span')
+    def test_send_host(self, mock_capture_span):
+        apm_cli = Mock()
+        tasks_data = OrderedDict()
+        tasks_data['myuuid'] = self.my_task
+        self.elastic.max_message_size = 20
+        result = TaskResult(host=self.mock_host, task=self.mock_task, task_fields=self.task_fields,
+                            return_data={'msg': 'my-msg', 'stderr': 'x' * 100})
+
+        host_data = self.elastic.finish_task(tasks_data, 'failed', result)
+        self.elastic.send_host(apm_cli, tasks_data['myuuid'], host_data)
+
+        self.assertEqual(mock_capture_span.call_args[1]['labels']['ansible.task.host.status'], 'failed')
+        exception = apm_cli.capture_exception.call_args[1]['exc_info'][1]
+        self.assertTrue(exception.message.endswith('failed with error message message: "my-msg"...'))
+        self.assertIsNone(host_data.result)
+
+        # a second result for the same host is ignored
+        self.assertIsNone(self.elastic.finish_task(tasks_data, 'ok', self.my_task_result))
+
+    @patch('ansible_collections.community.general.plugins.callback.elastic.capture_span')
+    def test_release_task_sends_includes(self, mock_capture_span):
+        result = TaskResult(host=None, task=self.mock_task, return_data={}, task_fields=self.task_fields)
+        tasks_data = OrderedDict()
+        tasks_data['myuuid'] = self.my_task
+
+        for dummy in range(2):
+            self.elastic.finish_task(tasks_data, 'included', result)
+        self.assertEqual(mock_capture_span.call_count, 0)
+
+        self.elastic.release_task(Mock(), tasks_data, 'myuuid')
+        self.assertEqual(mock_capture_span.call_count, 1)
+        self.assertEqual(tasks_data, OrderedDict())
+
+    def test_truncate(self):
+        self.elastic.max_message_size = 10
+        self.assertEqual(self.elastic.truncate('short'), 'short')
+        self.assertEqual(self.elastic.truncate('0123456789abc'), '0123456...')
+        self.assertIsNone(self.elastic.truncate(None))
+        self.elastic.max_message_size = 0
+        self.assertEqual(self.elastic.truncate('0123456789abc'), '0123456789abc')
+
     def test_get_error_message(self):
         test_cases = (
             ('my-exception', 'my-msg', None, 'my-exception'),
@@ -104,3 +104,48 @@ def test_build_inventory_groups_with_no_groupselection(inventory):
         if generated_data[key] != value:
             eq = False
     assert eq
+
+
+class FakeSocket(object):
+    """Answers the requests of the plugin from the test data, and records them."""
+
+    def __init__(self, data):
+        self.data = data
+        self.requests = []
+
+    def do(self, method, url, body_json=None, ok_error_codes=None, timeout=None, wait_for_container=None):
+        self.requests.append(url)
+        if url.startswith('/1.0/instances?'):
+            instances = []
+            for instance in self.data['instances'].values():
+                instance_data = dict(instance['instances']['metadata'])
+                instance_data['state'] = instance['state']['metadata']
+                instance_data['snapshots'] = None
+                instances.append(instance_data)
+            return {'type': 'sync', 'status': 'Success', 'status_code': 200, 'metadata': instances}
+        network = url.split('/')[3]
+        return self.data['networks'][network]['state']
+
+
+def test_populate_recursive(inventory):
+    """Fetch all instances with a single request and check the result against the test data."""
+    expected = inventory.data
+    socket = FakeSocket(expected)
+    inventory.data = {}
+    inventory.project = 'default'
+    inventory.socket = socket
+
+    inventory.get_instance_data_recursive()
+    inventory.get_network_data(list(expected['networks']))
+
+    assert socket.requests[0] == '/1.0/instances?recursion=2&project=default'
+    assert len(socket.requests) == 1 + len(expected['networks'])
+    for name, instance in expected['instances'].items():
+        assert inventory.data['instances'][name]['instances']['metadata'] == instance['instances']['metadata']
+        assert inventory.data['instances'][name]['state']['metadata'] == instance['state']['metadata']
+    assert inventory.data['networks'] == expected['networks']
+
+    inventory._populate()
+    generated_data = inventory.inventory.get_host('vlantest').get_vars()
+    for key, value in HOST_COMPARATIVE_DATA.items():
+        assert generated_data[key] == value
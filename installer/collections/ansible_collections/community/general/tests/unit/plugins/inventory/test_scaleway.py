@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import io
+import json
+import threading
+
+import pytest
+
+from ansible.inventory.data import InventoryData
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.loader import inventory_loader
+from ansible_collections.community.general.plugins.plugin_utils import inventory_fetch
+
+
+PAR1 = 'https://api.scaleway.com/instance/v1/zones/fr-par-1/servers'
+AMS1 = 'https://api.scaleway.com/instance/v1/zones/nl-ams-1/servers'
+
+
+def server(name, zone, ip):
+    return dict(id=name, hostname=name, arch='x86_64', commercial_type='DEV1-S', organization='org', state='running',
+                tags=['web'], location=dict(zone_id=zone), public_ip=dict(address=ip), private_ip=None, ipv6=None)
+
+
+class FakeScaleway(object):
+    """Paginated servers API answering conditional requests, one barrier
+    party per zone so that the zones are only answered when fetched concurrently"""
+
+    def __init__(self):
+        self.pages = {
+            PAR1: [[server('p1', 'par1', '10.0.0.1')], [server('p2', 'par1', '10.0.0.2')]],
+            AMS1: [[server('a1', 'ams1', '10.1.0.1')]],
+        }
+        self.versions = {}
+        self.requests = []
+        self.barrier = threading.Barrier(2, timeout=10)
+        self.lock = threading.Lock()
+
+    def change(self, url, page, servers):
+        self.pages[url][page] = servers
+        self.versions[(url, page)] = self.versions.get((url, page), 0) + 1
+
+    def open_url(self, url, headers=None, **kwargs):
+        base, dummy, page = url.partition('?page=')
+        page = int(page or 1) - 1
+        etag = '"%s-%d-%d"' % (base, page, self.versions.get((base, page), 0))
+        with self.lock:
+            self.requests.append((url, headers.get('If-None-Match')))
+        if page == 0:
+            self.barrier.wait()
+        if headers.get('If-None-Match') == etag:
+            raise HTTPError(url, 304, 'Not Modified', {}, io.BytesIO())
+        link = ''
+        if page + 1 < len(self.pages[base]):
+            link = '<%s?page=%d>; rel="next"' % (base, page + 2)
+        response = io.BytesIO(json.dumps(dict(servers=self.pages[base][page])).encode('utf-8'))
+        response.headers = {'ETag': etag, 'Link': link}
+        return response
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = FakeScaleway()
+    monkeypatch.setattr(inventory_fetch, 'open_url', api.open_url)
+    return api
+
+
+def parse(tmp_path, revalidate):
+    config = tmp_path / 'test.scaleway.yml'
+    config.write_text(u'\n'.join([
+        'plugin: community.general.scaleway',
+        'oauth_token: my-token',
+        'regions: [par1, ams1]',
+        'fetch_workers: 2',
+        'cache: true',
+        'cache_plugin: ansible.builtin.jsonfile',
+        'cache_connection: %s' % (tmp_path / 'cache'),
+        'cache_revalidate: %s' % revalidate,
+    ]))
+    plugin = inventory_loader.get('community.general.scaleway')
+    inventory = InventoryData()
+    plugin.parse(inventory, DataLoader(), str(config))
+    plugin.update_cache_if_changed()
+    hosts = dict((name, host.vars['id']) for name, host in inventory.hosts.items())
+    return hosts, plugin._cache[plugin.get_cache_key(str(config))]
+
+
+def test_cache(tmp_path, api):
+    hosts, dummy = parse(tmp_path, False)
+    assert hosts == {'10.0.0.1': 'p1', '10.0.0.2': 'p2', '10.1.0.1': 'a1'}
+    assert len(api.requests) == 3
+
+    api.change(AMS1, 0, [server('a2', 'ams1', '10.1.0.2')])
+    assert parse(tmp_path, False)[0] == hosts
+    assert len(api.requests) == 3
+
+
+def test_cache_revalidate(tmp_path, api):
+    hosts, cached = parse(tmp_path, True)
+    assert hosts == {'10.0.0.1': 'p1', '10.0.0.2': 'p2', '10.1.0.1': 'a1'}
+    assert all(request[1] is None for request in api.requests)
+    # the servers are cached once, next to the validators of their pages
+    assert cached['pages']['ams1'] == [[AMS1, [server('a1', 'ams1', '10.1.0.1')]]]
+    assert sorted(cached['fetch_state']['urls'][AMS1]) == ['etag', 'headers', 'last_modified']
+
+    api.change(AMS1, 0, [server('a2', 'ams1', '10.1.0.2')])
+    api.requests = []
+    hosts, cached = parse(tmp_path, True)
+    assert hosts == {'10.0.0.1': 'p1', '10.0.0.2': 'p2', '10.1.0.2': 'a2'}
+    assert sorted(url for url, etag in api.requests if etag is not None) == sorted([AMS1, PAR1, PAR1 + '?page=2'])
+    assert cached['pages']['par1'][1] == [PAR1 + '?page=2', [server('p2', 'par1', '10.0.0.2')]]
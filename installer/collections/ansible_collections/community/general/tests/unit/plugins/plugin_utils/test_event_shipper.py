@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Ansible Project
+# GNU General Public License v3.0+ (see LICENSES/GPL-3.0-or-later.txt or https://www.gnu.org/licenses/gpl-3.0.txt)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Make coding more python3-ish
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+import gzip
+import time
+
+from ansible_collections.community.general.plugins.plugin_utils.event_shipper import (
+    EventShipper,
+)
+
+
+def recorder():
+    bodies = []
+    return bodies, lambda body, key: bodies.append(body)
+
+
+def test_batches_by_event_count():
+    bodies, record = recorder()
+    shipper = EventShipper(record, max_batch_events=2, flush_interval=60)
+    for event in ('a', 'b', 'c', 'd', 'e'):
+        shipper.put(event)
+    shipper.close()
+
+    assert bodies == ['a\nb', 'c\nd', 'e']
+    assert shipper.sent_events == 5
+
+
+def test_batches_by_size():
+    bodies, record = recorder()
+    shipper = EventShipper(record, max_batch_size=6, flush_interval=60)
+    for event in ('aaa', 'bbb', 'ccc'):
+        shipper.put(event)
+    shipper.close()
+
+    assert bodies == ['aaa\nbbb', 'ccc']
+
+
+def test_flushes_by_age():
+    bodies, record = recorder()
+    shipper = EventShipper(record, flush_interval=0.05)
+    shipper.put('a')
+    deadline = time.time() + 5
+    while not bodies and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert bodies == ['a']
+    shipper.close()
+    assert bodies == ['a']
+
+
+def test_retries_then_drops():
+    attempts = []
+    warnings = []
+
+    def send(body, key):
+        attempts.append(body)
+        if len(attempts) < 3:
+            raise IOError('HEC unavailable')
+
+    shipper = EventShipper(send, retries=2, backoff=0, warn=warnings.append)
+    shipper.put('a')
+    shipper.close()
+    assert attempts == ['a', 'a', 'a']
+    assert shipper.sent_events == 1
+    assert not warnings
+
+    failing = EventShipper(lambda body, key: 1 / 0, retries=1, backoff=0, warn=warnings.append)
+    failing.put('b')
+    failing.close()
+    assert failing.failed_events == 1
+    assert len(warnings) == 1
+    assert 'Dropping 1 event(s) after 2 failed attempt(s)' in warnings[0]
+
+
+def test_custom_encoding():
+    bodies, record = recorder()
+    shipper = EventShipper(record, encode=lambda batch: '[' + ','.join(batch) + ']')
+    shipper.put('1')
+    shipper.put('2')
+    shipper.close()
+
+    assert bodies == ['[1,2]']
+
+
+def test_batches_per_key():
+    sent = []
+    shipper = EventShipper(lambda body, key: sent.append((key, body)), max_batch_events=2, flush_interval=60)
+    for key, event in (('h1', 'a'), ('h2', 'b'), ('h1', 'c'), ('h2', 'd'), ('h1', 'e')):
+        shipper.put(event, key=key)
+    shipper.close()
+
+    assert sent == [('h1', 'a\nc'), ('h2', 'b\nd'), ('h1', 'e')]
+
+
+def test_compress():
+    bodies, record = recorder()
+    shipper = EventShipper(record, compress=True)
+    shipper.put('a')
+    shipper.put('b')
+    shipper.close()
+
+    assert gzip.decompress(bodies[0]) == b'a\nb'
+
+
+def test_drop_when_queue_is_full():
+    warnings = []
+    shipper = EventShipper(lambda body, key: None, queue_size=1, queue_full='drop', warn=warnings.append)
+    # keep the worker thread from draining the queue
+    shipper._thread = object()
+    shipper.put('a')
+    shipper.put('b')
+    shipper.put('c')
+    assert shipper.dropped_events == 2
+
+    shipper._thread = None
+    shipper.close()
+    assert warnings == ['Dropped 2 event(s) because the send queue was full']